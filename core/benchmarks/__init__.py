@@ -0,0 +1,11 @@
+"""Offline performance benchmarks.
+
+Benchmarks run the Cat in process with local fakes: Qdrant in path mode, the `DumbEmbedder`
+(or the `FakeEmbeddings`) and a fake streaming LLM with configurable latency and speed.
+Results are written as JSON, to compare them between versions.
+
+Run from the `core` folder:
+
+    python -m benchmarks --output results.json
+    python -m benchmarks --only recall_latency --points 1000 10000 --baseline results.json
+"""
@@ -0,0 +1,112 @@
+import os
+import sys
+import json
+import platform
+import argparse
+import subprocess
+from datetime import datetime, timezone
+from importlib import metadata
+
+# keep the output readable, before the Cat logger is configured
+os.environ.setdefault("CCAT_LOG_LEVEL", "WARNING")
+
+from benchmarks.cases import BENCHMARKS  # noqa: E402
+from benchmarks.environment import BenchmarkEnvironment  # noqa: E402
+
+
+# metrics where a higher value is better, all others are durations
+THROUGHPUT_KEYS = ("turns_per_second", "tokens_per_second", "chunks_per_second")
+COMPARED_KEYS = ("mean", "p50", "p95") + THROUGHPUT_KEYS
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks",
+        description="Offline performance benchmarks of the Cat (run from the `core` folder).",
+    )
+    parser.add_argument("--only", nargs="+", choices=list(BENCHMARKS), default=list(BENCHMARKS),
+                        help="Benchmarks to run (default: all).")
+    parser.add_argument("--output", default="benchmark_results.json", help="JSON file to write results to.")
+    parser.add_argument("--baseline", help="JSON results of a previous run, to print the changes against.")
+    parser.add_argument("--repeats", type=int, default=20, help="Measured iterations of each benchmark.")
+    parser.add_argument("--embedder", choices=["dumb", "fake"], default="dumb", help="Embedder to use.")
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="Seconds before the first LLM token.")
+    parser.add_argument("--tokens-per-second", type=float, default=0.0, help="LLM speed, 0 for no delay.")
+    parser.add_argument("--reply-tokens", type=int, default=50, help="Tokens in each LLM reply.")
+    parser.add_argument("--points", type=int, nargs="+", default=[100, 1000, 10000],
+                        help="Declarative memory sizes for the recall benchmark.")
+    parser.add_argument("--tools", type=int, default=50, help="Tools of the synthetic plugin (M).")
+    parser.add_argument("--hook-plugins", type=int, default=10, help="Synthetic plugins with hooks (K).")
+    parser.add_argument("--chunk-size", type=int, default=256, help="Chunk size for the Rabbit Hole benchmark.")
+    return parser.parse_args(argv)
+
+
+def run_metadata(options) -> dict:
+    try:
+        version = metadata.version("Cheshire-Cat")
+    except metadata.PackageNotFoundError:
+        version = None
+
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        commit = None
+
+    return {
+        "version": version,
+        "git_commit": commit,
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "options": {k: v for k, v in vars(options).items() if k not in ["output", "baseline"]},
+    }
+
+
+def compare(baseline: dict, current: dict, path: str = ""):
+    """Yield (metric path, baseline, current, relative change) for comparable metrics."""
+
+    for key, value in current.items():
+        if key not in baseline:
+            continue
+        name = f"{path}.{key}" if path else key
+        if isinstance(value, dict) and isinstance(baseline[key], dict):
+            yield from compare(baseline[key], value, name)
+        elif key in COMPARED_KEYS and baseline[key]:
+            yield name, baseline[key], value, (value - baseline[key]) / baseline[key]
+
+
+def main(argv=None):
+    options = parse_args(argv)
+
+    results = {}
+    with BenchmarkEnvironment(
+        embedder=options.embedder,
+        llm_latency=options.llm_latency,
+        tokens_per_second=options.tokens_per_second,
+        reply_tokens=options.reply_tokens,
+        n_tools=options.tools,
+        n_hook_plugins=options.hook_plugins,
+    ) as env:
+        for name in options.only:
+            print(f"Running {name}...", file=sys.stderr)
+            results[name] = BENCHMARKS[name](env, options)
+
+    report = {"metadata": run_metadata(options), "results": results}
+    with open(options.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {options.output}", file=sys.stderr)
+
+    if options.baseline:
+        with open(options.baseline) as f:
+            baseline = json.load(f)["results"]
+        for name, before, after, change in compare(baseline, results):
+            # for durations an increase is a regression, for throughputs a decrease
+            worse = change < 0 if name.endswith(THROUGHPUT_KEYS) else change > 0
+            flag = " (worse)" if worse and abs(change) > 0.1 else ""
+            print(f"{name}: {before:.6g} -> {after:.6g} ({change:+.1%}){flag}")
+
+
+if __name__ == "__main__":
+    main()
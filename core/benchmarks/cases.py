@@ -0,0 +1,271 @@
+import os
+import time
+import random
+import shutil
+from typing import Callable, Dict, List
+
+from cat.convo.messages import UserMessage
+
+from benchmarks.environment import BenchmarkEnvironment
+from benchmarks.fakes import html_document
+
+
+MOCKS_FOLDER = "tests/mocks/"
+
+WORDS = [
+    "cat", "hatter", "rabbit", "queen", "tea", "garden", "mushroom", "caterpillar", "dormouse", "hare",
+    "croquet", "flamingo", "hedgehog", "looking", "glass", "wonderland", "riddle", "raven", "desk", "pocket",
+    "watch", "bottle", "cake", "door", "key", "tarts", "knave", "trial", "jury", "smile",
+]
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """Nearest-rank percentile of already sorted values."""
+
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(q * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def summarize(durations: List[float]) -> Dict:
+    """Statistics of a list of durations, in seconds."""
+
+    values = sorted(durations)
+    total = sum(values)
+    return {
+        "n": len(values),
+        "total": total,
+        "mean": total / len(values) if values else 0.0,
+        "min": values[0] if values else 0.0,
+        "p50": percentile(values, 0.50),
+        "p95": percentile(values, 0.95),
+        "p99": percentile(values, 0.99),
+        "max": values[-1] if values else 0.0,
+    }
+
+
+def timed(function: Callable, *args, **kwargs):
+    """Run a function, returning its duration and result."""
+
+    start_time = time.perf_counter()
+    result = function(*args, **kwargs)
+    return time.perf_counter() - start_time, result
+
+
+def sentences(n: int, seed: int = 42) -> List[str]:
+    """Reproducible random sentences, used as memories and queries."""
+
+    rng = random.Random(seed)
+    return [" ".join(rng.choices(WORDS, k=12)) for _ in range(n)]
+
+
+def turn_latency(env: BenchmarkEnvironment, options) -> Dict:
+    """Full conversation turns through `StrayCat.run`, as http endpoints do."""
+
+    stray = env.stray("bench_turns")
+    messages = sentences(options.repeats + 1, seed=1)
+
+    # first turn loads lazy stuff (e.g. tokenizers)
+    stray.run({"user_id": stray.user_id, "text": messages[0]}, return_message=True)
+
+    durations = []
+    for text in messages[1:]:
+        duration, reply = timed(stray.run, {"user_id": stray.user_id, "text": text}, return_message=True)
+        if isinstance(reply, dict) and "error" in reply:
+            raise RuntimeError(f"Turn failed: {reply['error']}")
+        durations.append(duration)
+
+    stats = summarize(durations)
+    stats["turns_per_second"] = stats["n"] / stats["total"]
+    return stats
+
+
+def websocket_streaming(env: BenchmarkEnvironment, options) -> Dict:
+    """Turns over a websocket connection: time to first token, reply latency and token throughput."""
+
+    first_token_durations = []
+    reply_durations = []
+    tokens = 0
+    frames = 0
+    errors = 0
+
+    with env.client.websocket_connect("/ws/bench_ws") as websocket:
+        for text in sentences(options.repeats, seed=2):
+            start_time = time.perf_counter()
+            first_token_time = None
+            websocket.send_json({"text": text})
+
+            while True:
+                message = websocket.receive_json()
+                if message["type"] == "chat_token":
+                    if first_token_time is None:
+                        first_token_time = time.perf_counter()
+                    frames += 1
+                    tokens += message["content"].count("meow")
+                elif message["type"] == "chat":
+                    break
+                elif message["type"] == "error":
+                    errors += 1
+                    break
+
+            reply_durations.append(time.perf_counter() - start_time)
+            if first_token_time is not None:
+                first_token_durations.append(first_token_time - start_time)
+
+    return {
+        "time_to_first_token": summarize(first_token_durations),
+        "reply": summarize(reply_durations),
+        "tokens": tokens,
+        "token_frames": frames,
+        "tokens_per_second": tokens / sum(reply_durations),
+        "errors": errors,
+    }
+
+
+def rabbit_hole_ingestion(env: BenchmarkEnvironment, options) -> Dict:
+    """Ingestion of the mock documents with `RabbitHole.ingest_file`, in chunks per second."""
+
+    folder = os.path.join(env.folder, "documents")
+    os.makedirs(folder, exist_ok=True)
+
+    files = {}
+    for extension in ["txt", "pdf"]:
+        files[extension] = os.path.join(folder, f"sample.{extension}")
+        shutil.copy(os.path.join(MOCKS_FOLDER, f"sample.{extension}"), files[extension])
+    files["html"] = os.path.join(folder, "sample.html")
+    with open(os.path.join(MOCKS_FOLDER, "sample.txt")) as f:
+        text = f.read()
+    with open(files["html"], "w") as f:
+        f.write(html_document(text))
+
+    stray = env.stray("bench_rabbit_hole")
+    vector_db = env.ccat.memory.vectors.vector_db
+
+    results = {}
+    for extension, path in files.items():
+        durations = []
+        chunks = 0
+        for _ in range(options.repeats):
+            points_before = vector_db.count("declarative").count
+            duration, _ = timed(
+                env.ccat.rabbit_hole.ingest_file, stray, path, chunk_size=options.chunk_size, chunk_overlap=0
+            )
+            durations.append(duration)
+            chunks += vector_db.count("declarative").count - points_before
+
+        stats = summarize(durations)
+        stats["chunks_per_file"] = chunks / options.repeats
+        stats["chunks_per_second"] = chunks / stats["total"]
+        results[extension] = stats
+
+    return results
+
+
+def recall_latency(env: BenchmarkEnvironment, options) -> Dict:
+    """Recall of memories (embedding the query and searching all collections), with N points in declarative memory."""
+
+    stray = env.stray("bench_recall")
+    declarative = env.ccat.memory.vectors.declarative
+    embedder = env.ccat.embedder
+    queries = sentences(options.repeats, seed=3)
+
+    results = {}
+    stored = 0
+    for n_points in sorted(options.points):
+        # add points up to n_points, in batches
+        contents = sentences(n_points, seed=4)[stored:]
+        for start in range(0, len(contents), 256):
+            batch = contents[start : start + 256]
+            declarative.add_points(
+                contents=batch,
+                vectors=embedder.embed_documents(batch),
+                metadata=[{"source": "benchmark", "when": time.time()} for _ in batch],
+            )
+        stored = n_points
+
+        durations = []
+        for query in queries:
+            stray.working_memory.user_message_json = UserMessage(user_id=stray.user_id, text=query)
+            duration, _ = timed(stray.recall_relevant_memories_to_working_memory)
+            durations.append(duration)
+
+        results[str(n_points)] = summarize(durations)
+
+    return results
+
+
+def embed_procedures(env: BenchmarkEnvironment, options) -> Dict:
+    """Embedding of the procedures triggers on plugins sync, with the M tools of the synthetic plugin active."""
+
+    ccat = env.ccat
+    procedural = ccat.memory.vectors.procedural
+
+    activation_duration, _ = timed(env.set_plugins_active, ["bench_tools"])
+
+    cold_durations = []
+    warm_durations = []
+    try:
+        for _ in range(options.repeats):
+            # all triggers to be embedded
+            points, _ = procedural.get_all_points()
+            procedural.delete_points([p.id for p in points])
+            duration, _ = timed(ccat.embed_procedures)
+            cold_durations.append(duration)
+
+            # nothing changed
+            duration, _ = timed(ccat.embed_procedures)
+            warm_durations.append(duration)
+
+        n_triggers = len(ccat.build_active_procedures_hashes(ccat.mad_hatter.procedures))
+    finally:
+        env.set_plugins_active(["bench_tools"], active=False)
+
+    return {
+        "tools": env.n_tools,
+        "triggers": n_triggers,
+        "plugin_activation": activation_duration,
+        "cold": summarize(cold_durations),
+        "warm": summarize(warm_durations),
+    }
+
+
+def hook_overhead(env: BenchmarkEnvironment, options) -> Dict:
+    """Execution of a hook chain, with only the core plugin and with K synthetic plugins implementing the hook."""
+
+    stray = env.stray("bench_hooks")
+    mad_hatter = env.ccat.mad_hatter
+    message = UserMessage(user_id=stray.user_id, text="meow")
+    calls = options.repeats * 100
+
+    def measure():
+        durations = []
+        for _ in range(calls):
+            duration, _ = timed(mad_hatter.execute_hook, "before_cat_reads_message", message, cat=stray)
+            durations.append(duration)
+        return summarize(durations)
+
+    results = {"plugins": env.n_hook_plugins, "core_only": measure()}
+
+    env.set_plugins_active(env.hook_plugin_ids)
+    try:
+        results["with_plugins"] = measure()
+    finally:
+        env.set_plugins_active(env.hook_plugin_ids, active=False)
+
+    if env.n_hook_plugins:
+        results["overhead_per_plugin"] = (
+            results["with_plugins"]["mean"] - results["core_only"]["mean"]
+        ) / env.n_hook_plugins
+    return results
+
+
+# benchmarks run by default, in this order
+BENCHMARKS = {
+    "turn_latency": turn_latency,
+    "websocket_streaming": websocket_streaming,
+    "rabbit_hole_ingestion": rabbit_hole_ingestion,
+    "recall_latency": recall_latency,
+    "embed_procedures": embed_procedures,
+    "hook_overhead": hook_overhead,
+}
@@ -0,0 +1,201 @@
+import os
+import time
+import shutil
+import tempfile
+import threading
+
+import httpx
+import uvicorn
+from qdrant_client import QdrantClient
+from fastapi.testclient import TestClient
+
+import cat.utils as utils
+from cat.auth.permissions import AuthUserInfo
+from cat.looking_glass.stray_cat import StrayCat
+from cat.memory.vector_memory import VectorMemory
+from cat.memory.serialized_qdrant_client import SerializedQdrantClient
+from cat.startup import cheshire_cat_api
+
+from benchmarks.fakes import FakeStreamingLLM, hooks_plugin_source, tools_plugin_source
+
+
+class BenchmarkEnvironment:
+    """Offline Cat instance for benchmarks, fully contained in a temporary folder (removed on exit).
+
+    The app runs in process (FastAPI `TestClient`, or a uvicorn server in a thread if `port` is given),
+    with Qdrant in local path mode,
+    a metadata file, an ingestion jobs folder and a plugins folder of its own,
+    so benchmarks never touch `cat/data` or `cat/plugins`.
+    The LLM is a `FakeStreamingLLM`, the embedder the `DumbEmbedder` or the `FakeEmbeddings`.
+
+    Synthetic plugins are generated in the plugins folder, and are inactive until a benchmark toggles them:
+    `bench_tools` has `n_tools` tools, `bench_hooks_<k>` have two hooks each.
+
+    Parameters
+    ----------
+    embedder : str
+        "dumb" (`EmbedderDumbConfig`) or "fake" (`EmbedderFakeConfig`).
+    llm_latency : float
+        Seconds before the first token of each LLM call.
+    tokens_per_second : float
+        LLM generation speed, 0 for no delay.
+    reply_tokens : int
+        Tokens in each LLM reply.
+    n_tools : int
+        Tools of the synthetic tools plugin.
+    n_hook_plugins : int
+        Number of synthetic plugins with hooks.
+    port : int, optional
+        Serve the app on this local port, so external clients can connect (`client` is then an `httpx.Client`).
+    """
+
+    def __init__(
+        self,
+        embedder: str = "dumb",
+        llm_latency: float = 0.0,
+        tokens_per_second: float = 0.0,
+        reply_tokens: int = 50,
+        n_tools: int = 50,
+        n_hook_plugins: int = 10,
+        port: int = None,
+    ):
+        self.embedder = embedder
+        self.llm_latency = llm_latency
+        self.tokens_per_second = tokens_per_second
+        self.reply_tokens = reply_tokens
+        self.n_tools = n_tools
+        self.n_hook_plugins = n_hook_plugins
+        self.port = port
+
+        self.folder = None
+        self.client = None
+        self.server = None
+
+    @property
+    def ccat(self):
+        return cheshire_cat_api.state.ccat
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.port}"
+
+    @property
+    def hook_plugin_ids(self):
+        return [f"bench_hooks_{k}" for k in range(self.n_hook_plugins)]
+
+    def __enter__(self):
+        # plugins are imported as modules relative to the working directory, so the folder is not in /tmp
+        self.folder = tempfile.mkdtemp(prefix="tmp_", dir="benchmarks")
+        self._patch()
+        self._write_plugins()
+
+        # start from a fresh Cat
+        utils.singleton.instances = {}
+        if self.port is None:
+            self.client = TestClient(cheshire_cat_api)
+            self.client.__enter__()
+        else:
+            self._serve()
+            self.client = httpx.Client(base_url=self.url)
+
+        if self.embedder == "fake":
+            response = self.client.put("/embedder/settings/EmbedderFakeConfig", json={"size": 128})
+            response.raise_for_status()
+
+        # after the embedder, as changing it reloads the natural language objects
+        self.ccat._llm = FakeStreamingLLM(
+            latency=self.llm_latency,
+            tokens_per_second=self.tokens_per_second,
+            reply_tokens=self.reply_tokens,
+        )
+        return self
+
+    def __exit__(self, *exc_info):
+        try:
+            self.client.__exit__(*exc_info)
+            if self.server is not None:
+                self.server.should_exit = True
+                self._server_thread.join()
+        finally:
+            self._unpatch()
+            utils.singleton.instances = {}
+            shutil.rmtree(self.folder, ignore_errors=True)
+
+    def _serve(self):
+        config = uvicorn.Config(cheshire_cat_api, host="127.0.0.1", port=self.port, log_level="warning")
+        self.server = uvicorn.Server(config)
+        # signal handlers are installed only from the main thread
+        self._server_thread = threading.Thread(target=self.server.run, daemon=True)
+        self._server_thread.start()
+
+        while not self.server.started:
+            if not self._server_thread.is_alive():
+                raise RuntimeError(f"Could not start the server on port {self.port}")
+            time.sleep(0.05)
+
+    def _patch(self):
+        self._saved = {
+            "env": {
+                k: os.environ.get(k)
+                for k in ["CCAT_METADATA_FILE", "CCAT_INGESTION_JOBS_DIR", "CCAT_DEBUG"]
+            },
+            "get_plugins_path": utils.get_plugins_path,
+            "connect_to_vector_memory": VectorMemory.connect_to_vector_memory,
+            "local_vector_db": VectorMemory.local_vector_db,
+        }
+
+        os.environ["CCAT_METADATA_FILE"] = os.path.join(self.folder, "metadata.json")
+        os.environ["CCAT_INGESTION_JOBS_DIR"] = os.path.join(self.folder, "ingestion_jobs")
+        os.environ["CCAT_DEBUG"] = "false"  # no autoreload
+
+        plugins_folder = os.path.join(self.folder, "plugins/")
+        os.makedirs(plugins_folder)
+        utils.get_plugins_path = lambda: plugins_folder
+
+        vector_memory_folder = os.path.join(self.folder, "vector_memory")
+
+        def connect_to_vector_memory(vector_memory):
+            # Qdrant local path mode, in the temporary folder
+            if VectorMemory.local_vector_db is None:
+                VectorMemory.local_vector_db = SerializedQdrantClient(
+                    QdrantClient(path=vector_memory_folder, force_disable_check_same_thread=True)
+                )
+            vector_memory.vector_db = VectorMemory.local_vector_db
+
+        VectorMemory.local_vector_db = None
+        VectorMemory.connect_to_vector_memory = connect_to_vector_memory
+
+    def _unpatch(self):
+        for key, value in self._saved["env"].items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+        utils.get_plugins_path = self._saved["get_plugins_path"]
+        VectorMemory.connect_to_vector_memory = self._saved["connect_to_vector_memory"]
+        if VectorMemory.local_vector_db is not None:
+            VectorMemory.local_vector_db.close()
+        VectorMemory.local_vector_db = self._saved["local_vector_db"]
+
+    def _write_plugins(self):
+        plugins = {"bench_tools": tools_plugin_source(self.n_tools)}
+        for k, plugin_id in enumerate(self.hook_plugin_ids):
+            plugins[plugin_id] = hooks_plugin_source(k)
+
+        for plugin_id, source in plugins.items():
+            plugin_folder = os.path.join(utils.get_plugins_path(), plugin_id)
+            os.makedirs(plugin_folder)
+            with open(os.path.join(plugin_folder, f"{plugin_id}.py"), "w") as f:
+                f.write(source)
+
+    def stray(self, user_id: str = "bench") -> StrayCat:
+        """New session for a user."""
+        return StrayCat(AuthUserInfo(id=user_id, name=user_id))
+
+    def set_plugins_active(self, plugin_ids, active: bool = True):
+        """Activate or deactivate synthetic plugins (plugins are synced and procedures embedded)."""
+
+        mad_hatter = self.ccat.mad_hatter
+        for plugin_id in plugin_ids:
+            if (plugin_id in mad_hatter.active_plugins) != active:
+                mad_hatter.toggle_plugin(plugin_id)
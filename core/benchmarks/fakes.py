@@ -0,0 +1,124 @@
+import time
+import asyncio
+from typing import Any, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.callbacks import (
+    AsyncCallbackManagerForLLMRun,
+    CallbackManagerForLLMRun,
+)
+
+
+class FakeStreamingLLM(BaseChatModel):
+    """Chat model replying with a fixed number of tokens, at a given speed.
+
+    Tokens are sent to the callbacks one by one, like streaming models do,
+    so the websocket pipeline does the same work it does with a real LLM.
+
+    Attributes
+    ----------
+    latency : float
+        Seconds before the first token (time to first token of the provider).
+    tokens_per_second : float
+        Generation speed, 0 sends all tokens at once.
+    reply_tokens : int
+        Number of tokens of each reply.
+    """
+
+    latency: float = 0.0
+    tokens_per_second: float = 0.0
+    reply_tokens: int = 50
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-streaming"
+
+    def _tokens(self) -> List[str]:
+        return [f"meow{i} " for i in range(self.reply_tokens)]
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        time.sleep(self.latency)
+        tokens = self._tokens()
+        for token in tokens:
+            if self.tokens_per_second:
+                time.sleep(1 / self.tokens_per_second)
+            if run_manager:
+                run_manager.on_llm_new_token(token)
+
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content="".join(tokens)))])
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        await asyncio.sleep(self.latency)
+        tokens = self._tokens()
+        for token in tokens:
+            if self.tokens_per_second:
+                await asyncio.sleep(1 / self.tokens_per_second)
+            if run_manager:
+                await run_manager.on_llm_new_token(token)
+
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content="".join(tokens)))])
+
+
+HOOKS_PLUGIN_TEMPLATE = '''from cat.mad_hatter.decorators import hook
+
+calls = 0
+
+
+@hook
+def before_cat_reads_message(user_message_json, cat):
+    global calls
+    calls += 1
+    return user_message_json
+
+
+@hook(priority={priority})
+def before_cat_sends_message(message, cat):
+    global calls
+    calls += 1
+    return message
+'''
+
+TOOL_TEMPLATE = '''
+
+@tool
+def bench_tool_{index}(tool_input, cat):
+    """Benchmark tool number {index}, useful to answer questions about topic {index}. Input is a word."""
+    return tool_input
+'''
+
+
+def hooks_plugin_source(index: int) -> str:
+    """Source of a plugin with two hooks doing a minimal amount of work (not skipped as no-op)."""
+    return HOOKS_PLUGIN_TEMPLATE.format(priority=index % 5)
+
+
+def tools_plugin_source(n_tools: int) -> str:
+    """Source of a plugin with `n_tools` tools, each with a different description (trigger)."""
+
+    source = "from cat.mad_hatter.decorators import tool\n"
+    for index in range(n_tools):
+        source += TOOL_TEMPLATE.format(index=index)
+    return source
+
+
+def html_document(text: str) -> str:
+    """Wrap text paragraphs in an HTML page, with some markup to be stripped by the parser."""
+
+    paragraphs = "\n".join(
+        f"<p class='content'><span>{p}</span></p>" for p in text.split("\n") if p.strip()
+    )
+    return f"<html><head><title>Benchmark</title></head><body><div>{paragraphs}</div></body></html>"
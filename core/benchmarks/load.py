@@ -0,0 +1,358 @@
+"""Websocket load generator and soak test.
+
+Opens many authenticated `/ws` connections, each one sending messages at a given rate,
+and records time to first `chat_token`, full reply latency and error frames.
+Server memory, busy threadpool threads and open connections are sampled from `/metrics` during the run,
+so it shows how many users a Cat process sustains before the threadpool saturates and streaming degrades.
+
+Run from the `core` folder, against a local server with the fake LLM and embedder:
+
+    python -m benchmarks.load --local --users 50 --rate 0.5 --duration 60 --tokens-per-second 50
+
+or against a running Cat, with an api key (`CCAT_API_KEY_WS`, and `CCAT_API_KEY` for `/metrics`) or user credentials:
+
+    python -m benchmarks.load --url http://localhost:1865 --token meow --http-token meow_http --users 20
+    python -m benchmarks.load --url http://localhost:1865 --username admin --password admin --users 20
+
+Recorded conversations can be replayed with `--transcripts`, a JSON file with a list of conversations.
+Each conversation is a list of messages (strings, or dicts with `text` and optionally `who`)
+or a history as exported by `GET /memory/conversation_history`. Only human messages are sent,
+connection `i` replays conversation `i` (modulo their number).
+"""
+
+import os
+import sys
+import json
+import time
+import math
+import asyncio
+import secrets
+import argparse
+from datetime import datetime, timezone
+from typing import Dict, List
+from urllib.parse import urlencode, urlparse
+
+# keep the output readable, before the Cat logger is configured
+os.environ.setdefault("CCAT_LOG_LEVEL", "WARNING")
+
+import httpx  # noqa: E402
+from websockets.asyncio.client import connect  # noqa: E402
+from websockets.exceptions import ConnectionClosed  # noqa: E402
+
+from benchmarks.cases import sentences, summarize  # noqa: E402
+
+
+# sampled from `/metrics`
+SAMPLED_METRICS = {
+    "process_resident_memory_bytes": "memory",
+    "ccat_threadpool_busy_threads": "threadpool_busy",
+    "ccat_threadpool_max_threads": "threadpool_max",
+    "ccat_websocket_connections": "connections",
+}
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.load",
+        description="Websocket load generator and soak test (run from the `core` folder).",
+    )
+    parser.add_argument("--url", default="http://localhost:1865", help="Base url of the Cat.")
+    parser.add_argument("--local", action="store_true",
+                        help="Start a local server with the fake LLM and embedder, instead of using --url.")
+    parser.add_argument("--port", type=int, default=18650, help="Port of the local server.")
+    parser.add_argument("--users", type=int, default=10, help="Simultaneous websocket connections.")
+    parser.add_argument("--rate", type=float, default=0.0,
+                        help="Messages per second sent by each user, 0 to send the next one as soon as the reply arrives.")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds of load (soak tests: hours).")
+    parser.add_argument("--messages", type=int, default=0, help="Stop each user after this many messages (0 = no limit).")
+    parser.add_argument("--ramp-up", type=float, default=0.0, help="Seconds to open all connections.")
+    parser.add_argument("--reply-timeout", type=float, default=120.0, help="Seconds to wait for a reply.")
+    parser.add_argument("--sample-interval", type=float, default=5.0, help="Seconds between `/metrics` samples.")
+    parser.add_argument("--transcripts", help="JSON file with conversations to replay.")
+    parser.add_argument("--token", help="Websocket credentials: `CCAT_API_KEY_WS` or a JWT.")
+    parser.add_argument("--http-token", help="Http credentials for `/metrics`: `CCAT_API_KEY` or a JWT (default: --token).")
+    parser.add_argument("--username", help="User to get a JWT for, used for websocket and http.")
+    parser.add_argument("--password", help="Password of --username.")
+    parser.add_argument("--output", default="load_results.json", help="JSON file to write results to.")
+    # local server
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="Local server: seconds before the first LLM token.")
+    parser.add_argument("--tokens-per-second", type=float, default=0.0, help="Local server: LLM speed, 0 for no delay.")
+    parser.add_argument("--reply-tokens", type=int, default=50, help="Local server: tokens in each LLM reply.")
+    parser.add_argument("--embedder", choices=["dumb", "fake"], default="dumb", help="Local server: embedder to use.")
+    return parser.parse_args(argv)
+
+
+def load_transcripts(path: str) -> List[List[str]]:
+    """Human messages of each recorded conversation."""
+
+    with open(path) as f:
+        data = json.load(f)
+
+    if isinstance(data, dict):
+        data = [data]
+
+    conversations = []
+    for conversation in data:
+        if isinstance(conversation, dict):
+            conversation = conversation.get("history", [])
+
+        messages = []
+        for message in conversation:
+            if isinstance(message, str):
+                messages.append(message)
+            elif message.get("who", "Human").lower() in ["human", "user"]:
+                messages.append(message.get("text") or message.get("message", ""))
+        if messages:
+            conversations.append(messages)
+
+    if not conversations:
+        raise ValueError(f"No human messages found in {path}")
+    return conversations
+
+
+def parse_metrics(text: str) -> Dict[str, float]:
+    """Read the sampled metrics from the Prometheus text format (unlabeled samples only)."""
+
+    values = {}
+    for line in text.splitlines():
+        if line.startswith("#") or not line.strip():
+            continue
+        name, _, value = line.rpartition(" ")
+        if name in SAMPLED_METRICS:
+            values[SAMPLED_METRICS[name]] = float(value)
+    return values
+
+
+class LoadTest:
+    """Simulated users chatting with the Cat over websocket, with their measurements.
+
+    Parameters
+    ----------
+    options : argparse.Namespace
+        Command line options.
+    url : str
+        Base http url of the Cat.
+    ws_token : str, optional
+        Credentials passed to `WebSocketAuth` in the `token` query parameter.
+    http_token : str, optional
+        Credentials to read `/metrics`.
+    conversations : List[List[str]]
+        Messages sent by the users, in order.
+    """
+
+    def __init__(self, options, url: str, ws_token: str = None, http_token: str = None, conversations=None):
+        self.options = options
+        self.url = url.rstrip("/")
+        self.ws_url = self.url.replace("http", "ws", 1)
+        self.ws_token = ws_token
+        self.http_token = http_token
+        self.conversations = conversations or [sentences(100, seed=5)]
+
+        self.first_token_durations = []
+        self.reply_durations = []
+        # (time since start, reply duration), to see latencies degrade during the run
+        self.replies = []
+        self.tokens = 0
+        self.sent = 0
+        self.error_frames = 0
+        self.timeouts = 0
+        self.connections_opened = 0
+        self.connection_errors = 0
+        self.disconnections = 0
+        self.samples = []
+        self.metrics_error = None
+
+    async def run(self) -> Dict:
+        self.start_time = time.perf_counter()
+        self.stop_time = self.start_time + self.options.duration
+
+        sampler = asyncio.create_task(self.sample_metrics())
+        await asyncio.gather(*[self.user(i) for i in range(self.options.users)])
+        sampler.cancel()
+        await self.sample_once()
+
+        return self.report()
+
+    async def user(self, index: int):
+        if self.options.ramp_up:
+            await asyncio.sleep(self.options.ramp_up * index / self.options.users)
+
+        query = urlencode({"token": self.ws_token}) if self.ws_token else ""
+        uri = f"{self.ws_url}/ws/load_user_{index}" + (f"?{query}" if query else "")
+        messages = self.conversations[index % len(self.conversations)]
+        interval = 1 / self.options.rate if self.options.rate else 0
+
+        try:
+            websocket = await connect(uri, open_timeout=30, max_size=None)
+        except Exception as e:
+            self.connection_errors += 1
+            print(f"User {index} could not connect: {e}", file=sys.stderr)
+            return
+        self.connections_opened += 1
+
+        try:
+            n = 0
+            while time.perf_counter() < self.stop_time:
+                if self.options.messages and n >= self.options.messages:
+                    break
+                start_time = time.perf_counter()
+                await self.turn(websocket, messages[n % len(messages)], start_time)
+                n += 1
+                await asyncio.sleep(max(0, interval - (time.perf_counter() - start_time)))
+        except ConnectionClosed as e:
+            self.disconnections += 1
+            print(f"User {index} disconnected: {e}", file=sys.stderr)
+        finally:
+            await websocket.close()
+
+    async def turn(self, websocket, text: str, start_time: float):
+        await websocket.send(json.dumps({"text": text}))
+        self.sent += 1
+
+        first_token_time = None
+        deadline = start_time + self.options.reply_timeout
+        while True:
+            try:
+                message = json.loads(
+                    await asyncio.wait_for(websocket.recv(), timeout=max(0, deadline - time.perf_counter()))
+                )
+            except asyncio.TimeoutError:
+                self.timeouts += 1
+                return
+
+            if message["type"] == "chat_token":
+                if first_token_time is None:
+                    first_token_time = time.perf_counter()
+                self.tokens += 1
+            elif message["type"] == "chat":
+                break
+            elif message["type"] == "error":
+                self.error_frames += 1
+                return
+
+        end_time = time.perf_counter()
+        self.reply_durations.append(end_time - start_time)
+        self.replies.append((end_time - self.start_time, end_time - start_time))
+        if first_token_time is not None:
+            self.first_token_durations.append(first_token_time - start_time)
+
+    async def sample_metrics(self):
+        while True:
+            await self.sample_once()
+            await asyncio.sleep(self.options.sample_interval)
+
+    async def sample_once(self):
+        headers = {"Authorization": f"Bearer {self.http_token}"} if self.http_token else {}
+        try:
+            async with httpx.AsyncClient() as client:
+                response = await client.get(f"{self.url}/metrics", headers=headers, timeout=10)
+                response.raise_for_status()
+        except Exception as e:
+            self.metrics_error = str(e)
+            return
+
+        elapsed = time.perf_counter() - self.start_time
+        window = [d for t, d in self.replies if elapsed - self.options.sample_interval < t <= elapsed]
+        self.samples.append(
+            {"time": elapsed, "replies": len(window), "reply_p95": summarize(window)["p95"]}
+            | parse_metrics(response.text)
+        )
+
+    def report(self) -> Dict:
+        elapsed = time.perf_counter() - self.start_time
+        memory = [s["memory"] for s in self.samples if not math.isnan(s.get("memory", math.nan))]
+
+        return {
+            "connections": {
+                "users": self.options.users,
+                "opened": self.connections_opened,
+                "errors": self.connection_errors,
+                "disconnections": self.disconnections,
+            },
+            "messages": {
+                "sent": self.sent,
+                "replies": len(self.reply_durations),
+                "error_frames": self.error_frames,
+                "timeouts": self.timeouts,
+            },
+            "time_to_first_token": summarize(self.first_token_durations),
+            "reply": summarize(self.reply_durations),
+            "replies_per_second": len(self.reply_durations) / elapsed,
+            "tokens_per_second": self.tokens / elapsed,
+            "memory_growth_bytes": memory[-1] - memory[0] if memory else None,
+            "max_threadpool_busy": max((s.get("threadpool_busy", 0) for s in self.samples), default=None),
+            "samples": self.samples,
+            "metrics_error": self.metrics_error,
+        }
+
+
+def get_jwt(url: str, username: str, password: str) -> str:
+    response = httpx.post(f"{url}/auth/token", json={"username": username, "password": password})
+    response.raise_for_status()
+    return response.json()["access_token"]
+
+
+def run_load_test(options, url: str, ws_token: str, http_token: str) -> Dict:
+    if options.username:
+        ws_token = http_token = get_jwt(url, options.username, options.password)
+
+    conversations = load_transcripts(options.transcripts) if options.transcripts else None
+    load_test = LoadTest(options, url, ws_token=ws_token, http_token=http_token, conversations=conversations)
+    return asyncio.run(load_test.run())
+
+
+def main(argv=None):
+    options = parse_args(argv)
+    ws_token = options.token
+    http_token = options.http_token or options.token
+
+    if options.local:
+        from benchmarks.environment import BenchmarkEnvironment
+
+        # connections are authenticated as in production, with api keys
+        saved_env = {k: os.environ.get(k) for k in ["CCAT_API_KEY", "CCAT_API_KEY_WS"]}
+        if not (options.token or options.username):
+            ws_token, http_token = secrets.token_hex(16), secrets.token_hex(16)
+            os.environ["CCAT_API_KEY_WS"] = ws_token
+            os.environ["CCAT_API_KEY"] = http_token
+
+        try:
+            with BenchmarkEnvironment(
+                embedder=options.embedder,
+                llm_latency=options.llm_latency,
+                tokens_per_second=options.tokens_per_second,
+                reply_tokens=options.reply_tokens,
+                port=options.port,
+            ) as env:
+                results = run_load_test(options, env.url, ws_token, http_token)
+        finally:
+            for key, value in saved_env.items():
+                if value is None:
+                    os.environ.pop(key, None)
+                else:
+                    os.environ[key] = value
+    else:
+        results = run_load_test(options, options.url, ws_token, http_token)
+
+    options_report = {k: v for k, v in vars(options).items() if k not in ["token", "http_token", "password", "output"]}
+    report = {
+        "metadata": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "server": urlparse(options.url).netloc if not options.local else "local",
+            "options": options_report,
+        },
+        "results": results,
+    }
+    with open(options.output, "w") as f:
+        json.dump(report, f, indent=2)
+
+    print(
+        f"{results['messages']['replies']} replies from {results['connections']['opened']} connections, "
+        f"p95 reply {results['reply']['p95']:.3f}s, p95 first token {results['time_to_first_token']['p95']:.3f}s, "
+        f"{results['messages']['error_frames']} error frames. Results written to {options.output}",
+        file=sys.stderr,
+    )
+
+
+if __name__ == "__main__":
+    main()
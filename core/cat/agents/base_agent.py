@@ -1,6 +1,7 @@
 from typing import List
 from abc import ABC, abstractmethod
 
+from fastapi.concurrency import run_in_threadpool
 
 from cat.utils import BaseModelDict
 
@@ -14,4 +15,9 @@ class BaseAgent(ABC):
 
     @abstractmethod
     def execute(*args, **kwargs) -> AgentOutput:
-        pass
\ No newline at end of file
+        pass
+
+    async def aexecute(self, *args, **kwargs) -> AgentOutput:
+        """Async version of `execute`.
+        By default `execute` runs in the threadpool, agents calling models should override it."""
+        return await run_in_threadpool(self.execute, *args, **kwargs)
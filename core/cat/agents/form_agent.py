@@ -19,7 +19,10 @@ class FormAgent(BaseAgent):
         else:
             # continue form
             try:
-                form_output = active_form.next() # form should be async and should be awaited
+                with cat.mad_hatter.profiler.measure(
+                    "form", getattr(active_form, "plugin_id", None), active_form.name, cat=cat
+                ):
+                    form_output = active_form.next() # form should be async and should be awaited
                 return AgentOutput(
                     output=form_output["output"],
                     return_direct=True, # we assume forms always do a return_direct
@@ -3,6 +3,7 @@ from typing import List, Tuple
 from datetime import timedelta
 
 from langchain.docstore.document import Document
+from fastapi.concurrency import run_in_threadpool
 
 from cat.mad_hatter.mad_hatter import MadHatter
 from cat.looking_glass import prompts
@@ -11,6 +12,7 @@ from cat.env import get_env
 from cat.agents import BaseAgent, AgentOutput
 from cat.agents.memory_agent import MemoryAgent
 from cat.agents.procedures_agent import ProceduresAgent
+from cat.convo.tracing import span
 
 
 class MainAgent(BaseAgent):
@@ -35,6 +37,73 @@ class MainAgent(BaseAgent):
             Reply of the agent, instance of AgentOutput.
         """
 
+        fast_reply, prompt_prefix, prompt_suffix = self.prepare_agents(cat)
+        if fast_reply is not None:
+            return fast_reply
+
+        # run tools and forms
+        procedures_agent = ProceduresAgent()
+        with span("procedures_agent"):
+            procedures_agent_out : AgentOutput = procedures_agent.execute(cat)
+        if procedures_agent_out.return_direct:
+            return procedures_agent_out
+
+        # we run memory agent if:
+        # - no procedures were recalled or selected or
+        # - procedures have all return_direct=False
+        memory_agent = MemoryAgent()
+        with span("memory_agent"):
+            memory_agent_out : AgentOutput = memory_agent.execute(
+                # TODO: should all agents only receive StrayCat?
+                cat, prompt_prefix, prompt_suffix
+            )
+
+        memory_agent_out.intermediate_steps += procedures_agent_out.intermediate_steps
+
+        return memory_agent_out
+
+    async def aexecute(self, cat) -> AgentOutput:
+        """Execute the agents, async version of `execute`.
+
+        Returns
+        -------
+        agent_output : AgentOutput
+            Reply of the agent, instance of AgentOutput.
+        """
+
+        fast_reply, prompt_prefix, prompt_suffix = await run_in_threadpool(
+            self.prepare_agents, cat
+        )
+        if fast_reply is not None:
+            return fast_reply
+
+        with span("procedures_agent"):
+            procedures_agent_out : AgentOutput = await ProceduresAgent().aexecute(cat)
+        if procedures_agent_out.return_direct:
+            return procedures_agent_out
+
+        with span("memory_agent"):
+            memory_agent_out : AgentOutput = await MemoryAgent().aexecute(
+                cat, prompt_prefix, prompt_suffix
+            )
+
+        memory_agent_out.intermediate_steps += procedures_agent_out.intermediate_steps
+
+        return memory_agent_out
+
+    def prepare_agents(self, cat):
+        """Prepare agent input and prompts running the related hooks.
+
+        Returns
+        -------
+        fast_reply : AgentOutput | None
+            Reply from the `agent_fast_reply` hook, if any.
+        prompt_prefix : str
+            Main prompt prefix.
+        prompt_suffix : str
+            Main prompt suffix.
+        """
+
         # prepare input to be passed to the agent.
         #   Info will be extracted from working memory
         # Note: agent_input works both as a dict and as an object
@@ -51,9 +120,9 @@ class MainAgent(BaseAgent):
             "agent_fast_reply", {}, cat=cat
         )
         if isinstance(agent_fast_reply, AgentOutput):
-            return agent_fast_reply
+            return agent_fast_reply, None, None
         if isinstance(agent_fast_reply, dict) and "output" in agent_fast_reply:
-            return AgentOutput(**agent_fast_reply)
+            return AgentOutput(**agent_fast_reply), None, None
 
         # obtain prompt parts from plugins
         prompt_prefix = self.mad_hatter.execute_hook(
@@ -63,24 +132,7 @@ class MainAgent(BaseAgent):
             "agent_prompt_suffix", prompts.MAIN_PROMPT_SUFFIX, cat=cat
         )
 
-        # run tools and forms
-        procedures_agent = ProceduresAgent()
-        procedures_agent_out : AgentOutput = procedures_agent.execute(cat)
-        if procedures_agent_out.return_direct:
-            return procedures_agent_out
-
-        # we run memory agent if:
-        # - no procedures were recalled or selected or
-        # - procedures have all return_direct=False
-        memory_agent = MemoryAgent()
-        memory_agent_out : AgentOutput = memory_agent.execute(
-            # TODO: should all agents only receive StrayCat?
-            cat, prompt_prefix, prompt_suffix
-        )
-
-        memory_agent_out.intermediate_steps += procedures_agent_out.intermediate_steps
-
-        return memory_agent_out
+        return None, prompt_prefix, prompt_suffix
 
     def format_agent_input(self, cat):
         """Format the input for the Agent.
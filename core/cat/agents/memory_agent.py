@@ -4,7 +4,7 @@ from langchain_core.prompts.chat import SystemMessagePromptTemplate
 from langchain_core.runnables import RunnableConfig, RunnableLambda
 from langchain_core.output_parsers.string import StrOutputParser
 
-from cat.looking_glass.callbacks import NewTokenHandler, ModelInteractionHandler
+from cat.looking_glass.callbacks import NewTokenHandler, AsyncNewTokenHandler, ModelInteractionHandler
 from cat.agents import BaseAgent, AgentOutput
 from cat import utils
 
@@ -13,6 +13,33 @@ class MemoryAgent(BaseAgent):
 
     def execute(self, cat, prompt_prefix, prompt_suffix) -> AgentOutput:
 
+        chain, prompt_variables = self.build_chain(cat, prompt_prefix, prompt_suffix)
+
+        output = chain.invoke(
+            # convert to dict before passing to langchain
+            prompt_variables,
+            config=RunnableConfig(callbacks=[
+                NewTokenHandler(cat), ModelInteractionHandler(cat, utils.get_caller_info(skip=1))
+            ])
+        )
+
+        return AgentOutput(output=output)
+
+    async def aexecute(self, cat, prompt_prefix, prompt_suffix) -> AgentOutput:
+
+        chain, prompt_variables = self.build_chain(cat, prompt_prefix, prompt_suffix)
+
+        output = await chain.ainvoke(
+            prompt_variables,
+            config=RunnableConfig(callbacks=[
+                AsyncNewTokenHandler(cat), ModelInteractionHandler(cat, utils.get_caller_info(skip=1))
+            ])
+        )
+
+        return AgentOutput(output=output)
+
+    def build_chain(self, cat, prompt_prefix, prompt_suffix):
+
         prompt_variables = cat.working_memory.agent_input.model_dump()
         sys_prompt = prompt_prefix + prompt_suffix
 
@@ -36,13 +63,4 @@ class MemoryAgent(BaseAgent):
             | StrOutputParser()
         )
 
-        output = chain.invoke(
-            # convert to dict before passing to langchain
-            prompt_variables,
-            config=RunnableConfig(callbacks=[
-                NewTokenHandler(cat), ModelInteractionHandler(cat, utils.get_caller_info(skip=1))
-            ])
-        )
-
-        return AgentOutput(output=output)
-    
+        return chain, prompt_variables
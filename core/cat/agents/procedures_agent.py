@@ -4,6 +4,7 @@ from typing import Dict
 from langchain.prompts import ChatPromptTemplate
 from langchain_core.prompts.chat import SystemMessagePromptTemplate
 from langchain_core.runnables import RunnableConfig, RunnableLambda
+from fastapi.concurrency import run_in_threadpool
 
 from cat.agents import BaseAgent, AgentOutput
 from cat.agents.form_agent import FormAgent
@@ -31,39 +32,82 @@ class ProceduresAgent(BaseAgent):
             return form_output
         
         # Select and run useful procedures
-        intermediate_steps = []
         procedural_memories = cat.working_memory.procedural_memories
         if len(procedural_memories) > 0:
             log.debug(f"Procedural memories retrived: {len(procedural_memories)}.")
 
             try:
                 procedures_result: AgentOutput = self.execute_procedures(cat)
-                if procedures_result.return_direct:
-                    # exit agent if a return_direct procedure was executed
-                    return procedures_result
-
-                # store intermediate steps to enrich memory chain
-                intermediate_steps = procedures_result.intermediate_steps
-
-                # Adding the tools_output key in agent input, needed by the memory chain
-                # TODO: find a more elegant way to pass this information
-                if len(intermediate_steps) > 0:
-                    cat.working_memory.agent_input.tools_output = "## Context of executed system tools: \n"
-                    for proc_res in intermediate_steps:
-                        # ((step[0].tool, step[0].tool_input), step[1])
-                        cat.working_memory.agent_input.tools_output += (
-                            f" - {proc_res[0][0]}: {proc_res[1]}\n"
-                        )
-                return procedures_result
+                return self.store_procedures_output(cat, procedures_result)
+            except Exception:
+                log.error("Error while executing procedures")
+
+        return AgentOutput()
+
+    async def aexecute(self, cat) -> AgentOutput:
 
+        form_output: AgentOutput = await self.form_agent.aexecute(cat)
+        if form_output.return_direct:
+            return form_output
+
+        procedural_memories = cat.working_memory.procedural_memories
+        if len(procedural_memories) > 0:
+            log.debug(f"Procedural memories retrived: {len(procedural_memories)}.")
+
+            try:
+                procedures_result: AgentOutput = await self.aexecute_procedures(cat)
+                return self.store_procedures_output(cat, procedures_result)
             except Exception:
                 log.error("Error while executing procedures")
 
         return AgentOutput()
 
-    
+    def store_procedures_output(self, cat, procedures_result: AgentOutput) -> AgentOutput:
+        if procedures_result.return_direct:
+            # exit agent if a return_direct procedure was executed
+            return procedures_result
+
+        # store intermediate steps to enrich memory chain
+        intermediate_steps = procedures_result.intermediate_steps
+
+        # Adding the tools_output key in agent input, needed by the memory chain
+        # TODO: find a more elegant way to pass this information
+        if len(intermediate_steps) > 0:
+            cat.working_memory.agent_input.tools_output = "## Context of executed system tools: \n"
+            for proc_res in intermediate_steps:
+                # ((step[0].tool, step[0].tool_input), step[1])
+                cat.working_memory.agent_input.tools_output += (
+                    f" - {proc_res[0][0]}: {proc_res[1]}\n"
+                )
+        return procedures_result
+
     def execute_procedures(self, cat):
 
+        procedures_prompt_template, allowed_procedures = self.prepare_procedures(cat)
+
+        # Execute chain and obtain a choice of procedure from the LLM
+        llm_action: LLMAction = self.execute_chain(cat, procedures_prompt_template, allowed_procedures)
+
+        # route execution to subagents
+        return self.execute_subagents(cat, llm_action, allowed_procedures)
+
+    async def aexecute_procedures(self, cat):
+
+        procedures_prompt_template, allowed_procedures = await run_in_threadpool(
+            self.prepare_procedures, cat
+        )
+
+        llm_action: LLMAction = await self.aexecute_chain(
+            cat, procedures_prompt_template, allowed_procedures
+        )
+
+        # tools and forms are sync code
+        return await run_in_threadpool(
+            self.execute_subagents, cat, llm_action, allowed_procedures
+        )
+
+    def prepare_procedures(self, cat):
+
         # using some hooks
         mad_hatter = MadHatter()
 
@@ -84,14 +128,35 @@ class ProceduresAgent(BaseAgent):
                 cat, recalled_procedures_names
             )
 
-        # Execute chain and obtain a choice of procedure from the LLM
-        llm_action: LLMAction = self.execute_chain(cat, procedures_prompt_template, allowed_procedures)
+        return procedures_prompt_template, allowed_procedures
 
-        # route execution to subagents
-        return self.execute_subagents(cat, llm_action, allowed_procedures)
+    def execute_chain(self, cat, procedures_prompt_template, allowed_procedures) -> LLMAction:
 
+        chain, prompt_variables = self.build_chain(cat, procedures_prompt_template, allowed_procedures)
 
-    def execute_chain(self, cat, procedures_prompt_template, allowed_procedures) -> LLMAction:
+        llm_action: LLMAction = chain.invoke(
+            prompt_variables,
+            config=RunnableConfig(callbacks=[
+                ModelInteractionHandler(cat, utils.get_caller_info(skip=1))
+            ])
+        )
+
+        return llm_action
+
+    async def aexecute_chain(self, cat, procedures_prompt_template, allowed_procedures) -> LLMAction:
+
+        chain, prompt_variables = self.build_chain(cat, procedures_prompt_template, allowed_procedures)
+
+        llm_action: LLMAction = await chain.ainvoke(
+            prompt_variables,
+            config=RunnableConfig(callbacks=[
+                ModelInteractionHandler(cat, utils.get_caller_info(skip=1))
+            ])
+        )
+
+        return llm_action
+
+    def build_chain(self, cat, procedures_prompt_template, allowed_procedures):
         
         # Prepare info to fill up the prompt
         prompt_variables = {
@@ -126,14 +191,7 @@ class ProceduresAgent(BaseAgent):
             | ChooseProcedureOutputParser() # ensures output is a LLMAction
         )
 
-        llm_action: LLMAction = chain.invoke(
-            prompt_variables,
-            config=RunnableConfig(callbacks=[
-                ModelInteractionHandler(cat, utils.get_caller_info(skip=1))
-            ])
-        )
-
-        return llm_action
+        return chain, prompt_variables
     
     
     def execute_subagents(self, cat, llm_action, allowed_procedures):
@@ -144,7 +202,10 @@ class ProceduresAgent(BaseAgent):
             try:
                 if Plugin._is_cat_tool(chosen_procedure):
                     # execute tool
-                    tool_output = chosen_procedure.run(llm_action.action_input, cat=cat)
+                    with cat.mad_hatter.profiler.measure(
+                        "tool", getattr(chosen_procedure, "plugin_id", None), chosen_procedure.name, cat=cat
+                    ):
+                        tool_output = chosen_procedure.run(llm_action.action_input, cat=cat)
                     return AgentOutput(
                         output=tool_output,
                         return_direct=chosen_procedure.return_direct,
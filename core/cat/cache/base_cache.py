@@ -19,4 +19,6 @@ class BaseCache(ABC):
     def delete(self, key):
         pass
 
-
+    def delete_expired(self):
+        """Delete expired items. Called periodically, caches can override it to free space."""
+        pass
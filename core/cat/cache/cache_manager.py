@@ -10,10 +10,16 @@ class CacheManager:
         
         if self.cache_type == "in_memory":
             from cat.cache.in_memory_cache import InMemoryCache
-            self.cache = InMemoryCache()
+            max_items = int(get_env("CCAT_CACHE_MAX_ITEMS"))
+            max_bytes = get_env("CCAT_CACHE_MAX_BYTES")
+            max_bytes = int(max_bytes) if max_bytes else None
+            self.cache = InMemoryCache(max_items=max_items, max_bytes=max_bytes)
         elif self.cache_type == "file_system":
             cache_dir = get_env("CCAT_CACHE_DIR")
             from cat.cache.file_system_cache import FileSystemCache
             self.cache = FileSystemCache(cache_dir)
+        elif self.cache_type == "redis":
+            from cat.cache.redis_cache import RedisCache
+            self.cache = RedisCache(get_env("CCAT_CACHE_REDIS_URL"))
         else:
             raise ValueError(f"Cache type {self.cache_type} not supported")
\ No newline at end of file
@@ -1,26 +1,107 @@
 import os
+import re
+import time
 import pickle
+import hashlib
+import tempfile
+import threading
+from collections import OrderedDict
+
 from cat.cache.base_cache import BaseCache
+from cat.cache.cache_item import CacheItem
+from cat.log import log
 
 
 class FileSystemCache(BaseCache):
     """Cache implementation using the file system.
 
+    Each item is pickled in its own file, inside a subdirectory named after the hash of its key
+    so that directories stay small with many users.
+    Files are written atomically (temporary file + rename) and start with the item expiration time,
+    so expired items can be found without unpickling them.
+    The pickled bytes of the most recently used items are kept in memory and reused as long as their file
+    does not change on disk. Each read unpickles its own copy of the item, so callers never share it.
+    Files written directly in `cache_dir` by older versions are moved to their subdirectory when read,
+    or removed by `delete_expired` once expired.
+    With a byte budget, reads refresh the modification time of files and the least recently used ones
+    are deleted when the budget is exceeded, checked every tenth of the budget written.
+
     Attributes
     ----------
     cache_dir : str
         Directory to store the cache.
+    max_loaded_items : int
+        Maximum number of pickled items kept in memory.
+    max_bytes : int | None
+        Maximum size in bytes of the files of the cache. None means no limit.
 
     """
 
-    def __init__(self, cache_dir):
+    SHARD_PATTERN = re.compile(r"[0-9a-f]{2}")
+
+    def __init__(self, cache_dir, max_loaded_items=100, max_bytes=None):
         self.cache_dir = cache_dir
         if not os.path.exists(self.cache_dir):
             os.makedirs(self.cache_dir)
 
+        # key -> (file signature, pickled CacheItem) for items recently read or written by this process
+        self.max_loaded_items = max_loaded_items
+        self._loaded = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.max_bytes = max_bytes
+        # bytes written since the last check of the budget (the first write checks it)
+        self._written_bytes = max_bytes
+
     def _get_file_path(self, key):
+        shard = hashlib.md5(key.encode()).hexdigest()[:2]
+        return os.path.join(self.cache_dir, shard, f"{key}.cache")
+
+    def _get_legacy_file_path(self, key):
+        # before sharding, files were written directly in the cache dir, without expiration time
         return os.path.join(self.cache_dir, f"{key}.cache")
 
+    @staticmethod
+    def _read_legacy_item(file_path, key):
+        try:
+            with open(file_path, "rb") as f:
+                cache_item = pickle.load(f)
+        except Exception:
+            # missing, unreadable or not written by this cache
+            return None
+        if not isinstance(cache_item, CacheItem) or cache_item.key != key:
+            return None
+        return cache_item
+
+    def _migrate_legacy_item(self, key):
+        """Move the item of a legacy file to its subdirectory, unless expired. Returns the item, if any."""
+
+        legacy_path = self._get_legacy_file_path(key)
+        cache_item = self._read_legacy_item(legacy_path, key)
+        if cache_item is None:
+            return None
+
+        # items written since sharding are newer
+        if not cache_item.is_expired() and not os.path.exists(self._get_file_path(key)):
+            self.insert(cache_item)
+        try:
+            os.remove(legacy_path)
+        except FileNotFoundError:
+            pass
+        return cache_item
+
+    @staticmethod
+    def _file_signature(file_path):
+        # files are replaced on write, so inode + mtime + size change every time
+        stat = os.stat(file_path)
+        return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+    @staticmethod
+    def _expires_at(cache_item):
+        if cache_item.ttl == -1 or cache_item.ttl is None:
+            return None
+        return cache_item.created_at + cache_item.ttl
+
     def insert(self, cache_item):
         """Insert a key-value pair in the cache.
 
@@ -31,8 +112,35 @@ class FileSystemCache(BaseCache):
 
         """
 
-        with open(self._get_file_path(cache_item.key), "wb") as f:
-            pickle.dump(cache_item, f)
+        file_path = self._get_file_path(cache_item.key)
+        file_dir = os.path.dirname(file_path)
+        os.makedirs(file_dir, exist_ok=True)
+
+        # write to a temporary file in the same directory, then rename it:
+        # readers never see a partially written item
+        # pickled now, later changes to the item by the caller are not cached
+        data = pickle.dumps(cache_item, protocol=pickle.HIGHEST_PROTOCOL)
+        fd, tmp_path = tempfile.mkstemp(dir=file_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump(self._expires_at(cache_item), f, protocol=pickle.HIGHEST_PROTOCOL)
+                f.write(data)
+            os.replace(tmp_path, file_path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        self._remember(cache_item.key, self._file_signature(file_path), data)
+
+        if self.max_bytes is not None:
+            with self._lock:
+                self._written_bytes += len(data)
+                check = self._written_bytes >= self.max_bytes / 10
+                if check:
+                    self._written_bytes = 0
+            if check:
+                self.delete_least_recently_used()
 
     def get_item(self, key):
         """Get the value stored in the cache.
@@ -49,14 +157,44 @@ class FileSystemCache(BaseCache):
 
         """
         file_path = self._get_file_path(key)
-        if not os.path.exists(file_path):
-            return None
+        try:
+            signature = self._file_signature(file_path)
+        except FileNotFoundError:
+            with self._lock:
+                self._loaded.pop(key, None)
+            cache_item = self._migrate_legacy_item(key)
+            if cache_item is None or cache_item.is_expired():
+                return None
+            return cache_item
 
-        with open(file_path, "rb") as f:
-            cache_item = pickle.load(f)
+        with self._lock:
+            loaded = self._loaded.get(key)
+            if loaded:
+                self._loaded.move_to_end(key)
+
+        if loaded and loaded[0] == signature:
+            # file did not change since we last read or wrote it
+            data = loaded[1]
+        else:
+            try:
+                with open(file_path, "rb") as f:
+                    pickle.load(f)  # expiration time
+                    data = f.read()
+            except FileNotFoundError:
+                return None
+
+        if self.max_bytes is not None:
+            # the modification time tells the least recently used items
+            try:
+                os.utime(file_path)
+                signature = self._file_signature(file_path)
+            except FileNotFoundError:
+                pass
+        self._remember(key, signature, data)
+        cache_item = pickle.loads(data)
 
         if cache_item.is_expired():
-            os.remove(file_path)
+            self.delete(key)
             return None
 
         return cache_item
@@ -90,8 +228,113 @@ class FileSystemCache(BaseCache):
             Key to delete the value.
 
         """
+        with self._lock:
+            self._loaded.pop(key, None)
+
         file_path = self._get_file_path(key)
-        if os.path.exists(file_path):
+        try:
+            os.remove(file_path)
+        except FileNotFoundError:
+            pass
+
+    def _remember(self, key, signature, data):
+        with self._lock:
+            self._loaded[key] = (signature, data)
+            self._loaded.move_to_end(key)
+            while len(self._loaded) > self.max_loaded_items:
+                self._loaded.popitem(last=False)
+
+    def _cache_files(self):
+        # the cache dir can be shared (/tmp by default): only look at files written by this cache,
+        #   named after their key, placed in the shard of the key and starting with an expiration time
+        for shard in os.scandir(self.cache_dir):
+            if not (shard.is_dir() and self.SHARD_PATTERN.fullmatch(shard.name)):
+                continue
+            for entry in os.scandir(shard.path):
+                if not entry.name.endswith(".cache"):
+                    continue
+                key = entry.name[: -len(".cache")]
+                if self._get_file_path(key) != entry.path:
+                    continue
+                try:
+                    with open(entry.path, "rb") as f:
+                        expires_at = pickle.load(f)
+                except Exception:
+                    # missing, unreadable or not written by this cache
+                    continue
+                if expires_at is None or isinstance(expires_at, (int, float)):
+                    yield key, entry, expires_at
+
+    def _delete_file(self, key, file_path):
+        with self._lock:
+            self._loaded.pop(key, None)
+        try:
             os.remove(file_path)
+        except FileNotFoundError:
+            return False
+        return True
+
+    def delete_expired(self):
+        """Delete all expired items from disk.
+
+        Only the expiration time at the beginning of each file is read, items are not unpickled.
+
+        Returns
+        -------
+        int
+            Number of deleted items.
+
+        """
+
+        deleted = 0
+        now = time.time()
+
+        # files written by an older version, if they hold the item of their key
+        for entry in os.scandir(self.cache_dir):
+            if entry.is_file() and entry.name.endswith(".cache"):
+                cache_item = self._migrate_legacy_item(entry.name[: -len(".cache")])
+                if cache_item is not None and cache_item.is_expired():
+                    deleted += 1
+
+        for key, entry, expires_at in self._cache_files():
+            if expires_at is not None and expires_at < now and self._delete_file(key, entry.path):
+                deleted += 1
+
+        if deleted:
+            log.debug(f"FileSystemCache: deleted {deleted} expired items")
+        return deleted
+
+    def delete_least_recently_used(self):
+        """Delete the least recently used items until the files fit in `max_bytes`.
+
+        Returns
+        -------
+        int
+            Number of deleted items.
+
+        """
+
+        if self.max_bytes is None:
+            return 0
+
+        files = []
+        total_bytes = 0
+        for key, entry, _ in self._cache_files():
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, key, entry.path))
+            total_bytes += stat.st_size
 
+        deleted = 0
+        for _, size, key, file_path in sorted(files):
+            if total_bytes <= self.max_bytes:
+                break
+            if self._delete_file(key, file_path):
+                deleted += 1
+            total_bytes -= size
 
+        if deleted:
+            log.debug(f"FileSystemCache: deleted {deleted} least recently used items")
+        return deleted
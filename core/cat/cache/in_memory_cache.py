@@ -1,20 +1,50 @@
+import time
+import heapq
+import pickle
+import threading
+from collections import OrderedDict
+
 from cat.cache.base_cache import BaseCache
 from cat.cache.cache_item import CacheItem
 
 
 class InMemoryCache(BaseCache):
     """Cache implementation using a python dictionary.
+    Items are evicted in least recently used order when the cache is full.
 
     Attributes
     ----------
-    cache : dict
-        Dictionary to store the cache.
+    items : OrderedDict
+        Dictionary to store the cache, from least to most recently used.
+    max_items : int | None
+        Maximum number of items in the cache. None means no limit (e.g. when there is a memory budget).
+    max_bytes : int | None
+        Maximum size in bytes (of pickled values) of the cache. None means no limit.
+    hits : int
+        Number of `get_item` calls that found a valid item.
+    misses : int
+        Number of `get_item` calls that found no item or an expired one.
+    evictions : int
+        Number of items deleted to make room for new ones.
 
     """
 
-    def __init__(self):
-        self.items = {}
-        self.max_items = 100
+    def __init__(self, max_items=100, max_bytes=None):
+        self.items = OrderedDict()
+        self.max_items = max_items
+        self.max_bytes = max_bytes
+
+        # heap of (expiration time, key), only for items with a ttl
+        self._expirations = []
+        # size of each item, only tracked when there is a memory budget
+        self._sizes = {}
+        self._total_bytes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._lock = threading.RLock()
 
     def insert(self, cache_item):
         """Insert a key-value pair in the cache.
@@ -26,24 +56,41 @@ class InMemoryCache(BaseCache):
 
         """
 
-        # add new item
-        self.items[cache_item.key] = cache_item
-        
-        # clean up cache if it's full
-        if len(self.items) >= self.max_items:
-
-            # sort caches by creation time
-            sorted_items = sorted(
-                self.items.items(),
-                key=lambda x: x[1].created_at,
-            )
-
-            # delete 10% of the oldest items
-            # not efficient, but it's honest work
-            # TODO: index items also by creation date
-            for k, v in sorted_items[:self.max_items//10]:
-                self.delete(k)
-
+        with self._lock:
+            self._remove_expired()
+
+            # add new item (or refresh an existing one) as most recently used
+            self._remove(cache_item.key)
+            self.items[cache_item.key] = cache_item
+
+            if cache_item.ttl is not None and cache_item.ttl != -1:
+                heapq.heappush(
+                    self._expirations,
+                    (cache_item.created_at + cache_item.ttl, cache_item.key),
+                )
+                # refreshed items leave stale heap entries behind, drop them from time to time
+                if len(self._expirations) > 2 * len(self.items) + 16:
+                    self._expirations = [
+                        (i.created_at + i.ttl, k)
+                        for k, i in self.items.items()
+                        if i.ttl is not None and i.ttl != -1
+                    ]
+                    heapq.heapify(self._expirations)
+
+            if self.max_bytes is not None:
+                size = len(pickle.dumps(cache_item.value))
+                self._sizes[cache_item.key] = size
+                self._total_bytes += size
+
+            # clean up cache if it's full, least recently used items first
+            # (the item just inserted is kept, even if alone it exceeds the budget)
+            while len(self.items) > 1 and (
+                (self.max_items is not None and len(self.items) > self.max_items)
+                or (self.max_bytes is not None and self._total_bytes > self.max_bytes)
+            ):
+                oldest_key = next(iter(self.items))
+                self._remove(oldest_key)
+                self.evictions += 1
 
     def get_item(self, key) -> CacheItem:
         """Get the value stored in the cache.
@@ -59,13 +106,21 @@ class InMemoryCache(BaseCache):
             Value stored in the cache.
 
         """
-        item = self.items.get(key)
 
-        if item and item.is_expired():
-            del self.items[key]
-            return None
+        with self._lock:
+            item = self.items.get(key)
+
+            if item and item.is_expired():
+                self._remove(key)
+                item = None
 
-        return item
+            if item is None:
+                self.misses += 1
+                return None
+
+            self.items.move_to_end(key)
+            self.hits += 1
+            return item
 
     def get_value(self, key):
         """Get the value stored in the cache.
@@ -82,7 +137,6 @@ class InMemoryCache(BaseCache):
 
         """
 
-
         item = self.get_item(key)
         if item:
             return item.value
@@ -97,5 +151,43 @@ class InMemoryCache(BaseCache):
             Key to delete the value.
 
         """
-        if key in self.items:
-            del self.items[key]
+
+        with self._lock:
+            self._remove(key)
+
+    def delete_expired(self):
+        """Delete all expired items."""
+
+        with self._lock:
+            self._remove_expired()
+
+    def stats(self):
+        """Cache usage counters.
+
+        Returns
+        -------
+        dict
+            Number of items, bytes (if there is a memory budget), hits, misses and evictions.
+
+        """
+
+        with self._lock:
+            return {
+                "items": len(self.items),
+                "bytes": self._total_bytes if self.max_bytes is not None else None,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+    def _remove(self, key):
+        if self.items.pop(key, None) is not None:
+            self._total_bytes -= self._sizes.pop(key, 0)
+
+    def _remove_expired(self):
+        # expirations are checked lazily: heap entries may refer to deleted or refreshed items
+        while self._expirations and self._expirations[0][0] < time.time():
+            expires_at, key = heapq.heappop(self._expirations)
+            item = self.items.get(key)
+            if item and item.ttl not in (None, -1) and item.created_at + item.ttl == expires_at:
+                self._remove(key)
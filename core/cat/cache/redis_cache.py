@@ -0,0 +1,178 @@
+import time
+import zlib
+import pickle
+
+import redis
+
+from cat.cache.base_cache import BaseCache
+from cat.cache.cache_item import CacheItem
+
+
+class RedisCache(BaseCache):
+    """Cache implementation using a Redis server (or any server speaking its protocol).
+
+    The cache is shared by all processes connected to the same server, so it can be used
+    when the Cat runs with multiple workers.
+    Items expire on the server according to their ttl, there is nothing to clean up locally.
+    Values are pickled and compressed when large (e.g. a long working memory history).
+
+    Attributes
+    ----------
+    client : redis.Redis
+        Redis client.
+    prefix : str
+        Prefix added to all keys, to share a server with other applications.
+    compress_min_bytes : int
+        Pickled values larger than this are compressed with zlib.
+
+    """
+
+    # first byte of each stored value
+    RAW = b"\x00"
+    COMPRESSED = b"\x01"
+
+    def __init__(
+        self,
+        url="redis://localhost:6379/0",
+        client=None,
+        prefix="ccat:",
+        compress_min_bytes=1024,
+    ):
+        # connection is lazy, the server is contacted on first command
+        self.client = client or redis.Redis.from_url(url)
+        self.prefix = prefix
+        self.compress_min_bytes = compress_min_bytes
+
+    def _key(self, key):
+        return f"{self.prefix}{key}"
+
+    def _dumps(self, cache_item):
+        # key is not stored, it is already the redis key
+        data = pickle.dumps(
+            (cache_item.value, cache_item.ttl, cache_item.created_at),
+            protocol=pickle.HIGHEST_PROTOCOL,
+        )
+        if len(data) > self.compress_min_bytes:
+            return self.COMPRESSED + zlib.compress(data)
+        return self.RAW + data
+
+    def _loads(self, key, data):
+        if data is None:
+            return None
+        if data[:1] == self.COMPRESSED:
+            payload = zlib.decompress(data[1:])
+        else:
+            payload = data[1:]
+        value, ttl, created_at = pickle.loads(payload)
+        cache_item = CacheItem(key, value, ttl)
+        cache_item.created_at = created_at
+        return cache_item
+
+    @staticmethod
+    def _ttl_ms(cache_item):
+        if cache_item.ttl == -1 or cache_item.ttl is None:
+            return None
+        # redis wants a positive expiration, remaining time is measured from item creation
+        return max(1, int((cache_item.created_at + cache_item.ttl - time.time()) * 1000))
+
+    def insert(self, cache_item):
+        """Insert a key-value pair in the cache.
+
+        Parameters
+        ----------
+        cache_item : CacheItem
+            Cache item to store.
+
+        """
+
+        self.client.set(
+            self._key(cache_item.key), self._dumps(cache_item), px=self._ttl_ms(cache_item)
+        )
+
+    def insert_many(self, cache_items):
+        """Insert many key-value pairs in the cache with a single round trip.
+
+        Parameters
+        ----------
+        cache_items : List[CacheItem]
+            Cache items to store.
+
+        """
+
+        with self.client.pipeline(transaction=False) as pipe:
+            for cache_item in cache_items:
+                pipe.set(
+                    self._key(cache_item.key),
+                    self._dumps(cache_item),
+                    px=self._ttl_ms(cache_item),
+                )
+            pipe.execute()
+
+    def get_item(self, key):
+        """Get the value stored in the cache.
+
+        Parameters
+        ----------
+        key : str
+            Key to retrieve the value.
+
+        Returns
+        -------
+        any
+            Value stored in the cache.
+
+        """
+
+        return self._loads(key, self.client.get(self._key(key)))
+
+    def get_items(self, keys):
+        """Get many items from the cache with a single round trip.
+
+        Parameters
+        ----------
+        keys : List[str]
+            Keys to retrieve.
+
+        Returns
+        -------
+        List[CacheItem | None]
+            Items in the same order as keys, None for missing ones.
+
+        """
+
+        if not keys:
+            return []
+        data = self.client.mget([self._key(k) for k in keys])
+        return [self._loads(k, d) for k, d in zip(keys, data)]
+
+    def get_value(self, key):
+        """Get the value stored in the cache.
+
+        Parameters
+        ----------
+        key : str
+            Key to retrieve the value.
+
+        Returns
+        -------
+        any
+            Value stored in the cache.
+
+        """
+
+        cache_item = self.get_item(key)
+        if cache_item:
+            return cache_item.value
+        return None
+
+    def delete(self, key):
+        """Delete a key-value pair from the cache.
+
+        Parameters
+        ----------
+        key : str
+            Key to delete the value.
+
+        """
+
+        self.client.delete(self._key(key))
@@ -46,6 +46,12 @@ class MessageWhy(BaseModelDict):
     model_interactions : List[Union[LLMModelInteraction, EmbedderModelInteraction]]
         A list of interactions with language or embedding models, detailing how models were used in generating 
         or understanding the message context.
+    plugin_timings : List[dict]
+        Durations of the plugins hooks, tools and forms run to produce the message,
+        only present when plugins profiling is enabled (and included in answers).
+    trace : List[dict]
+        Timed stages (spans) of the conversation turn, only present when tracing is enabled
+        (and included in answers).
     """
 
     input: str
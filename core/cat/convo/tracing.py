@@ -0,0 +1,216 @@
+import json
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+import httpx
+from pydantic import BaseModel, Field
+
+from cat.env import get_env
+from cat.log import log, correlation_id
+
+
+class Span(BaseModel):
+    """
+    A timed stage of a conversation turn (e.g. recall, agent execution, a hook).
+
+    Attributes
+    ----------
+    name : str
+        Name of the stage.
+    trace_id : str
+        Id of the conversation turn the span belongs to.
+    span_id : str
+        Unique identifier of the span.
+    parent_id : Optional[str]
+        Id of the enclosing span, None for the turn itself.
+    start_time : float
+        The timestamp when the stage started.
+    end_time : Optional[float]
+        The timestamp when the stage ended, None while it is running.
+    attributes : Dict
+        Additional data about the stage.
+    error : bool
+        Whether the stage raised an exception.
+    """
+
+    name: str
+    trace_id: str
+    span_id: str = Field(default_factory=lambda: uuid.uuid4().hex[:16])
+    parent_id: Optional[str] = None
+    start_time: float = Field(default_factory=lambda: time.time())
+    end_time: Optional[float] = None
+    attributes: Dict = {}
+    error: bool = False
+
+
+class Trace:
+    """Spans of a conversation turn, all sharing the turn id (also used as correlation id in logs)."""
+
+    def __init__(self):
+        self.trace_id = uuid.uuid4().hex
+        self.spans: List[Span] = []
+
+
+# trace and span running in the current context (copied into threadpool calls and asyncio tasks)
+current_trace: ContextVar[Optional[Trace]] = ContextVar("current_trace", default=None)
+current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """Time the enclosed block as a stage of the current turn. Does nothing outside a traced turn.
+
+    Examples
+    --------
+    >>> with span("recall", k=3):
+    ...     memories = recall()
+    """
+
+    trace = current_trace.get()
+    if trace is None:
+        yield None
+        return
+
+    parent = current_span.get()
+    new_span = Span(
+        name=name,
+        trace_id=trace.trace_id,
+        parent_id=parent.span_id if parent else None,
+        attributes=attributes,
+    )
+    trace.spans.append(new_span)
+
+    token = current_span.set(new_span)
+    try:
+        yield new_span
+    except BaseException:
+        new_span.error = True
+        raise
+    finally:
+        new_span.end_time = time.time()
+        current_span.reset(token)
+
+
+def to_otlp(spans: List[Span], service_name: str = "cheshire-cat") -> Dict:
+    """Convert spans to the OpenTelemetry (OTLP/JSON) traces format, as accepted by collectors on `/v1/traces`."""
+
+    def otlp_value(value):
+        if isinstance(value, bool):
+            return {"boolValue": value}
+        if isinstance(value, int):
+            return {"intValue": str(value)}
+        if isinstance(value, float):
+            return {"doubleValue": value}
+        return {"stringValue": str(value)}
+
+    def otlp_attributes(attributes):
+        return [{"key": k, "value": otlp_value(v)} for k, v in attributes.items()]
+
+    otlp_spans = []
+    for s in spans:
+        otlp_span = {
+            "traceId": s.trace_id,
+            "spanId": s.span_id,
+            "name": s.name,
+            "kind": 1,  # SPAN_KIND_INTERNAL
+            "startTimeUnixNano": str(int(s.start_time * 1e9)),
+            "endTimeUnixNano": str(int((s.end_time or s.start_time) * 1e9)),
+            "attributes": otlp_attributes(s.attributes),
+            "status": {"code": 2 if s.error else 1},  # STATUS_CODE_ERROR / STATUS_CODE_OK
+        }
+        if s.parent_id:
+            otlp_span["parentSpanId"] = s.parent_id
+        otlp_spans.append(otlp_span)
+
+    return {
+        "resourceSpans": [
+            {
+                "resource": {"attributes": otlp_attributes({"service.name": service_name})},
+                "scopeSpans": [{"scope": {"name": "cat"}, "spans": otlp_spans}],
+            }
+        ]
+    }
+
+
+class Tracer:
+    """Traces conversation turns, splitting them in timed stages (spans).
+
+    Finished traces can be attached to the Cat's answers (`MessageWhy.trace`),
+    appended to a local file (one OTLP/JSON document per line)
+    and sent to an OpenTelemetry collector. Exports run in a background thread.
+
+    Attributes
+    ----------
+    enabled : bool
+        Whether turns are traced.
+    include_in_why : bool
+        Whether spans are attached to the Cat's answers.
+    export_file : Optional[str]
+        File where traces are appended.
+    otlp_endpoint : Optional[str]
+        OTLP/HTTP traces endpoint of a collector (e.g. `http://collector:4318/v1/traces`).
+    """
+
+    def __init__(
+        self,
+        enabled: bool = None,
+        include_in_why: bool = None,
+        export_file: str = None,
+        otlp_endpoint: str = None,
+    ):
+        if enabled is None:
+            enabled = get_env("CCAT_TRACING") == "true"
+        if include_in_why is None:
+            include_in_why = get_env("CCAT_TRACING_WHY") == "true"
+
+        self.enabled = enabled
+        self.include_in_why = include_in_why
+        self.export_file = export_file or get_env("CCAT_TRACING_EXPORT_FILE")
+        self.otlp_endpoint = otlp_endpoint or get_env("CCAT_TRACING_OTLP_ENDPOINT")
+
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="cat_tracing")
+
+    @contextmanager
+    def trace(self, name: str, **attributes):
+        """Trace the enclosed block as a new turn, yielding the `Trace` (None if tracing is disabled)."""
+
+        if not self.enabled:
+            yield None
+            return
+
+        trace = Trace()
+        trace_token = current_trace.set(trace)
+        span_token = current_span.set(None)
+        correlation_token = correlation_id.set(trace.trace_id)
+        try:
+            with span(name, **attributes):
+                yield trace
+        finally:
+            correlation_id.reset(correlation_token)
+            current_span.reset(span_token)
+            current_trace.reset(trace_token)
+            self.export(trace)
+
+    def export(self, trace: Trace):
+        """Send a finished trace to the configured destinations, without waiting."""
+
+        if self.export_file or self.otlp_endpoint:
+            self._executor.submit(self._export, to_otlp(trace.spans))
+
+    def _export(self, payload: Dict):
+        if self.export_file:
+            try:
+                with open(self.export_file, "a") as f:
+                    f.write(json.dumps(payload) + "\n")
+            except Exception as e:
+                log.warning(f"Could not write trace to {self.export_file}: {e}")
+
+        if self.otlp_endpoint:
+            try:
+                httpx.post(self.otlp_endpoint, json=payload, timeout=5).raise_for_status()
+            except Exception as e:
+                log.warning(f"Could not send trace to {self.otlp_endpoint}: {e}")
@@ -24,7 +24,29 @@ def get_supported_env_variables():
         "CCAT_CORS_ENABLED": "true",
         "CCAT_CACHE_TYPE": "in_memory",
         "CCAT_CACHE_DIR": "/tmp",
+        "CCAT_CACHE_MAX_ITEMS": "100",
+        "CCAT_CACHE_MAX_BYTES": None,
+        "CCAT_CACHE_REDIS_URL": "redis://localhost:6379/0",
         "CCAT_QDRANT_CLIENT_TIMEOUT": None,
+        "CCAT_RECALL_THREADS": "40",
+        "CCAT_RABBIT_HOLE_BATCH_SIZE": "32",
+        "CCAT_RABBIT_HOLE_BATCH_TOKENS": "8000",
+        "CCAT_EMBEDDER_CACHE_MAX_BYTES": "50000000",
+        "CCAT_EMBEDDER_CACHE_DIR": None,
+        "CCAT_EMBEDDER_CACHE_MAX_DISK_BYTES": "500000000",
+        "CCAT_EMBEDDER_BATCH_WINDOW_MS": "0",
+        "CCAT_EMBEDDER_BATCH_MAX_SIZE": "64",
+        "CCAT_INGESTION_JOBS_DIR": "cat/data/ingestion_jobs",
+        "CCAT_INGESTION_WORKERS": "2",
+        "CCAT_INGESTION_MAX_JOBS_PER_USER": "1",
+        "CCAT_WS_MAX_PENDING_MESSAGES": "256",
+        "CCAT_WS_TOKEN_COALESCE_MS": "0",
+        "CCAT_PLUGINS_PROFILING": "false",
+        "CCAT_PLUGINS_PROFILING_WHY": "false",
+        "CCAT_TRACING": "false",
+        "CCAT_TRACING_WHY": "false",
+        "CCAT_TRACING_EXPORT_FILE": None,
+        "CCAT_TRACING_OTLP_ENDPOINT": None,
     }
 
 
@@ -39,6 +39,13 @@ class CatForm:  # base model of forms
     def cat(self):
         return self._cat
 
+    def __getstate__(self):
+        # the cat is not serialized with the form (i.e. when working memory is cached),
+        #  it is given back to the form when working memory is loaded
+        state = self.__dict__.copy()
+        state["_cat"] = None
+        return state
+
     def model_getter(self):
         return self.model_class
 
@@ -1,13 +1,31 @@
 import re
 import os
-import string
 import json
+import time
+import queue
+import string
+import asyncio
+import hashlib
+import weakref
+import threading
+import itertools
+import multiprocessing
+from array import array
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
 from typing import List
 from itertools import combinations
+from concurrent.futures import Future, ThreadPoolExecutor, ProcessPoolExecutor
 from sklearn.feature_extraction.text import CountVectorizer
 from langchain_core.embeddings import Embeddings
 import httpx
 
+from cat.cache.cache_item import CacheItem
+from cat.cache.in_memory_cache import InMemoryCache
+from cat.cache.file_system_cache import FileSystemCache
+from cat import metrics
+from cat.log import log
+
 
 class DumbEmbedder(Embeddings):
     """Default Dumb Embedder.
@@ -47,40 +65,646 @@ class DumbEmbedder(Embeddings):
         return self.embed_documents([text])[0]
 
 
+def _close_http_clients(client: httpx.Client, async_clients: weakref.WeakKeyDictionary):
+    client.close()
+    # async clients are closed in their loop, those of stopped loops are released with it
+    for loop, async_client in list(async_clients.items()):
+        if loop.is_running():
+            asyncio.run_coroutine_threadsafe(async_client.aclose(), loop)
+    async_clients.clear()
+
+
+class EmbeddingsHTTPClient:
+    """HTTP client of embedders served over an API, shared by all their requests.
+
+    Connections are pooled and kept alive between requests, and at most `max_connections` requests
+    are in flight at the same time (the others wait for a free connection).
+    Requests failing with a connection error, a 429 or a 5xx status are retried with exponential backoff,
+    honoring the `Retry-After` header (seconds or HTTP date).
+    Connections are closed by `close`, or when the client is garbage collected.
+
+    Parameters
+    ----------
+    timeout : float
+        Seconds to wait for each response (the first request can load the model on the server).
+    max_connections : int
+        Maximum number of concurrent requests.
+    max_retries : int
+        Retries of a failed request.
+    backoff : float
+        Seconds before the first retry, doubled at each retry.
+    transport : httpx.BaseTransport, optional
+        Transport of the sync client, the async client uses its async counterpart if any.
+    """
+
+    RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+    # upper bound for delays requested by the server
+    MAX_RETRY_AFTER = 60
+
+    def __init__(
+        self,
+        timeout: float = 120,
+        max_connections: int = 8,
+        max_retries: int = 3,
+        backoff: float = 0.5,
+        transport=None,
+    ):
+        self.max_retries = max_retries
+        self.backoff = backoff
+        # no pool timeout: waiting for a free connection is what bounds concurrency
+        self.timeout = httpx.Timeout(timeout, connect=10, pool=None)
+        self.limits = httpx.Limits(
+            max_connections=max_connections, max_keepalive_connections=max_connections
+        )
+        self.transport = transport
+        self.client = httpx.Client(timeout=self.timeout, limits=self.limits, transport=transport)
+        # async clients are bound to the event loop they are first used in
+        self._async_clients = weakref.WeakKeyDictionary()
+        self._finalizer = weakref.finalize(self, _close_http_clients, self.client, self._async_clients)
+
+    def close(self):
+        """Close the connections of the client."""
+        self._finalizer()
+
+    @property
+    def async_client(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        client = self._async_clients.get(loop)
+        if client is None:
+            transport = self.transport if isinstance(self.transport, httpx.AsyncBaseTransport) else None
+            client = httpx.AsyncClient(timeout=self.timeout, limits=self.limits, transport=transport)
+            self._async_clients[loop] = client
+        return client
+
+    def _retry_delay(self, attempt: int, response: httpx.Response = None) -> float:
+        retry_after = response.headers.get("Retry-After", "").strip() if response is not None else ""
+        if retry_after.isdigit():
+            return min(float(retry_after), self.MAX_RETRY_AFTER)
+        if retry_after:
+            try:
+                retry_at = parsedate_to_datetime(retry_after)
+            except (TypeError, ValueError):
+                log.warning(f"Invalid Retry-After header: {retry_after}")
+            else:
+                if retry_at.tzinfo is None:
+                    retry_at = retry_at.replace(tzinfo=timezone.utc)
+                delay = (retry_at - datetime.now(timezone.utc)).total_seconds()
+                return min(max(delay, 0), self.MAX_RETRY_AFTER)
+        return self.backoff * 2**attempt
+
+    def _should_retry(self, attempt: int, url: str, response: httpx.Response = None, error: Exception = None):
+        if attempt >= self.max_retries:
+            return False
+        if error is not None:
+            log.warning(f"Embedding request to {url} failed ({error!r}), retrying")
+            return True
+        if response.status_code in self.RETRY_STATUS_CODES:
+            log.warning(f"Embedding request to {url} failed (status {response.status_code}), retrying")
+            return True
+        return False
+
+    def post(self, url: str, payload: dict) -> dict:
+        """Send a JSON payload and return the JSON response."""
+
+        for attempt in itertools.count():
+            try:
+                response = self.client.post(url, json=payload)
+            except httpx.TransportError as e:
+                if not self._should_retry(attempt, url, error=e):
+                    raise
+                time.sleep(self._retry_delay(attempt))
+                continue
+            if not self._should_retry(attempt, url, response=response):
+                response.raise_for_status()
+                return response.json()
+            time.sleep(self._retry_delay(attempt, response))
+
+    async def apost(self, url: str, payload: dict) -> dict:
+        """Async version of `post`."""
+
+        for attempt in itertools.count():
+            try:
+                response = await self.async_client.post(url, json=payload)
+            except httpx.TransportError as e:
+                if not self._should_retry(attempt, url, error=e):
+                    raise
+                await asyncio.sleep(self._retry_delay(attempt))
+                continue
+            if not self._should_retry(attempt, url, response=response):
+                response.raise_for_status()
+                return response.json()
+            await asyncio.sleep(self._retry_delay(attempt, response))
+
+
 class CustomOpenAIEmbeddings(Embeddings):
     """Use LLAMA2 as embedder by calling a self-hosted lama-cpp-python instance."""
 
-    def __init__(self, url):
+    def __init__(self, url, http_client: EmbeddingsHTTPClient = None):
         self.url = os.path.join(url, "v1/embeddings")
+        self.http_client = http_client or EmbeddingsHTTPClient()
 
     def embed_documents(self, texts: List[str]) -> List[List[float]]:
-        payload = json.dumps({"input": texts})
-        ret = httpx.post(self.url, data=payload, timeout=None)
-        ret.raise_for_status()
-        return [e["embedding"] for e in ret.json()["data"]]
+        response = self.http_client.post(self.url, {"input": texts})
+        return [e["embedding"] for e in response["data"]]
 
     def embed_query(self, text: str) -> List[float]:
-        payload = json.dumps({"input": text})
-        ret = httpx.post(self.url, data=payload, timeout=None)
-        ret.raise_for_status()
-        return ret.json()["data"][0]["embedding"]
+        response = self.http_client.post(self.url, {"input": text})
+        return response["data"][0]["embedding"]
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        response = await self.http_client.apost(self.url, {"input": texts})
+        return [e["embedding"] for e in response["data"]]
+
+    async def aembed_query(self, text: str) -> List[float]:
+        response = await self.http_client.apost(self.url, {"input": text})
+        return response["data"][0]["embedding"]
 
 
 class CustomOllamaEmbeddings(Embeddings):
     """Use Ollama to serve embedding models."""
 
-    def __init__(self, base_url, model):
+    def __init__(self, base_url, model, http_client: EmbeddingsHTTPClient = None):
         self.url = os.path.join(base_url, "api/embed")
         self.model = model
+        self.http_client = http_client or EmbeddingsHTTPClient()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        response = self.http_client.post(self.url, {"model": self.model, "input": texts})
+        return response["embeddings"]
+
+    def embed_query(self, text: str) -> List[float]:
+        response = self.http_client.post(self.url, {"model": self.model, "input": text})
+        return response["embeddings"][0]
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        response = await self.http_client.apost(self.url, {"model": self.model, "input": texts})
+        return response["embeddings"]
+
+    async def aembed_query(self, text: str) -> List[float]:
+        response = await self.http_client.apost(self.url, {"model": self.model, "input": text})
+        return response["embeddings"][0]
+
+
+class EmbedderWrapper(Embeddings):
+    """Base class of embedders adding a behaviour to another embedder.
+
+    Attributes of the wrapped embedder (e.g. `model`) are exposed by the wrapper,
+    its class is given by `embedder_class`.
+    """
+
+    def __init__(self, embedder: Embeddings):
+        self.embedder = embedder
+
+    def __getattr__(self, name):
+        # called only for attributes not found on the wrapper
+        if name == "embedder":
+            raise AttributeError(name)
+        return getattr(self.embedder, name)
+
+    # async methods of the wrapped embedder are used, instead of running the sync ones in a thread
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        return await self.embedder.aembed_documents(texts)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return await self.embedder.aembed_query(text)
+
+
+class CachedEmbedder(EmbedderWrapper):
+    """Embedder wrapper caching the embeddings of another embedder.
+
+    Embeddings are stored under a hash of the wrapped embedder identity and the text,
+    so identical texts are embedded only once. The cache is bounded (least recently used embeddings
+    are dropped when the byte budget is exceeded) and can be persisted on disk to survive restarts,
+    with a budget of its own.
+    Query and document embeddings are cached separately, as some embedders compute them differently.
+
+    Parameters
+    ----------
+    embedder : Embeddings
+        Embedder to wrap.
+    max_bytes : int
+        Memory budget for cached embeddings.
+    cache_dir : str | None
+        Directory to persist embeddings. None keeps them only in memory.
+    max_disk_bytes : int
+        Disk budget for persisted embeddings.
+    """
+
+    def __init__(
+        self,
+        embedder: Embeddings,
+        max_bytes: int = 50_000_000,
+        cache_dir: str | None = None,
+        max_disk_bytes: int = 500_000_000,
+    ):
+        super().__init__(embedder)
+        self.namespace = self.embedder_identity(embedder)
+        self.memory_cache = InMemoryCache(max_items=None, max_bytes=max_bytes)
+        self.disk_cache = None
+        if cache_dir:
+            # embeddings read from disk are kept in the memory cache
+            self.disk_cache = FileSystemCache(cache_dir, max_loaded_items=0, max_bytes=max_disk_bytes)
+
+    @staticmethod
+    def embedder_identity(embedder: Embeddings) -> str:
+        """Class and settings of the embedder, so that vectors cached on disk by another embedder
+        (e.g. another model, or the same class on another url) are never used."""
+
+        # class of wrapped embedders, if any
+        wrapped_class = embedder_class(embedder)
+        embedder = unwrap_embedder(embedder)
+
+        # public settings (e.g. model, url, model_kwargs); clients, secrets and collected data are left out
+        settings = {}
+        for name, value in sorted(getattr(embedder, "__dict__", {}).items()):
+            if name.startswith("_") or not isinstance(value, (str, int, float, bool, dict)):
+                continue
+            try:
+                settings[name] = json.dumps(value, sort_keys=True)
+            except (TypeError, ValueError):
+                continue
+
+        settings_hash = hashlib.sha256(json.dumps(settings).encode()).hexdigest()[:16]
+        return f"{wrapped_class.__module__}.{wrapped_class.__qualname__}:{settings_hash}"
+
+    def _key(self, kind: str, text: str) -> str:
+        return hashlib.sha256(f"{self.namespace}\0{kind}\0{text}".encode()).hexdigest()
+
+    def _get(self, key):
+        vector = self.memory_cache.get_value(key)
+        if vector is None and self.disk_cache:
+            vector = self.disk_cache.get_value(key)
+            if vector is not None:
+                self.memory_cache.insert(CacheItem(key, vector))
+        return vector
+
+    def _set(self, key, embedding):
+        # arrays of doubles are much smaller than lists of python floats, and exact
+        vector = array("d", embedding)
+        self.memory_cache.insert(CacheItem(key, vector))
+        if self.disk_cache:
+            self.disk_cache.insert(CacheItem(key, vector))
+
+    def _lookup_documents(self, texts: List[str]):
+        keys = [self._key("document", t) for t in texts]
+        vectors = [self._get(k) for k in keys]
+
+        # texts to embed, each one once even if repeated
+        missing = {}
+        for text, key, vector in zip(texts, keys, vectors):
+            if vector is None:
+                missing[key] = text
+        return keys, vectors, missing
+
+    def _merge_documents(self, keys, vectors, missing, embeddings) -> List[List[float]]:
+        new_vectors = {}
+        for key, embedding in zip(missing.keys(), embeddings):
+            self._set(key, embedding)
+            new_vectors[key] = embedding
+
+        return [
+            list(v) if v is not None else list(new_vectors[k])
+            for k, v in zip(keys, vectors)
+        ]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embed a list of text, only texts not in cache are sent to the wrapped embedder."""
+
+        keys, vectors, missing = self._lookup_documents(texts)
+        embeddings = []
+        if missing:
+            embeddings = self.embedder.embed_documents(list(missing.values()))
+        return self._merge_documents(keys, vectors, missing, embeddings)
+
+    def embed_query(self, text: str) -> List[float]:
+        """Embed a string of text, using the cached embedding if available."""
+
+        key = self._key("query", text)
+        vector = self._get(key)
+        if vector is None:
+            embedding = self.embedder.embed_query(text)
+            self._set(key, embedding)
+            return list(embedding)
+        return list(vector)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Async version of `embed_documents`, texts not in cache are sent to the wrapped embedder async methods."""
+
+        keys, vectors, missing = self._lookup_documents(texts)
+        embeddings = []
+        if missing:
+            embeddings = await self.embedder.aembed_documents(list(missing.values()))
+        return self._merge_documents(keys, vectors, missing, embeddings)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        """Async version of `embed_query`."""
+
+        key = self._key("query", text)
+        vector = self._get(key)
+        if vector is None:
+            embedding = await self.embedder.aembed_query(text)
+            self._set(key, embedding)
+            return list(embedding)
+        return list(vector)
+
+
+class _EmbeddingRequest:
+    def __init__(self, texts: List[str]):
+        self.texts = texts
+        self.future = Future()
+        self.enqueued_at = time.perf_counter()
+
+
+class BatchingEmbedder(EmbedderWrapper):
+    """Embedder wrapper merging concurrent requests in a single `embed_documents` call.
+
+    Requests from concurrent sessions and ingestion workers are collected for a small time window,
+    or until the batch is full, then embedded together and the results handed back to each caller.
+    Queries are batched only for embedders embedding queries and documents in the same way,
+    the others get queries embedded one by one as usual.
+    Requests larger than a batch are sent as they are.
+
+    Parameters
+    ----------
+    embedder : Embeddings
+        Embedder to wrap.
+    window : float
+        Seconds to wait for more requests after the first one of a batch.
+    max_batch_size : int
+        Maximum number of texts in a batch.
+    max_concurrent_batches : int
+        Batches being embedded at the same time, while the next one is collected.
+    """
+
+    # embed_query is embed_documents on a single text
+    QUERY_AS_DOCUMENT_EMBEDDERS = (
+        "DumbEmbedder",
+        "CustomOpenAIEmbeddings",
+        "CustomOllamaEmbeddings",
+        "OpenAIEmbeddings",
+        "AzureOpenAIEmbeddings",
+    )
+
+    # seconds without requests before the dispatcher thread stops (it restarts on demand)
+    IDLE_TIMEOUT = 30
+
+    def __init__(
+        self,
+        embedder: Embeddings,
+        window: float = 0.005,
+        max_batch_size: int = 64,
+        max_concurrent_batches: int = 4,
+    ):
+        super().__init__(embedder)
+        self.window = window
+        self.max_batch_size = max(1, max_batch_size)
+        self.batch_queries = embeds_query_as_document(embedder)
+
+        self._queue = queue.Queue()
+        self._dispatcher = None
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_concurrent_batches, thread_name_prefix="embedder_batch"
+        )
+        # threads are stopped when the embedder is replaced
+        #   (the dispatcher and running batches hold the embedder, so it is idle by then)
+        weakref.finalize(self, self._executor.shutdown, wait=False)
 
     def embed_documents(self, texts: List[str]) -> List[List[float]]:
-        payload = json.dumps({"model": self.model , "input": texts})
-        ret = httpx.post(self.url, data=payload, timeout=None)
-        ret.raise_for_status()
-        return ret.json()["embeddings"]
+        """Embed a list of text, together with texts of concurrent requests."""
+
+        if not texts:
+            return []
+        if len(texts) >= self.max_batch_size:
+            return self.embedder.embed_documents(texts)
+        return self._submit(texts)
 
     def embed_query(self, text: str) -> List[float]:
-        payload = json.dumps({"model": self.model , "input": text})
-        ret = httpx.post(self.url, data=payload, timeout=None)
-        ret.raise_for_status()
-        return ret.json()["embeddings"][0]
+        """Embed a string of text, together with texts of concurrent requests if the embedder allows it."""
+
+        if not self.batch_queries:
+            return self.embedder.embed_query(text)
+        return self._submit([text])[0]
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Async version of `embed_documents`, waiting for the batch without holding a thread."""
+
+        if not texts:
+            return []
+        if len(texts) >= self.max_batch_size:
+            return await self.embedder.aembed_documents(texts)
+        return await asyncio.wrap_future(self._enqueue(texts))
+
+    async def aembed_query(self, text: str) -> List[float]:
+        """Async version of `embed_query`, waiting for the batch without holding a thread."""
+
+        if not self.batch_queries:
+            return await self.embedder.aembed_query(text)
+        return (await asyncio.wrap_future(self._enqueue([text])))[0]
+
+    def _submit(self, texts: List[str]) -> List[List[float]]:
+        return self._enqueue(texts).result()
+
+    def _enqueue(self, texts: List[str]) -> Future:
+        request = _EmbeddingRequest(texts)
+        with self._lock:
+            self._queue.put(request)
+            if self._dispatcher is None:
+                self._dispatcher = threading.Thread(
+                    target=self._dispatch, name="embedder_dispatcher", daemon=True
+                )
+                self._dispatcher.start()
+        return request.future
+
+    def _dispatch(self):
+        # request not fitting in the previous batch, first of the next one
+        carry = None
+        while True:
+            batch = []
+            try:
+                if carry is not None:
+                    first, carry = carry, None
+                else:
+                    # the lock prevents requests from being left in the queue of a stopping dispatcher
+                    try:
+                        first = self._queue.get(timeout=self.IDLE_TIMEOUT)
+                    except queue.Empty:
+                        with self._lock:
+                            if self._queue.empty():
+                                self._dispatcher = None
+                                return
+                        continue
+
+                batch.append(first)
+                size = len(first.texts)
+                deadline = time.perf_counter() + self.window
+                while size < self.max_batch_size:
+                    timeout = deadline - time.perf_counter()
+                    if timeout <= 0:
+                        break
+                    try:
+                        request = self._queue.get(timeout=timeout)
+                    except queue.Empty:
+                        break
+                    if size + len(request.texts) > self.max_batch_size:
+                        carry = request
+                        break
+                    batch.append(request)
+                    size += len(request.texts)
+
+                self._executor.submit(self._embed_batch, batch)
+            except Exception as e:
+                # waiting requests fail instead of waiting forever, the next request starts a new dispatcher
+                log.error(f"Embedder batching stopped: {e}")
+                with self._lock:
+                    self._dispatcher = None
+                    pending = batch + ([carry] if carry is not None else [])
+                    while not self._queue.empty():
+                        pending.append(self._queue.get_nowait())
+                for request in pending:
+                    if not request.future.done():
+                        request.future.set_exception(e)
+                return
+
+    def _embed_batch(self, batch: List[_EmbeddingRequest]):
+        start_time = time.perf_counter()
+        for request in batch:
+            metrics.EMBEDDER_BATCH_QUEUE_WAIT.observe(start_time - request.enqueued_at)
+
+        # identical texts (e.g. the same question from many users) are embedded once
+        unique_texts = list(dict.fromkeys(t for request in batch for t in request.texts))
+        metrics.EMBEDDER_BATCH_SIZE.observe(len(unique_texts))
+
+        try:
+            embeddings = dict(zip(unique_texts, self.embedder.embed_documents(unique_texts)))
+        except Exception as e:
+            for request in batch:
+                request.future.set_exception(e)
+            return
+
+        for request in batch:
+            request.future.set_result([embeddings[t] for t in request.texts])
+
+
+def unwrap_embedder(embedder: Embeddings) -> Embeddings:
+    """Embedder wrapped by embedder wrappers, if any."""
+    while isinstance(embedder, EmbedderWrapper):
+        embedder = embedder.embedder
+    return embedder
+
+
+def embedder_class(embedder: Embeddings) -> type:
+    """Class of the embedder doing the work, through wrappers and worker processes."""
+    embedder = unwrap_embedder(embedder)
+    if isinstance(embedder, ProcessPoolEmbedder):
+        return embedder.embedder_class
+    return type(embedder)
+
+
+def embedder_name(embedder: Embeddings) -> str:
+    """Class name of the embedder doing the work (e.g. the embedder of memory exports)."""
+    return embedder_class(embedder).__name__
+
+
+def embeds_query_as_document(embedder: Embeddings) -> bool:
+    """Whether the embedder gives a text the same vector as a query and as a document."""
+    return embedder_name(embedder) in BatchingEmbedder.QUERY_AS_DOCUMENT_EMBEDDERS
+
+
+# embedder of a ProcessPoolEmbedder worker process, loaded once by the process initializer
+_worker_embedder = None
+
+
+def _load_worker_embedder(embedder_class, embedder_config):
+    global _worker_embedder
+    _worker_embedder = embedder_class(**embedder_config)
+
+
+def _worker_ready() -> bool:
+    return _worker_embedder is not None
+
+
+def _worker_embed_documents(texts: List[str]) -> List[List[float]]:
+    return _worker_embedder.embed_documents(texts)
+
+
+def _worker_embed_query(text: str) -> List[float]:
+    return _worker_embedder.embed_query(text)
+
+
+class ProcessPoolEmbedder(Embeddings):
+    """Embedder running a local model in a pool of worker processes.
+
+    Each process loads the model once, then embeds batches of texts sent to it,
+    so inference runs in parallel on all the cores and outside the process serving requests.
+    Documents are split in batches of `batch_size` texts, embedded concurrently by the workers.
+    The async methods wait for the workers without blocking the event loop.
+
+    The configuration of the embedder in the workers (e.g. `model_name`) is exposed by the pool,
+    its class is given by `embedder_class`.
+
+    Parameters
+    ----------
+    embedder_class : type
+        Embedder instantiated in each worker process.
+    embedder_config : dict
+        Arguments to instantiate the embedder.
+    processes : int
+        Number of worker processes.
+    batch_size : int
+        Maximum number of texts sent to a worker at once.
+    """
+
+    def __init__(self, embedder_class, embedder_config: dict, processes: int = 2, batch_size: int = 32):
+        self.embedder_class = embedder_class
+        self.embedder_config = embedder_config
+        self.processes = max(1, processes)
+        self.batch_size = max(1, batch_size)
+
+        # spawned, as forking a process running threads (and ONNX runtime) is unsafe
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.processes,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_load_worker_embedder,
+            initargs=(embedder_class, embedder_config),
+        )
+        # workers are stopped when the embedder is replaced
+        weakref.finalize(self, self._executor.shutdown, wait=False, cancel_futures=True)
+
+        # fail here if the model cannot be loaded (raises BrokenProcessPool)
+        self._executor.submit(_worker_ready).result()
+
+    def __getattr__(self, name):
+        # called only for attributes not found on the pool
+        if name == "embedder_config":
+            raise AttributeError(name)
+        try:
+            return self.embedder_config[name]
+        except KeyError:
+            raise AttributeError(name)
+
+    def _submit_documents(self, texts: List[str]) -> List[Future]:
+        return [
+            self._executor.submit(_worker_embed_documents, texts[i : i + self.batch_size])
+            for i in range(0, len(texts), self.batch_size)
+        ]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embed a list of text, in batches distributed across the worker processes."""
+
+        futures = self._submit_documents(texts)
+        return [embedding for future in futures for embedding in future.result()]
+
+    def embed_query(self, text: str) -> List[float]:
+        """Embed a string of text in a worker process."""
+        return self._executor.submit(_worker_embed_query, text).result()
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        futures = self._submit_documents(texts)
+        batches = await asyncio.gather(*[asyncio.wrap_future(f) for f in futures])
+        return [embedding for batch in batches for embedding in batch]
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return await asyncio.wrap_future(self._executor.submit(_worker_embed_query, text))
@@ -6,7 +6,12 @@ from langchain_community.embeddings import FakeEmbeddings, FastEmbedEmbeddings
 from langchain_openai import OpenAIEmbeddings, AzureOpenAIEmbeddings
 from langchain_google_genai import GoogleGenerativeAIEmbeddings
 from fastembed import TextEmbedding
-from cat.factory.custom_embedder import DumbEmbedder, CustomOpenAIEmbeddings, CustomOllamaEmbeddings
+from cat.factory.custom_embedder import (
+    DumbEmbedder,
+    CustomOpenAIEmbeddings,
+    CustomOllamaEmbeddings,
+    ProcessPoolEmbedder,
+)
 from cat.mad_hatter.mad_hatter import MadHatter
 from langchain_cohere import CohereEmbeddings
 
@@ -147,9 +152,28 @@ class EmbedderQdrantFastEmbedConfig(EmbedderSettings):
     # as suggest on fastembed documentation, "passage" is the best option for documents.
     doc_embed_type: str = "passage"
     cache_dir: str = "cat/data/models/fast_embed"
+    # worker processes running the model, each with its own copy. 0 runs it in the Cat process.
+    processes: int = 0
+    # texts sent to a worker process at once
+    batch_size: int = 32
 
     _pyclass: Type = FastEmbedEmbeddings
 
+    @classmethod
+    def get_embedder_from_config(cls, config):
+        config = dict(config)
+        processes = config.pop("processes", 0)
+        batch_size = config.pop("batch_size", 32)
+        if processes > 0:
+            # one ONNX thread per worker, parallelism comes from the processes
+            return ProcessPoolEmbedder(
+                FastEmbedEmbeddings,
+                {**config, "threads": 1},
+                processes=processes,
+                batch_size=batch_size,
+            )
+        return super().get_embedder_from_config(config)
+
     model_config = ConfigDict(
         json_schema_extra={
             "humanReadableName": "Qdrant FastEmbed (Local)",
@@ -0,0 +1,518 @@
+import os
+import json
+import time
+import uuid
+import socket
+import sqlite3
+import threading
+from enum import Enum
+from contextlib import contextmanager
+from typing import Dict, List
+
+from pydantic import BaseModel
+from starlette.datastructures import UploadFile
+
+from cat.auth.permissions import AuthUserInfo
+from cat.env import get_env
+from cat.utils import spool_upload_file
+from cat.log import log
+
+
+class JobState(str, Enum):
+    QUEUED = "queued"
+    PARSING = "parsing"
+    SPLITTING = "splitting"
+    EMBEDDING = "embedding"
+    STORING = "storing"
+    DONE = "done"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+
+RUNNING_STATES = (JobState.PARSING, JobState.SPLITTING, JobState.EMBEDDING, JobState.STORING)
+FINISHED_STATES = (JobState.DONE, JobState.FAILED, JobState.CANCELLED)
+
+
+class IngestionCancelled(Exception):
+    """Raised in the job being ingested when it is cancelled."""
+
+
+class IngestionInterrupted(Exception):
+    """Raised in the job being ingested when the queue shuts down, the job is resumed at the next start."""
+
+
+class IngestionJob(BaseModel):
+    id: str
+    user_id: str
+    source: str
+    state: JobState
+    error: str | None = None
+    chunks_done: int = 0
+    chunks_total: int | None = None
+    # chunks embedded and stored per second
+    throughput: float | None = None
+    created_at: float
+    started_at: float | None = None
+    finished_at: float | None = None
+
+
+class IngestionQueue:
+    """Persistent queue of documents to ingest in the declarative memory, run by a pool of worker threads.
+
+    Jobs are stored in a SQLite database, together with the uploaded files, so they survive restarts:
+    jobs interrupted while running are queued again, and chunks they already stored are removed before they resume.
+    The ids of the points stored by a job are kept in the database until the job is done,
+    to remove its chunks if it does not complete.
+
+    At most `workers` jobs run at the same time, and at most `max_jobs_per_user` for each user,
+    on threads of their own so big uploads do not take the threads serving requests.
+    A running job can be cancelled between two batches of chunks, chunks it already stored are removed.
+
+    Many processes (e.g. uvicorn workers) can share the jobs folder. Each job is claimed by one of them
+    in a single write transaction, and its owner updates a heartbeat while it runs:
+    only jobs whose heartbeat stopped (their process stopped) are queued again.
+
+    Parameters
+    ----------
+    folder : str
+        Folder of the jobs database and of the uploaded files.
+    workers : int
+        Jobs running at the same time.
+    max_jobs_per_user : int
+        Jobs running at the same time for each user.
+    """
+
+    # finished jobs are removed after a week
+    FINISHED_JOBS_RETENTION = 7 * 24 * 60 * 60
+    # seconds between heartbeats of running jobs, and without heartbeats before a job is queued again
+    HEARTBEAT_INTERVAL = 10
+    STALE_AFTER = 60
+    # seconds between checks for jobs queued by other processes
+    POLL_INTERVAL = 2
+
+    def __init__(self, folder: str, workers: int = 2, max_jobs_per_user: int = 1):
+        self.folder = folder
+        # absolute, like the paths of uploads stored in jobs
+        self.uploads_folder = os.path.abspath(os.path.join(folder, "uploads"))
+        os.makedirs(self.uploads_folder, exist_ok=True)
+
+        self.workers = max(1, workers)
+        self.max_jobs_per_user = max(1, max_jobs_per_user)
+
+        # the connection is shared by the threads, its lock serializes its use.
+        #   Transactions are explicit (see `_transaction`), other processes wait for them up to `timeout`
+        self._db = sqlite3.connect(
+            os.path.join(folder, "jobs.db"), check_same_thread=False, timeout=30, isolation_level=None
+        )
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            """CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                user_id TEXT NOT NULL,
+                user_data TEXT NOT NULL,
+                source TEXT NOT NULL,
+                path TEXT,
+                options TEXT NOT NULL,
+                state TEXT NOT NULL,
+                error TEXT,
+                chunks_done INTEGER NOT NULL DEFAULT 0,
+                chunks_total INTEGER,
+                resumed INTEGER NOT NULL DEFAULT 0,
+                cancel_requested INTEGER NOT NULL DEFAULT 0,
+                owner TEXT,
+                heartbeat_at REAL,
+                created_at REAL NOT NULL,
+                started_at REAL,
+                embedding_started_at REAL,
+                updated_at REAL,
+                finished_at REAL
+            )"""
+        )
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS points (job_id TEXT NOT NULL, point_id TEXT NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS points_job_id ON points (job_id)")
+
+        # this queue, among the ones of all processes sharing the folder
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+        self._db_lock = threading.Lock()
+        # wakes the workers up, `_changes` counts the notifications they could miss while looking for jobs
+        self._condition = threading.Condition()
+        self._changes = 0
+        self._threads = []
+        self._stopping = threading.Event()
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            folder=get_env("CCAT_INGESTION_JOBS_DIR"),
+            workers=int(get_env("CCAT_INGESTION_WORKERS")),
+            max_jobs_per_user=int(get_env("CCAT_INGESTION_MAX_JOBS_PER_USER")),
+        )
+
+    @contextmanager
+    def _transaction(self):
+        # the write lock is taken at once: concurrent writers wait for it,
+        #   instead of failing when their reads are outdated by another process
+        with self._db_lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._db
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+            self._db.execute("COMMIT")
+
+    def _execute(self, query: str, parameters=()) -> List[sqlite3.Row]:
+        with self._transaction() as db:
+            return db.execute(query, parameters).fetchall()
+
+    def _read(self, query: str, parameters=()) -> List[sqlite3.Row]:
+        with self._db_lock:
+            return self._db.execute(query, parameters).fetchall()
+
+    def _notify(self):
+        with self._condition:
+            self._changes += 1
+            self._condition.notify_all()
+
+    @staticmethod
+    def _to_job(row: sqlite3.Row) -> IngestionJob:
+        throughput = None
+        if row["embedding_started_at"] and row["chunks_done"]:
+            end = row["finished_at"] or row["updated_at"]
+            if end > row["embedding_started_at"]:
+                throughput = row["chunks_done"] / (end - row["embedding_started_at"])
+
+        return IngestionJob(
+            id=row["id"],
+            user_id=row["user_id"],
+            source=row["source"],
+            state=row["state"],
+            error=row["error"],
+            chunks_done=row["chunks_done"],
+            chunks_total=row["chunks_total"],
+            throughput=throughput,
+            created_at=row["created_at"],
+            started_at=row["started_at"],
+            finished_at=row["finished_at"],
+        )
+
+    def _submit(
+        self, job_id: str, user_data: AuthUserInfo, source: str, path: str | None, options: Dict
+    ) -> IngestionJob:
+        self._execute(
+            "INSERT INTO jobs (id, user_id, user_data, source, path, options, state, created_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                job_id,
+                user_data.name,  # same user id of the StrayCat
+                user_data.model_dump_json(),
+                source,
+                path,
+                json.dumps(options),
+                JobState.QUEUED.value,
+                time.time(),
+            ),
+        )
+        self._notify()
+        log.info(f"Queued ingestion job {job_id} for {source}")
+        return self.get(job_id)
+
+    def submit_file(
+        self,
+        user_data: AuthUserInfo,
+        file: UploadFile,
+        chunk_size: int | None = None,
+        chunk_overlap: int | None = None,
+        metadata: Dict = {},
+    ) -> IngestionJob:
+        """Queue an uploaded file. The file is copied in the jobs folder, piece by piece."""
+
+        job_id = str(uuid.uuid4())
+        spooled = spool_upload_file(file, dir=self.uploads_folder, prefix=f"{job_id}_", delete=False)
+        spooled.file.close()
+        path = spooled.file.name
+
+        options = {"chunk_size": chunk_size, "chunk_overlap": chunk_overlap, "metadata": metadata}
+        return self._submit(job_id, user_data, file.filename, path, options)
+
+    def submit_url(
+        self,
+        user_data: AuthUserInfo,
+        url: str,
+        chunk_size: int | None = None,
+        chunk_overlap: int | None = None,
+        metadata: Dict = {},
+    ) -> IngestionJob:
+        """Queue a web page."""
+
+        options = {"chunk_size": chunk_size, "chunk_overlap": chunk_overlap, "metadata": metadata}
+        return self._submit(str(uuid.uuid4()), user_data, url, None, options)
+
+    def get(self, job_id: str) -> IngestionJob | None:
+        rows = self._read("SELECT * FROM jobs WHERE id = ?", (job_id,))
+        return self._to_job(rows[0]) if rows else None
+
+    def list(self, user_id: str | None = None) -> List[IngestionJob]:
+        """Jobs of a user (all jobs if None), most recent first."""
+
+        if user_id is None:
+            rows = self._read("SELECT * FROM jobs ORDER BY created_at DESC")
+        else:
+            rows = self._read(
+                "SELECT * FROM jobs WHERE user_id = ? ORDER BY created_at DESC", (user_id,)
+            )
+        return [self._to_job(row) for row in rows]
+
+    def cancel(self, job_id: str) -> IngestionJob | None:
+        """Cancel a job. Queued jobs are cancelled at once, running ones (in any process) at their next batch of chunks."""
+
+        if self._finish(job_id, JobState.CANCELLED, queued=True):
+            # chunks stored before an interruption
+            self._delete_points(job_id)
+        else:
+            self._execute(
+                f"UPDATE jobs SET cancel_requested = 1 WHERE id = ? AND state IN ({', '.join('?' * len(RUNNING_STATES))})",
+                (job_id, *[s.value for s in RUNNING_STATES]),
+            )
+        return self.get(job_id)
+
+    def start(self):
+        """Start the workers, resuming jobs interrupted by a restart."""
+
+        now = time.time()
+        self._execute(
+            f"DELETE FROM jobs WHERE state IN ({', '.join('?' * len(FINISHED_STATES))}) AND finished_at < ?",
+            (*[s.value for s in FINISHED_STATES], now - self.FINISHED_JOBS_RETENTION),
+        )
+        self._execute("DELETE FROM points WHERE job_id NOT IN (SELECT id FROM jobs)")
+        # uploads of jobs that no longer exist (e.g. the Cat stopped during the upload),
+        #   recent ones may be still written by another process
+        paths = {row["path"] for row in self._read("SELECT path FROM jobs WHERE path IS NOT NULL")}
+        for file_name in os.listdir(self.uploads_folder):
+            path = os.path.join(self.uploads_folder, file_name)
+            if path not in paths and os.path.getmtime(path) < now - self.STALE_AFTER:
+                os.remove(path)
+
+        self._recover_stale_jobs()
+
+        self._stopping.clear()
+        self._threads.append(
+            threading.Thread(target=self._heartbeat, name="ingestion_heartbeat", daemon=True)
+        )
+        for w in range(self.workers):
+            self._threads.append(
+                threading.Thread(target=self._work, name=f"ingestion_worker_{w}", daemon=True)
+            )
+        for thread in self._threads:
+            thread.start()
+
+    def shutdown(self, timeout: float = 30):
+        """Stop the workers. Running jobs are interrupted and resumed at the next start."""
+
+        with self._condition:
+            self._stopping.set()
+            self._condition.notify_all()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def _recover_stale_jobs(self):
+        # jobs left running by a stopped process (here or elsewhere) are queued again
+        resumed = self._execute(
+            f"UPDATE jobs SET state = ?, resumed = 1, chunks_done = 0, embedding_started_at = NULL, owner = NULL "
+            f"WHERE state IN ({', '.join('?' * len(RUNNING_STATES))}) "
+            f"AND (heartbeat_at IS NULL OR heartbeat_at < ?) RETURNING id",
+            (JobState.QUEUED.value, *[s.value for s in RUNNING_STATES], time.time() - self.STALE_AFTER),
+        )
+        if resumed:
+            log.info(f"Resuming {len(resumed)} interrupted ingestion jobs")
+            self._notify()
+
+    def _heartbeat(self):
+        while not self._stopping.wait(self.HEARTBEAT_INTERVAL):
+            try:
+                self._execute(
+                    f"UPDATE jobs SET heartbeat_at = ? WHERE owner = ? "
+                    f"AND state IN ({', '.join('?' * len(RUNNING_STATES))})",
+                    (time.time(), self.owner, *[s.value for s in RUNNING_STATES]),
+                )
+                self._recover_stale_jobs()
+            except Exception as e:
+                log.error(f"Ingestion jobs heartbeat failed: {e}")
+
+    def _next_job(self) -> sqlite3.Row | None:
+        # oldest queued job of a user below the limit of running jobs, claimed in the same statement
+        running = ", ".join("?" * len(RUNNING_STATES))
+        now = time.time()
+        rows = self._execute(
+            f"""UPDATE jobs SET state = ?, started_at = ?, updated_at = ?, heartbeat_at = ?, owner = ?
+                WHERE id = (
+                    SELECT id FROM jobs WHERE state = ? AND user_id NOT IN (
+                        SELECT user_id FROM jobs WHERE state IN ({running})
+                        GROUP BY user_id HAVING COUNT(*) >= ?
+                    ) ORDER BY created_at, rowid LIMIT 1
+                ) RETURNING *""",
+            (
+                JobState.PARSING.value, now, now, now, self.owner,
+                JobState.QUEUED.value, *[s.value for s in RUNNING_STATES], self.max_jobs_per_user,
+            ),
+        )
+        return rows[0] if rows else None
+
+    def _work(self):
+        while True:
+            row = None
+            while not self._stopping.is_set():
+                with self._condition:
+                    changes = self._changes
+                row = self._next_job()
+                if row is not None:
+                    break
+                # jobs queued in this process wake the workers up, the ones of other processes are polled
+                with self._condition:
+                    self._condition.wait_for(
+                        lambda: self._changes != changes or self._stopping.is_set(), self.POLL_INTERVAL
+                    )
+            if self._stopping.is_set():
+                return
+
+            try:
+                self._run(row)
+            except Exception as e:
+                # the worker survives whatever happens to a job
+                log.error(f"Ingestion job {row['id']} could not be completed: {e}")
+            finally:
+                self._notify()
+
+    def _progress(self, job_id: str):
+        def progress(
+            state: str,
+            chunks_done: int | None = None,
+            chunks_total: int | None = None,
+            point_ids: List[str] = [],
+        ):
+            now = time.time()
+            with self._transaction() as db:
+                rows = db.execute(
+                    "UPDATE jobs SET state = ?, updated_at = ?, heartbeat_at = ?, "
+                    "chunks_done = COALESCE(?, chunks_done), chunks_total = COALESCE(?, chunks_total), "
+                    "embedding_started_at = COALESCE(embedding_started_at, CASE WHEN ? = ? THEN ? END) "
+                    "WHERE id = ? AND owner = ? RETURNING cancel_requested",
+                    (
+                        JobState(state).value, now, now, chunks_done, chunks_total,
+                        JobState(state).value, JobState.EMBEDDING.value, now, job_id, self.owner,
+                    ),
+                ).fetchall()
+                if rows:
+                    db.executemany(
+                        "INSERT INTO points (job_id, point_id) VALUES (?, ?)",
+                        [(job_id, str(point_id)) for point_id in point_ids],
+                    )
+
+            if not rows:
+                # queued again by another process, after a too long pause: its points are not tracked anymore
+                if point_ids:
+                    self._declarative_memory().delete_points(list(point_ids))
+                raise IngestionInterrupted()
+            # the points of the last batch are tracked, they are removed when the job resumes
+            if self._stopping.is_set():
+                raise IngestionInterrupted()
+            if rows[0]["cancel_requested"]:
+                raise IngestionCancelled()
+
+        return progress
+
+    @staticmethod
+    def _declarative_memory():
+        # imported here, as the Cat imports this module
+        from cat.looking_glass.cheshire_cat import CheshireCat
+
+        return CheshireCat().memory.vectors.declarative
+
+    def _delete_points(self, job_id: str):
+        """Remove the chunks stored by a job that did not complete."""
+
+        point_ids = [row["point_id"] for row in self._read("SELECT point_id FROM points WHERE job_id = ?", (job_id,))]
+        if point_ids:
+            self._declarative_memory().delete_points(point_ids)
+        self._execute("DELETE FROM points WHERE job_id = ?", (job_id,))
+
+    def _finish(self, job_id: str, state: JobState, error: str | None = None, queued: bool = False) -> bool:
+        """Finish a job running in this queue, or a queued job. Returns False if the job is in neither state."""
+
+        if queued:
+            condition, parameters = "state = ?", (JobState.QUEUED.value,)
+        else:
+            running = ", ".join("?" * len(RUNNING_STATES))
+            condition, parameters = f"owner = ? AND state IN ({running})", (self.owner, *[s.value for s in RUNNING_STATES])
+
+        with self._transaction() as db:
+            rows = db.execute(
+                f"SELECT path FROM jobs WHERE id = ? AND {condition}", (job_id, *parameters)
+            ).fetchall()
+            # finished jobs own no files, uploads left by a crash before their removal are removed by `start`
+            db.execute(
+                f"UPDATE jobs SET state = ?, error = ?, finished_at = ?, path = NULL WHERE id = ? AND {condition}",
+                (state.value, error, time.time(), job_id, *parameters),
+            )
+            # chunks of completed jobs are not removed anymore
+            if rows and state == JobState.DONE:
+                db.execute("DELETE FROM points WHERE job_id = ?", (job_id,))
+        if rows and rows[0]["path"] and os.path.exists(rows[0]["path"]):
+            os.remove(rows[0]["path"])
+        return bool(rows)
+
+    def _run(self, row: sqlite3.Row):
+        # imported here, as the Cat imports this module
+        from cat.looking_glass.cheshire_cat import CheshireCat
+        from cat.looking_glass.stray_cat import StrayCat
+
+        ccat = CheshireCat()
+        job_id = row["id"]
+        options = json.loads(row["options"])
+        if row["resumed"]:
+            self._delete_points(job_id)
+
+        log.info(f"Running ingestion job {job_id} for {row['source']}")
+        stray = StrayCat(AuthUserInfo(**json.loads(row["user_data"])))
+        file = row["source"]
+        if row["path"]:
+            file = UploadFile(filename=row["source"], file=open(row["path"], "rb"))
+        try:
+            ccat.rabbit_hole.ingest_file(
+                stray,
+                file,
+                chunk_size=options["chunk_size"],
+                chunk_overlap=options["chunk_overlap"],
+                metadata=options["metadata"],
+                progress=self._progress(job_id),
+            )
+        except IngestionInterrupted:
+            log.info(f"Ingestion job {job_id} interrupted, it will be resumed")
+            self._execute(
+                "UPDATE jobs SET state = ?, resumed = 1, chunks_done = 0, embedding_started_at = NULL, owner = NULL "
+                "WHERE id = ? AND owner = ?",
+                (JobState.QUEUED.value, job_id, self.owner),
+            )
+            return
+        except IngestionCancelled:
+            log.info(f"Ingestion job {job_id} cancelled")
+            # the job may be owned by another process meanwhile, with points of its own
+            if self._finish(job_id, JobState.CANCELLED):
+                self._delete_points(job_id)
+            return
+        except Exception as e:
+            log.error(f"Ingestion job {job_id} failed: {e}")
+            if self._finish(job_id, JobState.FAILED, error=str(e)):
+                self._delete_points(job_id)
+            return
+        finally:
+            if row["path"]:
+                file.file.close()
+
+        self._finish(job_id, JobState.DONE)
+        log.info(f"Ingestion job {job_id} done")
@@ -4,12 +4,17 @@ import logging
 import sys
 import json
 import traceback
+from contextvars import ContextVar
 from pprint import pformat
 from loguru import logger
 
 from cat.env import get_env
 
 
+# id of the conversation turn being served, shown in log lines (set by the tracer)
+correlation_id: ContextVar[str | None] = ContextVar("correlation_id", default=None)
+
+
 def get_log_level():
     """Return the global LOG level."""
     return get_env("CCAT_LOG_LEVEL")
@@ -68,23 +73,37 @@ class CatLogEngine:
         -------
         """
 
-        level = "<level>{level}:</level>"
-        # time = "<green>[{time:YYYY-MM-DD HH:mm:ss.SSS}]</green>"
-        # origin = "<level>{extra[original_name]}.{extra[original_class]}.{extra[original_caller]}::{extra[original_line]}</level>"
-        message = "<level>{message}</level>"
-        log_format = f"{level}\t{message}"
-
         logger.remove()
         logger.add(
             sys.stdout,
             level=self.LOG_LEVEL,
             colorize=True,
-            format=log_format,
+            format=self.log_format,
             # backtrace=True,
             # diagnose=True,
             filter=self.show_log_level,
         )
 
+    def log_format(self, record):
+        """Format of log lines, with the correlation id of the current turn (if any).
+
+        Parameters
+        ----------
+        record : dict
+
+        Returns
+        -------
+        str
+
+        """
+        level = "<level>{level}:</level>"
+        # time = "<green>[{time:YYYY-MM-DD HH:mm:ss.SSS}]</green>"
+        # origin = "<level>{extra[original_name]}.{extra[original_class]}.{extra[original_caller]}::{extra[original_line]}</level>"
+        message = "<level>{message}</level>"
+        if "correlation_id" in record["extra"]:
+            message = "<dim>[{extra[correlation_id]}]</dim> " + message
+        return f"{level}\t{message}\n{{exception}}"
+
     def __call__(self, msg, level="DEBUG"):
         """Alias of self.log()"""
         self.log(msg, level)
@@ -139,9 +158,11 @@ class CatLogEngine:
             msg = pformat(msg)
 
         # actual log
+        current_correlation_id = correlation_id.get()
+        bound_logger = logger.bind(correlation_id=current_correlation_id) if current_correlation_id else logger
         lines = msg.split("\n")
         for line in lines:
-            logger.log(level, line)
+            bound_logger.log(level, line)
 
     def welcome(self):
         """Welcome message in the terminal."""
@@ -1,14 +1,20 @@
 import time
 from typing import Any, Dict, List
-from langchain.callbacks.base import BaseCallbackHandler
+from langchain.callbacks.base import BaseCallbackHandler, AsyncCallbackHandler
 from langchain_core.outputs.llm_result import LLMResult
 import tiktoken
 
 from cat.convo.model_interactions import LLMModelInteraction
+from cat import metrics
 from cat.log import log
 
 
 class NewTokenHandler(BaseCallbackHandler):
+
+    # in async runs, call the handler in the event loop instead of a thread per token
+    #   (sending a token only enqueues it)
+    run_inline = True
+
     def __init__(self, cat):
         # cat could be an instance of CheshireCat or StrayCat
         self.cat = cat
@@ -17,11 +23,26 @@ class NewTokenHandler(BaseCallbackHandler):
         self.cat.send_ws_message(token, msg_type="chat_token")
 
 
+class AsyncNewTokenHandler(AsyncCallbackHandler):
+    """Token streaming for async runs: tokens are sent from the event loop,
+    waiting for a slow client instead of piling up in the connection queue."""
+
+    def __init__(self, cat):
+        # a StrayCat
+        self.cat = cat
+
+    async def on_llm_new_token(self, token: str, **kwargs) -> None:
+        await self.cat.asend_ws_message(token, msg_type="chat_token")
+
+
 class ModelInteractionHandler(BaseCallbackHandler):
     """
     Langchain callback handler for tracking model interactions.
     """
 
+    # in async runs, call the handler in the event loop (it only updates working memory)
+    run_inline = True
+
     def __init__(self, cat, source: str):
         self.cat = cat
         self.cat.working_memory.model_interactions.append(
@@ -73,6 +94,13 @@ class ModelInteractionHandler(BaseCallbackHandler):
         self.last_interaction.reply = response.generations[0][0].text
         self.last_interaction.ended_at = time.time()
 
+        interaction = self.last_interaction
+        metrics.LLM_DURATION.labels(source=interaction.source).observe(
+            interaction.ended_at - interaction.started_at
+        )
+        metrics.LLM_INPUT_TOKENS.labels(source=interaction.source).inc(interaction.input_tokens)
+        metrics.LLM_OUTPUT_TOKENS.labels(source=interaction.source).inc(interaction.output_tokens)
+
     @property
     def last_interaction(self) -> LLMModelInteraction:
         return self.cat.working_memory.model_interactions[-1]
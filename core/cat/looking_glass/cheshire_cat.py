@@ -1,4 +1,5 @@
 import time
+import hashlib
 from typing import List, Dict
 from typing_extensions import Protocol
 
@@ -16,6 +17,7 @@ from cat.factory.custom_auth_handler import CoreAuthHandler
 import cat.factory.auth_handler as auth_handlers
 from cat.db import crud, models
 from cat.factory.embedder import get_embedder_from_name
+from cat.factory.custom_embedder import CachedEmbedder, BatchingEmbedder, unwrap_embedder
 import cat.factory.embedder as embedders
 from cat.factory.llm import LLMDefaultConfig
 from cat.factory.llm import get_llm_from_name
@@ -24,10 +26,14 @@ from cat.looking_glass.white_rabbit import WhiteRabbit
 from cat.log import log
 from cat.mad_hatter.mad_hatter import MadHatter
 from cat.memory.long_term_memory import LongTermMemory
+from cat.memory.vector_memory import PROCEDURES_MANIFEST
 from cat.rabbit_hole import RabbitHole
+from cat.ingestion_queue import IngestionQueue
 from cat.utils import singleton
 from cat import utils
 from cat.cache.cache_manager import CacheManager
+from cat.convo.tracing import Tracer
+from cat.env import get_env
 
 
 class Procedure(Protocol):
@@ -99,9 +105,20 @@ class CheshireCat:
         # Rabbit Hole Instance
         self.rabbit_hole = RabbitHole(self)  # :(
 
+        # Documents waiting to go down the Rabbit Hole (workers are started with the app)
+        self.ingestion_queue = IngestionQueue.from_env()
+
+        # Tracing of conversation turns
+        self.tracer = Tracer()
+
         # Cache for sessions / working memories et al.
         self.cache = CacheManager().cache
 
+        # Expired cache items are swept in background, not only when they are read
+        self.white_rabbit.schedule_interval_job(
+            self.cache.delete_expired, job_id="cache_delete_expired", minutes=10
+        )
+
         # allows plugins to do something after the cat bootstrap is complete
         self.mad_hatter.execute_hook("after_cat_bootstrap", cat=self)
 
@@ -124,6 +141,25 @@ class CheshireCat:
         self._llm = self.load_language_model()
         self.embedder = self.load_language_embedder()
 
+        # concurrent requests are embedded together
+        embedder_batch_window_ms = int(get_env("CCAT_EMBEDDER_BATCH_WINDOW_MS"))
+        if embedder_batch_window_ms > 0:
+            self.embedder = BatchingEmbedder(
+                self.embedder,
+                window=embedder_batch_window_ms / 1000,
+                max_batch_size=int(get_env("CCAT_EMBEDDER_BATCH_MAX_SIZE")),
+            )
+
+        # repeated texts are embedded only once
+        embedder_cache_max_bytes = int(get_env("CCAT_EMBEDDER_CACHE_MAX_BYTES"))
+        if embedder_cache_max_bytes > 0:
+            self.embedder = CachedEmbedder(
+                self.embedder,
+                max_bytes=embedder_cache_max_bytes,
+                cache_dir=get_env("CCAT_EMBEDDER_CACHE_DIR"),
+                max_disk_bytes=int(get_env("CCAT_EMBEDDER_CACHE_MAX_DISK_BYTES")),
+            )
+
     def load_language_model(self) -> BaseLanguageModel:
         """Large Language Model (LLM) selection at bootstrap time.
 
@@ -286,14 +322,19 @@ class CheshireCat:
         """Load LongTerMemory and WorkingMemory."""
         # Memory
 
+        # turns still holding the old memory must not search a copy of procedures that may be deleted
+        if getattr(self, "memory", None) is not None:
+            self.memory.vectors.drop_procedural_index()
+
         # Get embedder size (langchain classes do not store it)
         embedder_size = len(self.embedder.embed_query("hello world"))
 
-        # Get embedder name (useful for for vectorstore aliases)
-        if hasattr(self.embedder, "model"):
-            embedder_name = self.embedder.model
-        elif hasattr(self.embedder, "repo_id"):
-            embedder_name = self.embedder.repo_id
+        # Get embedder name (useful for for vectorstore aliases), from the embedder behind wrappers
+        embedder = unwrap_embedder(self.embedder)
+        if hasattr(embedder, "model"):
+            embedder_name = embedder.model
+        elif hasattr(embedder, "repo_id"):
+            embedder_name = embedder.repo_id
         else:
             embedder_name = "default_embedder"
 
@@ -342,18 +383,48 @@ class CheshireCat:
             if endpoint.plugin_id in self.mad_hatter.active_plugins:
                 endpoint.activate(self.fastapi_app)
 
+    def build_procedures_manifest(self, active_procedures_hashes):
+        # fingerprint of the triggers embedded by a sync
+        digest = hashlib.sha256()
+        for p_hash in sorted(active_procedures_hashes):
+            digest.update(p_hash.encode())
+            digest.update(b"\0")
+        return {"digest": digest.hexdigest(), "points": len(active_procedures_hashes)}
+
     def embed_procedures(self):
-        # Retrieve from vectorDB all procedural embeddings
-        embedded_procedures, _ = self.memory.vectors.procedural.get_all_points()
-        embedded_procedures_hashes = self.build_embedded_procedures_hashes(
-            embedded_procedures
-        )
+        """Sync procedural memory with the triggers of active tools and forms.
+
+        Only the difference is applied: triggers no longer active are deleted,
+        new ones are embedded in a batch and upserted in bulk.
+        A manifest of the synced triggers is saved in the settings, so when plugins are unchanged
+        (e.g. on restart) procedural memory is not even scrolled.
+        At the end, the in RAM index used to recall procedures is built again if needed.
+        """
+
+        procedural = self.memory.vectors.procedural
 
         # Easy access to active procedures in mad_hatter (source of truth!)
         active_procedures_hashes = self.build_active_procedures_hashes(
             self.mad_hatter.procedures
         )
 
+        # same triggers as the last sync, and the collection was not changed since
+        manifest = self.build_procedures_manifest(active_procedures_hashes)
+        saved_manifest = crud.get_setting_by_name(name=PROCEDURES_MANIFEST)
+        if (
+            saved_manifest is not None
+            and saved_manifest["value"] == manifest
+            and procedural.count_points() == manifest["points"]
+        ):
+            log.debug("Procedural triggers are up to date")
+            self.memory.vectors.refresh_procedural_index()
+            return
+
+        # Retrieve from vectorDB all procedural triggers, without vectors
+        embedded_procedures_hashes = self.build_embedded_procedures_hashes(
+            procedural.scroll_points()
+        )
+
         # points_to_be_kept     = set(active_procedures_hashes.keys()) and set(embedded_procedures_hashes.keys()) not necessary
         points_to_be_deleted = set(embedded_procedures_hashes.keys()) - set(
             active_procedures_hashes.keys()
@@ -366,37 +437,45 @@ class CheshireCat:
             embedded_procedures_hashes[p] for p in points_to_be_deleted
         ]
         if points_to_be_deleted_ids:
-            log.info("Deleting procedural triggers:")
-            log.info(points_to_be_deleted)
-            self.memory.vectors.procedural.delete_points(points_to_be_deleted_ids)
+            log.info(f"Deleting {len(points_to_be_deleted_ids)} procedural triggers")
+            log.debug(points_to_be_deleted)
+            procedural.delete_points(points_to_be_deleted_ids)
 
         active_triggers_to_be_embedded = [
             active_procedures_hashes[p] for p in points_to_be_embedded
         ]
         
         if active_triggers_to_be_embedded:
-            log.info("Embedding new procedural triggers:")
-        for t in active_triggers_to_be_embedded:
-
-
-            metadata = {
-                "source": t["source"],
-                "type": t["type"],
-                "trigger_type": t["trigger_type"],
-                "when": time.time(),
-            }
-
-            trigger_embedding = self.embedder.embed_documents([t["content"]])
-            self.memory.vectors.procedural.add_point(
-                t["content"],
-                trigger_embedding[0],
-                metadata,
-            )
+            log.info(f"Embedding {len(active_triggers_to_be_embedded)} new procedural triggers")
+            for t in active_triggers_to_be_embedded:
+                log.debug(
+                    f" {t['source']}.{t['trigger_type']}.{t['content']}"
+                )
 
-            log.info(
-                f" {t['source']}.{t['trigger_type']}.{t['content']}"
+            triggers_embeddings = self.embedder.embed_documents(
+                [t["content"] for t in active_triggers_to_be_embedded]
+            )
+            procedural.add_points(
+                contents=[t["content"] for t in active_triggers_to_be_embedded],
+                vectors=triggers_embeddings,
+                metadata=[
+                    {
+                        "source": t["source"],
+                        "type": t["type"],
+                        "trigger_type": t["trigger_type"],
+                        "when": time.time(),
+                    }
+                    for t in active_triggers_to_be_embedded
+                ],
             )
 
+        crud.upsert_setting_by_name(
+            models.Setting(name=PROCEDURES_MANIFEST, value=manifest)
+        )
+
+        # procedural memory is recalled from a copy in RAM
+        self.memory.vectors.refresh_procedural_index()
+
     def send_ws_message(self, content: str, msg_type="notification"):
         log.error("CheshireCat has no websocket connection. Call `send_ws_message` from a StrayCat instance.")
 
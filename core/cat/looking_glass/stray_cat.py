@@ -1,10 +1,10 @@
 import time
-import asyncio
 import tiktoken
 
 from typing import Literal, get_args, List, Dict, Union, Any
 
 from websockets.exceptions import ConnectionClosedOK
+from fastapi.concurrency import run_in_threadpool
 
 from langchain.docstore.document import Document
 from langchain_core.messages import BaseMessage, HumanMessage
@@ -16,9 +16,12 @@ from cat.auth.permissions import AuthUserInfo
 from cat.looking_glass.cheshire_cat import CheshireCat
 from cat.looking_glass.callbacks import NewTokenHandler, ModelInteractionHandler
 from cat.memory.working_memory import WorkingMemory
+from cat.factory.custom_embedder import embeds_query_as_document
 from cat.convo.messages import CatMessage, UserMessage, MessageWhy, EmbedderModelInteraction
 from cat.agents import AgentOutput
 from cat.cache.cache_item import CacheItem
+from cat.convo.tracing import span
+from cat import metrics
 from cat import utils
 from cat.log import log
 
@@ -73,21 +76,41 @@ class StrayCat:
     def __repr__(self):
         return f"StrayCat(user_id={self.user_id}, user_name={self.user_data.name})"
 
-    def __send_ws_json(self, data: Any):
-        # Run the corutine in the main event loop in the main thread
-        # and wait for the result
-
+    def __get_ws_sender(self):
         app = CheshireCat().fastapi_app
         ws_manager = app.state.websocket_manager
-        ws_connection = ws_manager.get_connection(self.user_id)
-        if not ws_connection:
+        ws_sender = ws_manager.get_sender(self.user_id)
+        if not ws_sender:
             log.debug(f"No websocket connection is open for user {self.user_id}")
-            return
+        return ws_sender
+
+    def __send_ws_json(self, data: Any):
+        # Enqueue the message in the connection outbound queue,
+        # it is sent by the main event loop without blocking this thread
+
+        ws_sender = self.__get_ws_sender()
+        if ws_sender:
+            ws_sender.send_json(data)
+
+    async def __asend_ws_json(self, data: Any):
+        # Same as __send_ws_json, from the event loop: waits if the client is slow
+
+        ws_sender = self.__get_ws_sender()
+        if ws_sender:
+            await ws_sender.asend_json(data)
+
+    @staticmethod
+    def __ws_message(content: str | dict, msg_type: MSG_TYPES) -> dict:
+        options = get_args(MSG_TYPES)
 
-        asyncio.run_coroutine_threadsafe(
-            ws_connection.send_json(data),
-            app.state.event_loop,
-        ).result()
+        if msg_type not in options:
+            raise ValueError(
+                f"The message type `{msg_type}` is not valid. Valid types: {', '.join(options)}"
+            )
+
+        if msg_type == "error":
+            return {"type": msg_type, "name": "GenericError", "description": str(content)}
+        return {"type": msg_type, "content": content}
 
     def __build_why(self) -> MessageWhy:
         # build data structure for output (response and why with memories)
@@ -116,6 +139,8 @@ class StrayCat:
             },
             model_interactions=self.working_memory.model_interactions,
         )
+        if self.mad_hatter.profiler.include_in_why:
+            why.plugin_timings = self.working_memory.plugin_timings
 
         return why
     
@@ -125,6 +150,10 @@ class StrayCat:
         self.working_memory = \
             self.cache.get_value(f"{self.user_id}_working_memory") or WorkingMemory()
 
+        # cached forms lose their cat when serialized
+        if self.working_memory.active_form:
+            self.working_memory.active_form._cat = self
+
     def update_working_memory_cache(self):
         """Update the working memory in the cache."""
 
@@ -159,19 +188,19 @@ class StrayCat:
         >>> cat.send_ws_message({"What day it is?": "It's my unbirthday"})
         """
 
-        options = get_args(MSG_TYPES)
+        self.__send_ws_json(self.__ws_message(content, msg_type))
 
-        if msg_type not in options:
-            raise ValueError(
-                f"The message type `{msg_type}` is not valid. Valid types: {', '.join(options)}"
-            )
+    async def asend_ws_message(self, content: str | dict, msg_type: MSG_TYPES = "notification"):
+        """Async version of `send_ws_message`, to be used in the event loop.
 
-        if msg_type == "error":
-            self.__send_ws_json(
-                {"type": msg_type, "name": "GenericError", "description": str(content)}
-            )
-        else:
-            self.__send_ws_json({"type": msg_type, "content": content})
+        If the client reads slowly and too many messages are pending, it waits for them to be sent.
+
+        Examples
+        --------
+        >>> await cat.asend_ws_message("Hello, I'm a notification!")
+        """
+
+        await self.__asend_ws_json(self.__ws_message(content, msg_type))
 
     def send_chat_message(self, message: str | CatMessage, save=False):
         """Sends a chat message to the user using the active WebSocket connection.  
@@ -286,6 +315,60 @@ class StrayCat:
         after_cat_recalls_memories
         """
 
+        with span("recall"):
+            recall_query = self.__recall_query(query)
+
+            # Embed recall query
+            with span("recall.embed_query"):
+                start_time = time.perf_counter()
+                recall_query_embedding = self.embedder.embed_query(recall_query)
+                metrics.EMBEDDER_DURATION.labels(source="recall").observe(time.perf_counter() - start_time)
+
+            recall_configs = self.__recall_configs(
+                recall_query, recall_query_embedding, utils.get_caller_info(skip=1)
+            )
+
+            # recall relevant memories for all collections concurrently
+            recalled_memories = self.memory.vectors.recall_memories_from_embeddings(
+                recall_configs
+            )
+
+            self.__store_recalled_memories(recalled_memories)
+
+    async def arecall_relevant_memories_to_working_memory(self, query=None):
+        """Async version of `recall_relevant_memories_to_working_memory`.
+
+        Hooks run in the threadpool, while the embedder and the vector memory are awaited.
+
+        Parameters
+        ----------
+        query : str, optional
+            The query used to make a similarity search in the Cat's vector memories.
+            If not provided, the query will be derived from the last user's message.
+        """
+
+        with span("recall"):
+            recall_query = await run_in_threadpool(self.__recall_query, query)
+
+            with span("recall.embed_query"):
+                start_time = time.perf_counter()
+                recall_query_embedding = await self.embedder.aembed_query(recall_query)
+                metrics.EMBEDDER_DURATION.labels(source="recall").observe(time.perf_counter() - start_time)
+
+            recall_configs = await run_in_threadpool(
+                self.__recall_configs,
+                recall_query,
+                recall_query_embedding,
+                utils.get_caller_info(skip=1),
+            )
+
+            recalled_memories = await self.memory.vectors.arecall_memories_from_embeddings(
+                recall_configs
+            )
+
+            await run_in_threadpool(self.__store_recalled_memories, recalled_memories)
+
+    def __recall_query(self, query):
         recall_query = query
 
         if query is None:
@@ -298,19 +381,21 @@ class StrayCat:
         )
         log.info(f"Recall query: '{recall_query}'")
 
-        # Embed recall query
-        recall_query_embedding = self.embedder.embed_query(recall_query)
+        return recall_query
+
+    def __recall_configs(self, recall_query, recall_query_embedding, source):
         self.working_memory.recall_query = recall_query
+        self.working_memory.recall_query_embedding = recall_query_embedding
 
         # keep track of embedder model usage
-        self.working_memory.model_interactions.append(
-            EmbedderModelInteraction(
-                prompt=[recall_query],
-                source=utils.get_caller_info(skip=1),
-                reply=recall_query_embedding, # TODO: should we avoid storing the embedding?
-                input_tokens=len(tiktoken.get_encoding("cl100k_base").encode(recall_query)),
-            )
+        embedder_interaction = EmbedderModelInteraction(
+            prompt=[recall_query],
+            source=source,
+            reply=recall_query_embedding, # TODO: should we avoid storing the embedding?
+            input_tokens=len(tiktoken.get_encoding("cl100k_base").encode(recall_query)),
         )
+        self.working_memory.model_interactions.append(embedder_interaction)
+        metrics.EMBEDDER_INPUT_TOKENS.labels(source="recall").inc(embedder_interaction.input_tokens)
 
         # hook to do something before recall begins
         self.mad_hatter.execute_hook("before_cat_recalls_memories", cat=self)
@@ -321,6 +406,7 @@ class StrayCat:
             "embedding": recall_query_embedding,
             "k": 3,
             "threshold": 0.7,
+            "with_vectors": False,
             "metadata": {"source": self.user_id},
         }
 
@@ -328,6 +414,7 @@ class StrayCat:
             "embedding": recall_query_embedding,
             "k": 3,
             "threshold": 0.7,
+            "with_vectors": False,
             "metadata": {},
         }
 
@@ -335,6 +422,7 @@ class StrayCat:
             "embedding": recall_query_embedding,
             "k": 3,
             "threshold": 0.7,
+            "with_vectors": False,
             "metadata": {},
         }
 
@@ -359,12 +447,11 @@ class StrayCat:
 
         memory_types = self.memory.vectors.collections.keys()
 
-        for config, memory_type in zip(recall_configs, memory_types):
-            memory_key = f"{memory_type}_memories"
+        return dict(zip(memory_types, recall_configs))
 
-            # recall relevant memories for collection
-            vector_memory = getattr(self.memory.vectors, memory_type)
-            memories = vector_memory.recall_memories_from_embedding(**config)
+    def __store_recalled_memories(self, recalled_memories):
+        for memory_type, memories in recalled_memories.items():
+            memory_key = f"{memory_type}_memories"
 
             setattr(
                 self.working_memory, memory_key, memories
@@ -451,6 +538,77 @@ class StrayCat:
             CatMessage object, the Cat's answer to be sent back to the client.
         """
 
+        start_time = time.perf_counter()
+        with self.tracer.trace("turn", user_id=self.user_id) as trace:
+            final_output = self.__turn(message_dict)
+        metrics.TURN_DURATION.observe(time.perf_counter() - start_time)
+
+        return self.__attach_trace(final_output, trace)
+
+    def __turn(self, message_dict):
+        fast_reply = self.__start_turn(message_dict)
+        if fast_reply is not None:
+            return fast_reply
+
+        # recall episodic and declarative memories from vector collections
+        #   and store them in working_memory
+        try:
+            self.recall_relevant_memories_to_working_memory()
+        except Exception:
+            return self.__recall_error()
+
+        # reply with agent
+        try:
+            with span("main_agent"):
+                agent_output: AgentOutput = self.main_agent.execute(self)
+        except Exception as e:
+            agent_output = self.__agent_output_from_error(e)
+
+        return self.__end_turn(agent_output)
+
+    async def __acall__(self, message_dict):
+        """Run the conversation turn, async version of `__call__`.
+
+        Hooks, tools and forms run in the threadpool, while models and vector memory are awaited,
+        so no thread is busy while waiting for the LLM.
+
+        Parameters
+        ----------
+        message_dict : dict
+            Dictionary received from the client via http or websocket.
+
+        Returns
+        -------
+        final_output : CatMessage
+            CatMessage object, the Cat's answer to be sent back to the client.
+        """
+
+        start_time = time.perf_counter()
+        with self.tracer.trace("turn", user_id=self.user_id) as trace:
+            final_output = await self.__aturn(message_dict)
+        metrics.TURN_DURATION.observe(time.perf_counter() - start_time)
+
+        return self.__attach_trace(final_output, trace)
+
+    async def __aturn(self, message_dict):
+        fast_reply = await run_in_threadpool(self.__start_turn, message_dict)
+        if fast_reply is not None:
+            return fast_reply
+
+        try:
+            await self.arecall_relevant_memories_to_working_memory()
+        except Exception:
+            return self.__recall_error()
+
+        try:
+            with span("main_agent"):
+                agent_output: AgentOutput = await self.main_agent.aexecute(self)
+        except Exception as e:
+            agent_output = self.__agent_output_from_error(e)
+
+        return await run_in_threadpool(self.__end_turn, agent_output)
+
+    def __start_turn(self, message_dict) -> CatMessage | None:
         # Impose user_id as the one authenticated
         # (ws message may contain a fake id)
         message_dict["user_id"] = self.user_id
@@ -462,13 +620,16 @@ class StrayCat:
         ### setup working memory for this convo turn
         # keeping track of model interactions
         self.working_memory.model_interactions = []
+        # keeping track of plugins timings
+        self.working_memory.plugin_timings = []
         # latest user message
         self.working_memory.user_message_json = user_message
 
         # Run a totally custom reply (skips all the side effects of the framework)
-        fast_reply = self.mad_hatter.execute_hook(
-            "fast_reply", {}, cat=self
-        )
+        with span("fast_reply"):
+            fast_reply = self.mad_hatter.execute_hook(
+                "fast_reply", {}, cat=self
+            )
         if isinstance(fast_reply, CatMessage):
             return fast_reply
         if isinstance(fast_reply, dict) and "output" in fast_reply:
@@ -477,57 +638,61 @@ class StrayCat:
             )
 
         # hook to modify/enrich user input
-        self.working_memory.user_message_json = self.mad_hatter.execute_hook(
-            "before_cat_reads_message", self.working_memory.user_message_json, cat=self
-        )
+        with span("before_cat_reads_message"):
+            self.working_memory.user_message_json = self.mad_hatter.execute_hook(
+                "before_cat_reads_message", self.working_memory.user_message_json, cat=self
+            )
 
         # update conversation history (Human turn)
         self.working_memory.update_history(
             self.working_memory.user_message_json
         )
 
-        # recall episodic and declarative memories from vector collections
-        #   and store them in working_memory
-        try:
-            self.recall_relevant_memories_to_working_memory()
-        except Exception:
-            log.error("Error during recall.")
+        return None
 
-            err_message = "An error occurred while recalling relevant memories."
+    def __recall_error(self) -> dict:
+        log.error("Error during recall.")
 
-            return {
-                "type": "error",
-                "name": "VectorMemoryError",
-                "description": err_message,
-            }
-        
-        # reply with agent
-        try:
-            agent_output: AgentOutput = self.main_agent.execute(self)
-        except Exception as e:
-            # This error happens when the LLM
-            #   does not respect prompt instructions.
-            # We grab the LLM output here anyway, so small and
-            #   non instruction-fine-tuned models can still be used.
-            error_description = str(e)
-
-            log.error(error_description)
-            if "Could not parse LLM output: `" not in error_description:
-                raise e
-
-            unparsable_llm_output = error_description.replace(
-                "Could not parse LLM output: `", ""
-            ).replace("`", "")
-            agent_output = AgentOutput(
-                output=unparsable_llm_output,
-            )
+        err_message = "An error occurred while recalling relevant memories."
 
-        log.info(agent_output)
+        return {
+            "type": "error",
+            "name": "VectorMemoryError",
+            "description": err_message,
+        }
 
-        self._store_user_message_in_episodic_memory(
-            self.working_memory.user_message_json.text
+    def __agent_output_from_error(self, e: Exception) -> AgentOutput:
+        # This error happens when the LLM
+        #   does not respect prompt instructions.
+        # We grab the LLM output here anyway, so small and
+        #   non instruction-fine-tuned models can still be used.
+        error_description = str(e)
+
+        log.error(error_description)
+        if "Could not parse LLM output: `" not in error_description:
+            raise e
+
+        unparsable_llm_output = error_description.replace(
+            "Could not parse LLM output: `", ""
+        ).replace("`", "")
+        return AgentOutput(
+            output=unparsable_llm_output,
         )
 
+    def __attach_trace(self, final_output, trace):
+        # spans are complete only once the turn is over
+        if trace and self.tracer.include_in_why and isinstance(final_output, CatMessage) and final_output.why:
+            final_output.why.trace = [s.model_dump() for s in trace.spans]
+        return final_output
+
+    def __end_turn(self, agent_output: AgentOutput) -> CatMessage:
+        log.info(agent_output)
+
+        with span("episodic_storage"):
+            self._store_user_message_in_episodic_memory(
+                self.working_memory.user_message_json.text
+            )
+
         # why this response?
         why = self.__build_why()
         # TODO: should these assignations be included in self.__build_why ?
@@ -540,9 +705,10 @@ class StrayCat:
         )
 
         # run message through plugins
-        final_output = self.mad_hatter.execute_hook(
-            "before_cat_sends_message", final_output, cat=self
-        )
+        with span("before_cat_sends_message"):
+            final_output = self.mad_hatter.execute_hook(
+                "before_cat_sends_message", final_output, cat=self
+            )
 
         # update conversation history (AI turn)
         self.working_memory.update_history(
@@ -574,6 +740,27 @@ class StrayCat:
                 except ConnectionClosedOK as ex:
                     log.warning(ex)
 
+    async def arun(self, user_message_json, return_message=False):
+        """Async version of `run`, used by the websocket and http endpoints."""
+        try:
+            # run main flow
+            cat_message = await self.__acall__(user_message_json)
+            # save working memory to cache
+            await run_in_threadpool(self.update_working_memory_cache)
+
+            if return_message:
+                # return the message for HTTP usage
+                return cat_message
+            else:
+                # send message back to client via WS
+                self.send_chat_message(cat_message)
+        except Exception as e:
+            log.error(e)
+            if return_message:
+                return {"error": str(e)}
+            else:
+                self.send_error(e)
+
     def classify(
         self, sentence: str, labels: List[str] | Dict[str, List[str]], score_threshold: float = 0.5
     ) -> str | None:
@@ -656,10 +843,19 @@ Just output the class, nothing else."""
         # store user message in episodic memory
         # TODO: vectorize and store also conversation chunks
         #   (not raw dialog, but summarization)
-        user_message_embedding = self.embedder.embed_documents([user_message_text])
+        if (
+            self.working_memory.recall_query == user_message_text
+            and self.working_memory.recall_query_embedding is not None
+            and embeds_query_as_document(self.embedder)
+        ):
+            # message was already embedded for recall (recall query was not changed by hooks),
+            #   with an embedder not making a difference between queries and documents
+            user_message_embedding = self.working_memory.recall_query_embedding
+        else:
+            user_message_embedding = self.embedder.embed_documents([user_message_text])[0]
         _ = self.memory.vectors.episodic.add_point(
             doc.page_content,
-            user_message_embedding[0],
+            user_message_embedding,
             doc.metadata,
         )
 
@@ -794,3 +990,8 @@ Just output the class, nothing else."""
     def cache(self):
         """Gives access to internal cache."""
         return CheshireCat().cache
+
+    @property
+    def tracer(self):
+        """Gives access to the tracer of conversation turns."""
+        return CheshireCat().tracer
@@ -1,3 +1,5 @@
+import time
+import threading
 from typing import Dict, List
 
 from pytz import utc
@@ -6,9 +8,10 @@ from datetime import datetime, timedelta
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.jobstores.memory import MemoryJobStore
 from apscheduler.executors.pool import ThreadPoolExecutor, ProcessPoolExecutor
-from apscheduler.events import EVENT_JOB_EXECUTED, EVENT_JOB_ERROR
+from apscheduler.events import EVENT_JOB_ADDED, EVENT_JOB_EXECUTED, EVENT_JOB_ERROR, EVENT_JOB_SUBMITTED
 
 from cat.log import log
+from cat import metrics
 
 from cat.utils import singleton
 
@@ -45,7 +48,16 @@ class WhiteRabbit:
             timezone=utc,
         )
 
-        # Add our listener to the scheduler
+        # to measure job run times:
+        #   job_id -> function name (job ids may be unique for each scheduled message)
+        #   (job_id, scheduled run time) -> (submission time, function name)
+        self._job_names = {}
+        self._running_jobs = {}
+        self._running_jobs_lock = threading.Lock()
+
+        # Add our listeners to the scheduler
+        self.scheduler.add_listener(self._job_added_listener, EVENT_JOB_ADDED)
+        self.scheduler.add_listener(self._job_submitted_listener, EVENT_JOB_SUBMITTED)
         self.scheduler.add_listener(
             self._job_ended_listener, EVENT_JOB_EXECUTED | EVENT_JOB_ERROR
         )
@@ -68,6 +80,18 @@ class WhiteRabbit:
         event: apscheduler.events.JobExecutionEvent
             Passed by the scheduler when the job ends. It contains information about the job.
         """
+        # (scheduler locks are never taken while holding ours)
+        job_ended_for_good = self.scheduler.get_job(event.job_id) is None
+        with self._running_jobs_lock:
+            started = self._running_jobs.pop((event.job_id, event.scheduled_run_time), None)
+            if job_ended_for_good:
+                self._job_names.pop(event.job_id, None)
+        if started:
+            submitted_at, job_name = started
+            metrics.WHITE_RABBIT_JOB_DURATION.labels(
+                job=job_name, status="error" if event.exception else "ok"
+            ).observe(time.perf_counter() - submitted_at)
+
         if event.exception:
             log.error(
                 f"WhiteRabbit: error during the execution of job {event.job_id} started at {event.scheduled_run_time}. Error: {event.traceback}"
@@ -77,6 +101,34 @@ class WhiteRabbit:
                 f"WhiteRabbit: executed job {event.job_id} started at {event.scheduled_run_time}. Value returned: {event.retval}"
             )
 
+    def _job_added_listener(self, event):
+        """
+        Triggered when a job is added to the scheduler
+
+        Parameters
+        ----------
+        event: apscheduler.events.JobEvent
+            Passed by the scheduler when the job is added. It contains information about the job.
+        """
+        job = self.scheduler.get_job(event.job_id)
+        if job:
+            with self._running_jobs_lock:
+                self._job_names[event.job_id] = getattr(job.func, "__name__", job.name)
+
+    def _job_submitted_listener(self, event):
+        """
+        Triggered when a job is submitted to its executor
+
+        Parameters
+        ----------
+        event: apscheduler.events.JobSubmissionEvent
+            Passed by the scheduler when the job is submitted. It contains information about the job.
+        """
+        with self._running_jobs_lock:
+            job_name = self._job_names.get(event.job_id, event.job_id)
+            for run_time in event.scheduled_run_times:
+                self._running_jobs[(event.job_id, run_time)] = (time.perf_counter(), job_name)
+
     def get_job(self, job_id: str) -> Dict[str, str] | None:
         """
         Gets a scheduled job
@@ -174,6 +226,8 @@ class WhiteRabbit:
         """
         try:
             self.scheduler.remove_job(job_id)
+            with self._running_jobs_lock:
+                self._job_names.pop(job_id, None)
             log.info(f"WhiteRabbit: Removed job {job_id}")
             return True
         except Exception:
@@ -165,6 +165,7 @@ def before_cat_recalls_episodic_memories(episodic_recall_config: dict, cat) -> d
     The hook return the values for maximum number (k) of items to retrieve from memory and the score threshold applied
     to the query in the vector memory (items with score under threshold are not retrieved).
     It also returns the embedded query (embedding) and the conditions on recall (metadata).
+    Vectors of recalled memories are not retrieved, unless `with_vectors` is set to True.
 
     Parameters
     ----------
@@ -196,6 +197,7 @@ def before_cat_recalls_declarative_memories(
     The hook return the values for maximum number (k) of items to retrieve from memory and the score threshold applied
     to the query in the vector memory (items with score under threshold are not retrieved)
     It also returns the embedded query (embedding) and the conditions on recall (metadata).
+    Vectors of recalled memories are not retrieved, unless `with_vectors` is set to True.
 
     Parameters
     ----------
@@ -225,6 +227,7 @@ def before_cat_recalls_procedural_memories(procedural_recall_config: dict, cat)
     The hook return the values for maximum number (k) of items to retrieve from memory and the score threshold applied
     to the query in the vector memory (items with score under threshold are not retrieved)
     It also returns the embedded query (embedding) and the conditions on recall (metadata).
+    Vectors of recalled memories are not retrieved, unless `with_vectors` is set to True.
 
     Parameters
     ----------
@@ -66,6 +66,20 @@ class CustomEndpoint:
         
         assert api_route.path == self.name
 
+        self._measure_route(api_route)
+
+    def _measure_route(self, api_route):
+        # wrap the ASGI app of the route, so the function signature seen by FastAPI is untouched
+        route_app = api_route.app
+        plugin_id = getattr(self, "plugin_id", None)
+
+        async def measured_app(scope, receive, send):
+            profiler = scope["app"].state.ccat.mad_hatter.profiler
+            with profiler.measure("endpoint", plugin_id, self.name):
+                await route_app(scope, receive, send)
+
+        api_route.app = measured_app
+
     def deactivate(self):
 
         log.info(f"Deactivating custom endpoint {self.methods} {self.name}")
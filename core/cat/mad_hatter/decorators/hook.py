@@ -3,18 +3,41 @@ from typing import Union, Callable
 
 # class to represent a @hook
 class CatHook:
-    def __init__(self, name: str, func: Callable, priority: int):
+    def __init__(
+        self,
+        name: str,
+        func: Callable,
+        priority: int,
+        read_only: bool = False,
+        in_place: bool = False,
+    ):
         self.function = func
         self.name = name
         self.priority = priority
 
+        # hooks declaring they do not modify their arguments (read_only),
+        #  or that they modify them on purpose (in_place), receive them without copies
+        self.read_only = read_only
+        self.in_place = in_place
+
+        # time spent deep copying arguments for this hook (seconds) and number of copies
+        self.copy_time = 0.0
+        self.copy_count = 0
+
     def __repr__(self) -> str:
         return f"CatHook(name={self.name}, priority={self.priority})"
 
 
 # @hook decorator. Any function in a plugin decorated by @hook and named properly (among list of available hooks) is used by the Cat
 # @hook priority defaults to 1, the higher the more important. Hooks in the default core plugin have all priority=0 so they are automatically overwritten from plugins
-def hook(*args: Union[str, Callable], priority: int = 1) -> Callable:
+# Hooks receive a deep copy of their arguments, unless they are declared read_only (they only read them)
+#  or in_place (they modify them directly, changes are kept even if the hook fails)
+def hook(
+    *args: Union[str, Callable],
+    priority: int = 1,
+    read_only: bool = False,
+    in_place: bool = False,
+) -> Callable:
     """
     Make hooks out of functions, can be used with or without arguments.
     Examples:
@@ -25,11 +48,20 @@ def hook(*args: Union[str, Callable], priority: int = 1) -> Callable:
             @hook("on_message", priority=2)
             def on_message(message: Message) -> str:
                 return "Hello!"
+            @hook(priority=2, read_only=True)
+            def before_cat_sends_message(message, cat):
+                log.info(message.text)
     """
 
     def _make_with_name(hook_name: str) -> Callable:
         def _make_hook(func: Callable[[str], str]) -> CatHook:
-            hook_ = CatHook(name=hook_name, func=func, priority=priority)
+            hook_ = CatHook(
+                name=hook_name,
+                func=func,
+                priority=priority,
+                read_only=read_only,
+                in_place=in_place,
+            )
             return hook_
 
         return _make_hook
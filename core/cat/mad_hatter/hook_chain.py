@@ -0,0 +1,95 @@
+import ast
+import inspect
+import textwrap
+from typing import List
+
+from cat.mad_hatter.decorators.hook import CatHook
+from cat.log import log
+
+
+def is_identity_hook(hook: CatHook) -> bool:
+    """Check if a hook does nothing, aside returning its first argument (e.g. most core plugin hooks)."""
+
+    # the source of a decorated function is the one of the inner function,
+    #   the decorator may do something with the arguments
+    if hasattr(hook.function, "__wrapped__"):
+        return False
+
+    try:
+        source = textwrap.dedent(inspect.getsource(hook.function))
+        function = ast.parse(source).body[0]
+    except Exception:
+        return False
+
+    if not isinstance(function, (ast.FunctionDef, ast.AsyncFunctionDef)):
+        return False
+
+    # ignore docstring
+    body = function.body
+    if body and isinstance(body[0], ast.Expr) and isinstance(body[0].value, ast.Constant):
+        body = body[1:]
+
+    params = [a.arg for a in function.args.args]
+    if not params:
+        return False
+    if params == ["cat"]:
+        # hook without arguments doing nothing
+        return all(isinstance(s, ast.Pass) for s in body)
+
+    return (
+        len(body) == 1
+        and isinstance(body[0], ast.Return)
+        and isinstance(body[0].value, ast.Name)
+        and body[0].value.id == params[0]
+    )
+
+
+def hook_needs_copy(hook: CatHook) -> bool:
+    """Check if a hook must receive a deep copy of its arguments."""
+
+    # core plugin hooks only return their input
+    if getattr(hook, "plugin_id", None) == "core_plugin":
+        return False
+    return not (hook.read_only or hook.in_place)
+
+
+class HookChain:
+    """Hooks with the same name, compiled in an execution plan.
+
+    Hooks doing nothing are left out of the plan, and whether each hook needs copies of its arguments
+    is decided once, when the chain is built (on plugins sync).
+
+    Attributes
+    ----------
+    source : tuple
+        Hooks the chain was built from, sorted by priority.
+    steps : List[tuple]
+        Hooks to run, with a flag telling if they need copies and their debug message.
+    copy_first : bool
+        Whether the piped argument is copied before running the hooks.
+    """
+
+    def __init__(self, hooks: List[CatHook]):
+        self.source = tuple(hooks)
+
+        debug = log.LOG_LEVEL == "DEBUG"
+        self.steps = [
+            (
+                hook,
+                hook_needs_copy(hook),
+                f"Executing {getattr(hook, 'plugin_id', None)}::{hook.name} with priority {hook.priority}"
+                if debug else None,
+            )
+            for hook in hooks
+            if not is_identity_hook(hook)
+        ]
+        # a single hook needing copies already gets its own copy, its output is the chain output
+        self.copy_first = len(self.steps) > 1 and any(needs_copy for _, needs_copy, _ in self.steps)
+
+    def is_built_from(self, hooks: List[CatHook]) -> bool:
+        """Check if the chain is up to date with the given hooks list (same hooks, in the same order)."""
+        return (
+            hooks is not None
+            and len(hooks) == len(self.source)
+            and all(hook is source_hook for hook, source_hook in zip(hooks, self.source))
+        )
@@ -1,4 +1,5 @@
 import os
+import time
 import glob
 import shutil
 import inspect
@@ -6,6 +7,7 @@ from copy import deepcopy
 from typing import List, Dict
 
 from cat.log import log
+from cat.env import get_env
 
 import cat.utils as utils
 from cat.utils import singleton
@@ -16,6 +18,8 @@ from cat.db.models import Setting
 from cat.mad_hatter.plugin_extractor import PluginExtractor
 from cat.mad_hatter.plugin import Plugin
 from cat.mad_hatter.decorators.hook import CatHook
+from cat.mad_hatter.hook_chain import HookChain
+from cat.mad_hatter.profiler import PluginProfiler
 from cat.mad_hatter.decorators.tool import CatTool
 from cat.mad_hatter.decorators.endpoint import CustomEndpoint
 
@@ -40,6 +44,11 @@ class MadHatter:
         self.hooks: Dict[
             str, List[CatHook]
         ] = {}  # dict of active plugins hooks ( hook_name -> [CatHook, CatHook, ...])
+        self.hook_chains: Dict[str, HookChain] = {}  # execution plans of hooks ( hook_name -> HookChain)
+        self.profiler = PluginProfiler(
+            enabled=get_env("CCAT_PLUGINS_PROFILING") == "true",
+            include_in_why=get_env("CCAT_PLUGINS_PROFILING_WHY") == "true",
+        )  # timings of hooks, tools, forms and endpoints
         self.tools: List[CatTool] = []  # list of active plugins tools
         self.forms: List[CatForm] = []  # list of active plugins forms
         self.endpoints: List[CustomEndpoint] = []  # list of active plugins endpoints
@@ -161,6 +170,11 @@ class MadHatter:
         for hook_name in self.hooks.keys():
             self.hooks[hook_name].sort(key=lambda x: x.priority, reverse=True)
 
+        # compile execution plans
+        self.hook_chains = {
+            hook_name: HookChain(hooks) for hook_name, hooks in self.hooks.items()
+        }
+
         # notify sync has finished (the Cat will ensure all tools are embedded in vector memory)
         self.on_finish_plugins_sync_callback()
 
@@ -224,53 +238,106 @@ class MadHatter:
 
     # execute requested hook
     def execute_hook(self, hook_name, *args, cat):
-        # check if hook is supported
-        if hook_name not in self.hooks.keys():
-            raise Exception(f"Hook {hook_name} not present in any plugin")
+        chain = self.hook_chains.get(hook_name)
+        if chain is None or not chain.is_built_from(self.hooks.get(hook_name)):
+            # check if hook is supported
+            if hook_name not in self.hooks.keys():
+                raise Exception(f"Hook {hook_name} not present in any plugin")
+            # hooks list was changed after plugins sync
+            chain = self.hook_chains[hook_name] = HookChain(self.hooks[hook_name])
+
+        # Hooks doing nothing were left out of the chain
+        if not chain.steps:
+            return args[0] if args else None
 
         # Hook has no arguments (aside cat)
         #  no need to pipe
         if len(args) == 0:
-            for hook in self.hooks[hook_name]:
+            for hook, _, debug_message in chain.steps:
+                start_time = time.perf_counter()
+                error = False
                 try:
-                    log.debug(
-                        f"Executing {hook.plugin_id}::{hook.name} with priority {hook.priority}"
-                    )
+                    if debug_message:
+                        log.debug(debug_message)
                     hook.function(cat=cat)
                 except Exception:
-                    log.error(f"Error in plugin {hook.plugin_id}::{hook.name}")
-                    plugin_obj = self.plugins[hook.plugin_id]
-                    log.warning(plugin_obj.plugin_specific_error_message())
+                    error = True
+                    self.log_hook_error(hook)
+                if self.profiler.enabled:
+                    self.profiler.record(
+                        "hook", hook.plugin_id, hook.name, time.perf_counter() - start_time, error, cat=cat
+                    )
             return
 
         # Hook with arguments.
         #  First argument is passed to `execute_hook` is the pipeable one.
         #  We call it `tea_cup` as every hook called will receive it as an input,
         #  can add sugar, milk, or whatever, and return it for the next hook
-        tea_cup = deepcopy(args[0])
+        if chain.copy_first:
+            tea_cup = deepcopy(args[0])
+        else:
+            # no hook modifies its arguments on a copy, keep the original
+            tea_cup = args[0]
+
+        # single hook, call it directly
+        if len(chain.steps) == 1:
+            return self.run_piped_hook(chain.steps[0], tea_cup, args[1:], cat)
 
         # run hooks
-        for hook in self.hooks[hook_name]:
-            try:
-                # pass tea_cup to the hooks, along other args
-                # hook has at least one argument, and it will be piped
-                log.debug(
-                    f"Executing {hook.plugin_id}::{hook.name} with priority {hook.priority}"
-                )
-                tea_spoon = hook.function(
-                    deepcopy(tea_cup), *deepcopy(args[1:]), cat=cat
-                )
-                # log.debug(f"Hook {hook.plugin_id}::{hook.name} returned {tea_spoon}")
-                if tea_spoon is not None:
-                    tea_cup = tea_spoon
-            except Exception:
-                log.error(f"Error in plugin {hook.plugin_id}::{hook.name}")
-                plugin_obj = self.plugins[hook.plugin_id]
-                log.warning(plugin_obj.plugin_specific_error_message())
+        for step in chain.steps:
+            tea_cup = self.run_piped_hook(step, tea_cup, args[1:], cat)
 
         # tea_cup has passed through all hooks. Return final output
         return tea_cup
 
+    def run_piped_hook(self, step, tea_cup, other_args, cat):
+        hook, needs_copy, debug_message = step
+        start_time = time.perf_counter()
+        error = False
+        try:
+            # pass tea_cup to the hooks, along other args
+            # hook has at least one argument, and it will be piped
+            if debug_message:
+                log.debug(debug_message)
+            if needs_copy:
+                hook_args = deepcopy((tea_cup, *other_args))
+                hook.copy_time += time.perf_counter() - start_time
+                hook.copy_count += 1
+            else:
+                hook_args = (tea_cup, *other_args)
+            tea_spoon = hook.function(*hook_args, cat=cat)
+            # log.debug(f"Hook {hook.plugin_id}::{hook.name} returned {tea_spoon}")
+            if tea_spoon is not None:
+                tea_cup = tea_spoon
+        except Exception:
+            error = True
+            self.log_hook_error(hook)
+        if self.profiler.enabled:
+            self.profiler.record(
+                "hook", hook.plugin_id, hook.name, time.perf_counter() - start_time, error, cat=cat
+            )
+        return tea_cup
+
+    def log_hook_error(self, hook):
+        log.error(f"Error in plugin {hook.plugin_id}::{hook.name}")
+        plugin_obj = self.plugins[hook.plugin_id]
+        log.warning(plugin_obj.plugin_specific_error_message())
+
+    def hooks_copy_stats(self) -> List[Dict]:
+        """Time spent deep copying hook arguments, for each active hook that needed copies."""
+
+        return [
+            {
+                "plugin_id": hook.plugin_id,
+                "hook": hook.name,
+                "copy_count": hook.copy_count,
+                "copy_time": hook.copy_time,
+            }
+            for hooks in self.hooks.values()
+            for hook in hooks
+            if hook.copy_count > 0
+        ]
+
     # get plugin object (used from within a plugin)
     # TODO: should we allow to take directly another plugins' obj?
     # TODO: throw exception if this method is called from outside the plugins folder
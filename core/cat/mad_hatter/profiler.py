@@ -0,0 +1,171 @@
+import math
+import time
+import threading
+from contextlib import contextmanager
+from typing import Dict, List
+
+
+class LatencyHistogram:
+    """Latencies of a plugin function, counted in logarithmic buckets.
+
+    Recording a call is a few arithmetic operations, percentiles are estimated from bucket bounds
+    (each bucket is about 19% wider than the previous one, from 1 microsecond to a few minutes).
+
+    Attributes
+    ----------
+    count : int
+        Number of calls.
+    errors : int
+        Number of calls that raised an exception.
+    total : float
+        Cumulative time in seconds.
+    max : float
+        Slowest call in seconds.
+    buckets : List[int]
+        Number of calls for each latency bucket.
+    """
+
+    MIN_LATENCY = 1e-6
+    BUCKETS_PER_DOUBLING = 4
+    N_BUCKETS = 112
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.buckets = [0] * self.N_BUCKETS
+
+    def record(self, duration: float, error: bool = False):
+        self.count += 1
+        self.total += duration
+        if duration > self.max:
+            self.max = duration
+        if error:
+            self.errors += 1
+
+        if duration <= self.MIN_LATENCY:
+            index = 0
+        else:
+            index = min(
+                self.N_BUCKETS - 1,
+                1 + int(self.BUCKETS_PER_DOUBLING * math.log2(duration / self.MIN_LATENCY)),
+            )
+        self.buckets[index] += 1
+
+    def percentile(self, q: float) -> float:
+        """Estimate the latency below which a fraction `q` of the calls fall."""
+
+        if self.count == 0:
+            return 0.0
+
+        threshold = q * self.count
+        cumulative = 0
+        for index, bucket in enumerate(self.buckets):
+            cumulative += bucket
+            if cumulative >= threshold:
+                upper_bound = self.MIN_LATENCY * 2 ** (index / self.BUCKETS_PER_DOUBLING)
+                return min(upper_bound, self.max)
+        return self.max
+
+    def summary(self) -> Dict:
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "total": self.total,
+            "mean": self.total / self.count if self.count else 0.0,
+            "p50": self.percentile(0.50),
+            "p95": self.percentile(0.95),
+            "p99": self.percentile(0.99),
+            "max": self.max,
+        }
+
+
+class PluginProfiler:
+    """Opt-in timing of hooks, tools, forms and custom endpoints, for each plugin.
+
+    Latencies are kept in memory, in a `LatencyHistogram` for each `plugin_id::name` (and kind).
+    When `include_in_why` is set, the timings of each conversation turn are also stored
+    in the working memory and sent to the client in `MessageWhy`.
+
+    Attributes
+    ----------
+    enabled : bool
+        Whether calls are measured.
+    include_in_why : bool
+        Whether timings of the current turn are added to the Cat's answers.
+    """
+
+    def __init__(self, enabled: bool = False, include_in_why: bool = False):
+        self.enabled = enabled
+        self.include_in_why = include_in_why
+        self.histograms: Dict[tuple, LatencyHistogram] = {}
+        self._lock = threading.Lock()
+
+    def record(self, kind: str, plugin_id: str, name: str, duration: float, error: bool = False, cat=None):
+        """Store the duration of a call.
+
+        Parameters
+        ----------
+        kind : str
+            One of "hook", "tool", "form", "endpoint".
+        plugin_id : str
+            Plugin owning the called function.
+        name : str
+            Name of the hook, tool, form or endpoint.
+        duration : float
+            Duration of the call in seconds.
+        error : bool
+            Whether the call raised an exception.
+        cat : StrayCat, optional
+            Session running the call, its working memory keeps the timings of the turn.
+        """
+
+        key = (kind, plugin_id, name)
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = LatencyHistogram()
+            histogram.record(duration, error)
+
+        if self.include_in_why:
+            working_memory = getattr(cat, "working_memory", None)
+            if working_memory is not None:
+                working_memory.plugin_timings.append(
+                    {"kind": kind, "name": f"{plugin_id}::{name}", "duration": duration, "error": error}
+                )
+
+    @contextmanager
+    def measure(self, kind: str, plugin_id: str, name: str, cat=None):
+        """Context manager recording the duration of the enclosed block, if profiling is enabled."""
+
+        if not self.enabled:
+            yield
+            return
+
+        start_time = time.perf_counter()
+        error = False
+        try:
+            yield
+        except BaseException:
+            error = True
+            raise
+        finally:
+            self.record(kind, plugin_id, name, time.perf_counter() - start_time, error, cat=cat)
+
+    def stats(self) -> List[Dict]:
+        """Latency summary of each measured function, slowest (cumulative time) first."""
+
+        with self._lock:
+            items = list(self.histograms.items())
+            stats = [
+                {"kind": kind, "plugin_id": plugin_id, "name": name} | histogram.summary()
+                for (kind, plugin_id, name), histogram in items
+            ]
+        return sorted(stats, key=lambda s: s["total"], reverse=True)
+
+    def reset(self):
+        """Forget all measurements."""
+
+        with self._lock:
+            self.histograms = {}
@@ -0,0 +1,109 @@
+from typing import Any, List
+
+import numpy as np
+from langchain.docstore.document import Document
+
+from cat.memory.vector_memory_collection import VectorMemoryCollection
+
+
+class InMemoryIndex:
+    """Copy in RAM of a small vector collection, searched with NumPy instead of querying Qdrant.
+
+    Vectors are normalized and stored in a contiguous float32 matrix, so cosine similarity is a dot product.
+    The copy is valid until the collection is changed (see `VectorMemoryCollection.version`),
+    then it must be built again. The version only counts changes made by this process:
+    changes made by other processes are found comparing the `signature` given to `build`.
+
+    Attributes
+    ----------
+    collection : VectorMemoryCollection
+        Collection the index was built from, None if it was never built.
+    version : int
+        Version of the collection when the index was built.
+    signature : Any
+        State of the collection shared with other processes, when the index was built.
+    """
+
+    def __init__(self):
+        self.collection = None
+        self.version = None
+        self.signature = None
+        # (vectors, ids, payloads), replaced as a whole so searches never see a half built index
+        self._data = (np.empty((0, 0), dtype=np.float32), [], [])
+
+    def __len__(self):
+        return len(self._data[1])
+
+    def build(self, collection: VectorMemoryCollection, signature: Any = None):
+        """Load all the points of the collection. The signature must be read before calling it."""
+
+        # read before loading the points: changes made in the meantime leave the index out of date
+        version = collection.version
+
+        points = list(collection.scroll_points(with_vectors=True))
+        vectors = np.array([p.vector for p in points], dtype=np.float32).reshape(len(points), -1)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1
+
+        self._data = (
+            np.ascontiguousarray(vectors / norms),
+            [p.id for p in points],
+            [p.payload for p in points],
+        )
+        self.collection = collection
+        self.version = version
+        self.signature = signature
+
+    def clear(self):
+        """Drop the copy, the index is out of date until it is built again."""
+        self.collection = None
+        self.version = None
+        self.signature = None
+        self._data = (np.empty((0, 0), dtype=np.float32), [], [])
+
+    def is_up_to_date(self) -> bool:
+        return self.collection is not None and self.version == self.collection.version
+
+    def recall_memories_from_embedding(
+        self, embedding, metadata=None, k=5, threshold=None, with_vectors=False
+    ) -> List[tuple]:
+        """Same as `VectorMemoryCollection.recall_memories_from_embedding` (cosine similarity), without metadata filters."""
+
+        if metadata:
+            raise ValueError("Metadata filters are not supported by the in memory index")
+
+        vectors, ids, payloads = self._data
+        if not ids or not k:
+            return []
+
+        query = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm > 0:
+            query = query / norm
+        scores = vectors @ query
+
+        # top k, best first
+        if k < len(ids):
+            top = np.argpartition(-scores, k - 1)[:k]
+        else:
+            top = np.arange(len(ids))
+        top = top[np.argsort(-scores[top], kind="stable")]
+
+        memories = []
+        for i in top:
+            score = float(scores[i])
+            if threshold is not None and score < threshold:
+                break
+            memories.append(
+                (
+                    Document(
+                        page_content=payloads[i].get("page_content"),
+                        metadata=payloads[i].get("metadata") or {},
+                    ),
+                    score,
+                    vectors[i].tolist() if with_vectors else None,
+                    ids[i],
+                )
+            )
+
+        return memories
@@ -0,0 +1,30 @@
+import threading
+import functools
+
+from qdrant_client import QdrantClient
+
+
+class SerializedQdrantClient:
+    """Qdrant client allowing one call at a time.
+
+    Qdrant local mode (on disk, without a Qdrant server) is not thread safe,
+    while turns of different users, recall queries and ingestion run in parallel threads.
+    Calls to the wrapped client are serialized by a lock, so in local mode
+    queries to different collections do not run in parallel.
+    """
+
+    def __init__(self, client: QdrantClient):
+        self._wrapped = client
+        self._lock = threading.RLock()
+
+    def __getattr__(self, name):
+        attribute = getattr(self._wrapped, name)
+        if not callable(attribute):
+            return attribute
+
+        @functools.wraps(attribute)
+        def serialized(*args, **kwargs):
+            with self._lock:
+                return attribute(*args, **kwargs)
+
+        return serialized
@@ -1,18 +1,37 @@
 import sys
+import time
 import socket
+import asyncio
+import threading
+import contextvars
+from typing import Dict, List
+from concurrent.futures import ThreadPoolExecutor
 from cat.utils import extract_domain_from_url, is_https
 
 from qdrant_client import QdrantClient
 
 from cat.memory.vector_memory_collection import VectorMemoryCollection
+from cat.memory.serialized_qdrant_client import SerializedQdrantClient
+from cat.memory.in_memory_index import InMemoryIndex
+from cat.convo.tracing import span
+from cat.db import crud
 from cat.log import log
 from cat.env import get_env
 # from cat.utils import singleton
 
 
+# setting with the fingerprint of the triggers in procedural memory
+PROCEDURES_MANIFEST = "procedures_manifest"
+
+
 # @singleton REFACTOR: worth it to have this (or LongTermMemory) as singleton?
 class VectorMemory:
     local_vector_db = None
+    # threads querying collections concurrently during recall, shared by all turns and memory reloads
+    recall_executor = None
+
+    # seconds between checks that procedural memory was not changed by other workers
+    INDEX_CHECK_INTERVAL = 2
 
     def __init__(
         self,
@@ -44,6 +63,19 @@ class VectorMemory:
             # (i.e. do things like cat.memory.vectors.declarative.something())
             setattr(self, collection_name, collection)
 
+        # Procedural memory only holds tool and form triggers and is recalled at every turn,
+        #   it is searched in RAM (the index is built when procedures are embedded)
+        self.procedural_index = InMemoryIndex()
+        self._index_lock = threading.Lock()
+        self._index_checked_at = 0.0
+
+        # create the recall threads only if it's the first boot and not a reload
+        if VectorMemory.recall_executor is None:
+            VectorMemory.recall_executor = ThreadPoolExecutor(
+                max_workers=max(1, int(get_env("CCAT_RECALL_THREADS"))),
+                thread_name_prefix="recall",
+            )
+
     def connect_to_vector_memory(self) -> None:
         db_path = "cat/data/local_vector_memory/"
         qdrant_host = get_env("CCAT_QDRANT_HOST")
@@ -54,8 +86,8 @@ class VectorMemory:
 
             # reconnect only if it's the first boot and not a reload
             if VectorMemory.local_vector_db is None:
-                VectorMemory.local_vector_db = QdrantClient(
-                    path=db_path, force_disable_check_same_thread=True
+                VectorMemory.local_vector_db = SerializedQdrantClient(
+                    QdrantClient(path=db_path, force_disable_check_same_thread=True)
                 )
 
             self.vector_db = VectorMemory.local_vector_db
@@ -87,6 +119,150 @@ class VectorMemory:
                 timeout=qdrant_client_timeout
             )
 
+    def recall_memories_from_embeddings(
+        self, recall_configs: Dict[str, Dict]
+    ) -> Dict[str, List]:
+        """Recall memories from many collections concurrently.
+
+        Parameters
+        ----------
+        recall_configs : Dict[str, Dict]
+            Collection name -> kwargs for `VectorMemoryCollection.recall_memories_from_embedding`.
+
+        Returns
+        -------
+        memories : Dict[str, List]
+            Collection name -> recalled memories.
+        """
+
+        # Qdrant local mode runs one query at a time, threads would only add overhead
+        if not self.recalls_in_parallel():
+            return {
+                collection_name: self.recall_from_collection(
+                    collection_name, config, in_memory=self.recalls_in_memory(collection_name, config)
+                )
+                for collection_name, config in recall_configs.items()
+            }
+
+        # each query is a network round trip with remote Qdrant, do not wait for them one by one
+        futures = {
+            collection_name: self.submit_recall(collection_name, config)
+            for collection_name, config in recall_configs.items()
+            if not self.recalls_in_memory(collection_name, config)
+        }
+
+        return {
+            collection_name: futures[collection_name].result()
+            if collection_name in futures
+            else self.recall_from_collection(collection_name, config, in_memory=True)
+            for collection_name, config in recall_configs.items()
+        }
+
+    async def arecall_memories_from_embeddings(
+        self, recall_configs: Dict[str, Dict]
+    ) -> Dict[str, List]:
+        """Async version of `recall_memories_from_embeddings`.
+
+        Queries run in the recall threads, the event loop is free while waiting for them.
+        """
+
+        if not self.recalls_in_parallel():
+            # a single thread runs them one by one
+            return await asyncio.wrap_future(
+                self.recall_executor.submit(
+                    contextvars.copy_context().run,
+                    self.recall_memories_from_embeddings,
+                    recall_configs,
+                )
+            )
+
+        futures = {
+            collection_name: asyncio.wrap_future(self.submit_recall(collection_name, config))
+            for collection_name, config in recall_configs.items()
+            if not self.recalls_in_memory(collection_name, config)
+        }
+
+        # searches in RAM take microseconds, no need for a thread
+        memories = {
+            collection_name: self.recall_from_collection(collection_name, config, in_memory=True)
+            for collection_name, config in recall_configs.items()
+            if collection_name not in futures
+        }
+        results = await asyncio.gather(*futures.values())
+        memories.update(zip(futures.keys(), results))
+
+        return {collection_name: memories[collection_name] for collection_name in recall_configs}
+
+    def submit_recall(self, collection_name: str, config: Dict):
+        # recall threads do not inherit the caller context, pass it along to trace the query
+        return self.recall_executor.submit(
+            contextvars.copy_context().run,
+            self.recall_from_collection,
+            collection_name,
+            config,
+        )
+
+    def recall_from_collection(self, collection_name: str, config: Dict, in_memory: bool = False) -> List:
+        with span(f"recall.{collection_name}", k=config.get("k"), in_memory=in_memory):
+            if in_memory:
+                return self.procedural_index.recall_memories_from_embedding(**config)
+            return self.collections[collection_name].recall_memories_from_embedding(**config)
+
+    def recalls_in_parallel(self) -> bool:
+        """Whether collections are queried concurrently. Calls to Qdrant local mode are serialized."""
+        return not isinstance(self.vector_db, SerializedQdrantClient)
+
+    def recalls_in_memory(self, collection_name: str, config: Dict) -> bool:
+        """Whether a recall is served by the copy of procedural memory in RAM, instead of Qdrant."""
+        return (
+            collection_name == "procedural"
+            and not config.get("metadata")
+            and self.procedural_index_is_valid()
+        )
+
+    def procedural_signature(self) -> tuple:
+        """Fingerprint of procedural memory seen by all workers:
+        the manifest of the last triggers sync (in the settings) and the number of points."""
+        manifest = crud.get_setting_by_name(name=PROCEDURES_MANIFEST)
+        digest = manifest["value"].get("digest") if manifest else None
+        return (digest, self.procedural.count_points())
+
+    def procedural_index_is_valid(self) -> bool:
+        """Whether the copy of procedural memory in RAM can be searched.
+
+        Changes made by this process are tracked by the collection version. Changes made by other workers
+        sharing Qdrant (e.g. a triggers sync) are found comparing the procedural signature,
+        every `INDEX_CHECK_INTERVAL` seconds at most: the index is then built again.
+        """
+
+        if not self.procedural_index.is_up_to_date():
+            return False
+        if time.monotonic() - self._index_checked_at < self.INDEX_CHECK_INTERVAL:
+            return True
+
+        with self._index_lock:
+            # another thread may have checked in the meantime
+            if time.monotonic() - self._index_checked_at >= self.INDEX_CHECK_INTERVAL:
+                signature = self.procedural_signature()
+                if signature != self.procedural_index.signature:
+                    log.debug("Procedural memory was changed by another worker, loading it again")
+                    self.procedural_index.build(self.procedural, signature)
+                self._index_checked_at = time.monotonic()
+        return self.procedural_index.is_up_to_date()
+
+    def refresh_procedural_index(self):
+        """Load procedural memory in RAM again, if it changed since the last time."""
+        with self._index_lock:
+            signature = self.procedural_signature()
+            if not self.procedural_index.is_up_to_date() or signature != self.procedural_index.signature:
+                self.procedural_index.build(self.procedural, signature)
+            self._index_checked_at = time.monotonic()
+
+    def drop_procedural_index(self):
+        """Stop searching procedural memory in RAM (e.g. the collection is deleted), until the next refresh."""
+        with self._index_lock:
+            self.procedural_index.clear()
+
     def delete_collection(self, collection_name: str):
         """Delete specific vector collection"""
         
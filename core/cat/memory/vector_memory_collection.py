@@ -1,11 +1,12 @@
 import os
 import uuid
-from typing import Any, List, Iterable, Optional
+from typing import Any, List, Iterable, Iterator, Optional
 import requests
 
 from qdrant_client.qdrant_remote import QdrantRemote
 from qdrant_client.http.models import (
     PointStruct,
+    Record,
     Distance,
     VectorParams,
     Filter,
@@ -23,6 +24,7 @@ from qdrant_client.http.models import (
 
 from langchain.docstore.document import Document
 
+from cat.memory.serialized_qdrant_client import SerializedQdrantClient
 from cat.log import log
 from cat.env import get_env
 
@@ -41,6 +43,9 @@ class VectorMemoryCollection:
         self.embedder_name = embedder_name
         self.embedder_size = embedder_size
 
+        # incremented on each change made through this object (copies of the collection check it)
+        self.version = 0
+
         # Check if memory collection exists also in vectorDB, otherwise create it
         self.create_db_collection_if_not_exists()
 
@@ -194,32 +199,99 @@ class VectorMemoryCollection:
             Point id as saved into the vectorstore.
         """
 
-        # TODO: may be adapted to upload batches of points as langchain does.
-        # Not necessary now as the bottleneck is the embedder
-        point = PointStruct(
-            id=id or uuid.uuid4().hex,
-            payload={
-                "page_content": content,
-                "metadata": metadata,
-            },
-            vector=vector,
-        )
-
-        update_status = self.client.upsert(
-            collection_name=self.collection_name, points=[point], **kwargs
+        points = self.add_points(
+            contents=[content],
+            vectors=[vector],
+            metadata=[metadata],
+            ids=[id],
+            **kwargs,
         )
 
-        if update_status.status == "completed":
+        if len(points) > 0:
             # returnign stored point
-            return point # TODOV2 return internal MemoryPoint
+            return points[0] # TODOV2 return internal MemoryPoint
         else:
             return None
 
+    def add_points(
+        self,
+        contents: List[str],
+        vectors: List[Iterable],
+        metadata: Optional[List[dict]] = None,
+        ids: Optional[List[Optional[str]]] = None,
+        batch_size: int = 256,
+        wait: bool = True,
+        **kwargs: Any,
+    ) -> List[PointStruct]:
+        """Add many points (and their metadata) to the vectorstore, upserting them in batches.
+
+        Args:
+            contents: original texts.
+            vectors: Embedding vectors, one for each text.
+            metadata: Optional metadata dicts, one for each text.
+            ids:
+                Optional ids to associate with the points. Ids have to be uuid-like strings.
+                Missing (None) ids are generated.
+            batch_size: Maximum number of points sent to the vector DB in a single upsert.
+            wait:
+                If False, do not wait for the vector DB to apply the changes (fire-and-forget).
+
+        Returns:
+            Points as saved into the vectorstore. With `wait=True`, points from failed batches are left out.
+        """
+
+        if metadata is None:
+            metadata = [None] * len(contents)
+        if ids is None:
+            ids = [None] * len(contents)
+
+        if not (len(contents) == len(vectors) == len(metadata) == len(ids)):
+            raise ValueError(
+                "contents, vectors, metadata and ids must have the same length"
+            )
+
+        points = [
+            PointStruct(
+                id=id or uuid.uuid4().hex,
+                payload={
+                    "page_content": content,
+                    "metadata": meta,
+                },
+                vector=vector,
+            )
+            for content, vector, meta, id in zip(contents, vectors, metadata, ids)
+        ]
+
+        batch_size = max(1, batch_size)
+        stored_points = []
+        try:
+            for i in range(0, len(points), batch_size):
+                batch = points[i : i + batch_size]
+                update_status = self.client.upsert(
+                    collection_name=self.collection_name,
+                    points=batch,
+                    wait=wait,
+                    **kwargs,
+                )
+
+                # with wait=False Qdrant only acknowledges the request
+                if not wait or update_status.status == "completed":
+                    stored_points += batch
+                else:
+                    log.warning(
+                        f"Collection {self.collection_name}: {len(batch)} points not stored (status {update_status.status})"
+                    )
+        finally:
+            self.version += 1
+
+        return stored_points
+
     def delete_points_by_metadata_filter(self, metadata=None):
         res = self.client.delete(
             collection_name=self.collection_name,
             points_selector=self._qdrant_filter_from_dict(metadata),
         )
+        self.version += 1
         return res
 
     def delete_points(self, points_ids):
@@ -228,19 +300,21 @@ class VectorMemoryCollection:
             collection_name=self.collection_name,
             points_selector=points_ids,
         )
+        self.version += 1
         return res
 
     def recall_memories_from_embedding(
-        self, embedding, metadata=None, k=5, threshold=None
+        self, embedding, metadata=None, k=5, threshold=None, with_vectors=False
     ):
-        """Retrieve similar memories from embedding"""
+        """Retrieve similar memories from embedding.
+        Memory vectors are only returned if `with_vectors` is True, otherwise they are None."""
 
         memories = self.client.query_points(
             collection_name=self.collection_name,
             query=embedding,
             query_filter=self._qdrant_filter_from_dict(metadata),
             with_payload=True,
-            with_vectors=True,
+            with_vectors=with_vectors,
             limit=k,
             score_threshold=threshold,
             search_params=SearchParams(
@@ -284,21 +358,42 @@ class VectorMemoryCollection:
     def get_all_points(
             self,
             limit: int = 10000,
-            offset: str | None = None
+            offset: str | None = None,
+            with_vectors: bool = True,
         ):
         """Retrieve all the points in the collection with an optional offset and limit."""
         
         # retrieving the points
         all_points, next_page_offset = self.client.scroll(
             collection_name=self.collection_name,
-            with_vectors=True,
+            with_vectors=with_vectors,
             offset=offset,  # Start from the given offset, or the beginning if None.
             limit=limit # Limit the number of points retrieved to the specified limit.
         )
 
         return all_points, next_page_offset
 
+    def scroll_points(self, page_size: int = 1000, with_vectors: bool = False) -> Iterator[Record]:
+        """Iterate over all the points in the collection, fetching them one page at a time.
+        Vectors are not fetched unless `with_vectors` is True."""
+
+        offset = None
+        while True:
+            points, offset = self.get_all_points(
+                limit=page_size, offset=offset, with_vectors=with_vectors
+            )
+            yield from points
+            if offset is None:
+                break
+
+    def count_points(self) -> int:
+        """Exact number of points in the collection."""
+        return self.client.count(collection_name=self.collection_name, exact=True).count
+
     def db_is_remote(self):
+        # only Qdrant local mode is wrapped to serialize calls
+        if isinstance(self.client, SerializedQdrantClient):
+            return False
         return isinstance(self.client._client, QdrantRemote)
 
     # dump collection on disk before deleting
@@ -22,6 +22,8 @@ class WorkingMemory(BaseModelDict):
         An optional reference to a CatForm currently in use.
     recall_query : str, default=""
         A string that stores the last recall query.
+    recall_query_embedding : Optional[List[float]], default=None
+        The embedding of the last recall query, only kept during the turn (not serialized).
     episodic_memories : List
         A list for storing episodic memories.
     declarative_memories : List
@@ -30,6 +32,8 @@ class WorkingMemory(BaseModelDict):
         A list for storing procedural memories.
     model_interactions : List[ModelInteraction]
         A list of interactions with models.
+    plugin_timings : List[dict]
+        Durations of plugins hooks, tools and forms run in the current turn (only if profiling is enabled).
     """
 
     history: List[ConversationMessage] = []
@@ -38,12 +42,21 @@ class WorkingMemory(BaseModelDict):
 
     active_form: Optional[CatForm] = None
     recall_query: str = ""
+    recall_query_embedding: Optional[List[float]] = None
     
     episodic_memories: List = []
     declarative_memories: List = []
     procedural_memories: List = []
     
     model_interactions: List[ModelInteraction] = []
+    plugin_timings: List[dict] = []
+
+    def __getstate__(self):
+        # the recall embedding is not serialized with working memory (i.e. when it is cached),
+        #  it is only needed in the turn it was computed in
+        state = super().__getstate__()
+        state["__dict__"] = {**state["__dict__"], "recall_query_embedding": None}
+        return state
 
     def update_conversation_history(self, message: str, who: str, why = {}):
         """
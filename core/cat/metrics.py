@@ -0,0 +1,399 @@
+"""Runtime metrics, exposed in the Prometheus text format on the `/metrics` endpoint.
+
+Core metrics are defined in this module; plugins can add their own, which are
+exposed along with them.
+
+Examples
+--------
+>>> from cat.metrics import Counter
+>>> pizzas = Counter("my_plugin_pizzas_total", "Pizzas ordered.", labelnames=["size"])
+>>> pizzas.labels(size="large").inc()
+"""
+
+import os
+import math
+import bisect
+import threading
+from typing import Callable, Dict, List, Sequence
+
+import anyio.to_thread
+
+from cat.log import log
+
+
+class MetricsRegistry:
+    """Collection of metrics, rendered together in the Prometheus text format.
+
+    Registering a metric with the name of an existing one replaces it,
+    so plugins can be reloaded without errors.
+    """
+
+    def __init__(self):
+        self.metrics: Dict[str, "Metric"] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: "Metric"):
+        with self._lock:
+            if metric.name in self.metrics:
+                log.debug(f"Metric {metric.name} already registered, replacing it")
+            self.metrics[metric.name] = metric
+
+    def unregister(self, name: str):
+        with self._lock:
+            self.metrics.pop(name, None)
+
+    def get(self, name: str) -> "Metric | None":
+        return self.metrics.get(name)
+
+    def exposition(self) -> str:
+        """Render all metrics in the Prometheus text format (version 0.0.4)."""
+
+        with self._lock:
+            metrics = list(self.metrics.values())
+
+        lines = []
+        for metric in metrics:
+            try:
+                samples = metric.samples()
+            except Exception as e:
+                log.warning(f"Could not collect metric {metric.name}: {e}")
+                continue
+            lines.append(f"# HELP {metric.name} {_escape_help(metric.documentation)}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            for name, labels, value in samples:
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+# default registry, rendered by the `/metrics` endpoint
+registry = MetricsRegistry()
+
+
+class Metric:
+    """Base class of metrics, with optional labels.
+
+    Parameters
+    ----------
+    name : str
+        Metric name, e.g. `ccat_turn_duration_seconds`.
+    documentation : str
+        Description of the metric.
+    labelnames : Sequence[str]
+        Names of the labels, values are given with `labels()`.
+    function : Callable, optional
+        Called when metrics are collected to read the current value, instead of recording it.
+        Returns a number, or a dictionary from tuples of label values to numbers.
+    registry : MetricsRegistry
+        Registry the metric is added to.
+    """
+
+    type = "untyped"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        function: Callable = None,
+        registry: MetricsRegistry = registry,
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.function = function
+
+        self._children: Dict[tuple, object] = {}
+        self._lock = threading.Lock()
+
+        if registry is not None:
+            registry.register(self)
+
+    def labels(self, *labelvalues, **labelkwargs):
+        """Get the child metric for the given label values."""
+
+        if labelkwargs:
+            labelvalues = tuple(labelkwargs[name] for name in self.labelnames)
+        labelvalues = tuple(str(v) for v in labelvalues)
+        if len(labelvalues) != len(self.labelnames):
+            raise ValueError(f"Metric {self.name} expects labels {self.labelnames}")
+
+        child = self._children.get(labelvalues)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(labelvalues, self._new_child())
+        return child
+
+    def _unlabeled(self):
+        if self.labelnames:
+            raise ValueError(f"Metric {self.name} has labels, use `labels()` first")
+        return self.labels()
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def samples(self) -> List[tuple]:
+        """List of (sample name, labels dict, value)."""
+
+        if self.function is not None:
+            value = self.function()
+            if not isinstance(value, dict):
+                value = {(): value}
+            return [
+                (self.name, dict(zip(self.labelnames, labelvalues)), v)
+                for labelvalues, v in value.items()
+            ]
+
+        with self._lock:
+            children = list(self._children.items())
+        samples = []
+        for labelvalues, child in children:
+            samples += child.samples(self.name, dict(zip(self.labelnames, labelvalues)))
+        return samples
+
+
+class _Value:
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1):
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount: float = 1):
+        with self._lock:
+            self.value -= amount
+
+    def set(self, value: float):
+        self.value = float(value)
+
+    def samples(self, name, labels):
+        return [(name, labels, self.value)]
+
+
+class Counter(Metric):
+    """A value that only goes up (e.g. number of requests). Its rate is computed by Prometheus."""
+
+    type = "counter"
+
+    def _new_child(self):
+        return _Value()
+
+    def inc(self, amount: float = 1):
+        if amount < 0:
+            raise ValueError("Counters can only be incremented")
+        self._unlabeled().inc(amount)
+
+
+class Gauge(Metric):
+    """A value that goes up and down (e.g. open connections)."""
+
+    type = "gauge"
+
+    def _new_child(self):
+        return _Value()
+
+    def inc(self, amount: float = 1):
+        self._unlabeled().inc(amount)
+
+    def dec(self, amount: float = 1):
+        self._unlabeled().dec(amount)
+
+    def set(self, value: float):
+        self._unlabeled().set(value)
+
+
+class _HistogramValue:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+    def samples(self, name, labels):
+        with self._lock:
+            counts = list(self.counts)
+            total = self.sum
+
+        samples = []
+        cumulative = 0
+        for bound, count in zip(self.buckets, counts):
+            cumulative += count
+            samples.append((f"{name}_bucket", labels | {"le": _format_value(bound)}, cumulative))
+        samples.append((f"{name}_sum", labels, total))
+        samples.append((f"{name}_count", labels, cumulative))
+        return samples
+
+
+class Histogram(Metric):
+    """Distribution of observed values (e.g. latencies) in cumulative buckets."""
+
+    type = "histogram"
+
+    DEFAULT_BUCKETS = (
+        0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 7.5, 10.0, 30.0, 60.0
+    )
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets=DEFAULT_BUCKETS, **kwargs):
+        buckets = sorted(buckets)
+        if buckets[-1] != math.inf:
+            buckets.append(math.inf)
+        self.buckets = tuple(buckets)
+        super().__init__(name, documentation, labelnames, **kwargs)
+
+    def _new_child(self):
+        return _HistogramValue(self.buckets)
+
+    def observe(self, value: float):
+        self._unlabeled().observe(value)
+
+
+def _escape_help(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("\n", "\\n")
+
+
+def _escape_label_value(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: Dict) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape_label_value(v)}"' for k, v in labels.items()) + "}"
+
+
+def _format_value(value) -> str:
+    if isinstance(value, str):
+        return value
+    value = float(value)
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if math.isnan(value):
+        return "NaN"
+    if value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+def _resident_memory_bytes() -> float:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        # only available on Linux
+        return math.nan
+
+
+# Core metrics
+
+PROCESS_RESIDENT_MEMORY = Gauge(
+    "process_resident_memory_bytes",
+    "Resident memory size of the Cat process in bytes.",
+    function=_resident_memory_bytes,
+)
+TURN_DURATION = Histogram(
+    "ccat_turn_duration_seconds",
+    "Duration of conversation turns.",
+)
+LLM_DURATION = Histogram(
+    "ccat_llm_duration_seconds",
+    "Duration of LLM calls.",
+    labelnames=["source"],
+)
+LLM_INPUT_TOKENS = Counter(
+    "ccat_llm_input_tokens_total",
+    "Estimated tokens sent to the LLM.",
+    labelnames=["source"],
+)
+LLM_OUTPUT_TOKENS = Counter(
+    "ccat_llm_output_tokens_total",
+    "Estimated tokens generated by the LLM.",
+    labelnames=["source"],
+)
+EMBEDDER_DURATION = Histogram(
+    "ccat_embedder_duration_seconds",
+    "Duration of embedder calls.",
+    labelnames=["source"],
+)
+EMBEDDER_INPUT_TOKENS = Counter(
+    "ccat_embedder_input_tokens_total",
+    "Estimated tokens sent to the embedder.",
+    labelnames=["source"],
+)
+EMBEDDER_BATCH_SIZE = Histogram(
+    "ccat_embedder_batch_size",
+    "Texts embedded together by the embedder batching.",
+    buckets=[1, 2, 4, 8, 16, 32, 64, 128, 256],
+)
+EMBEDDER_BATCH_QUEUE_WAIT = Histogram(
+    "ccat_embedder_batch_queue_wait_seconds",
+    "Time embedding requests wait to be batched.",
+    buckets=[0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0],
+)
+RABBIT_HOLE_INGESTIONS_IN_PROGRESS = Gauge(
+    "ccat_rabbit_hole_ingestions_in_progress",
+    "Files, URLs and memories being ingested by the Rabbit Hole.",
+)
+RABBIT_HOLE_CHUNKS = Counter(
+    "ccat_rabbit_hole_chunks_total",
+    "Chunks stored in declarative memory by the Rabbit Hole.",
+)
+WHITE_RABBIT_JOB_DURATION = Histogram(
+    "ccat_white_rabbit_job_duration_seconds",
+    "Duration of scheduled jobs, from submission to the end of their execution.",
+    labelnames=["job", "status"],
+)
+
+
+def register_app_metrics(app):
+    """Register metrics read from the app state when collected (connections, threadpool, cache)."""
+
+    Gauge(
+        "ccat_websocket_connections",
+        "Open websocket connections.",
+        function=lambda: len(app.state.websocket_manager.connections),
+    )
+
+    # called by the `/metrics` endpoint, in the event loop owning the default thread limiter
+    Gauge(
+        "ccat_threadpool_busy_threads",
+        "Threads of the default threadpool (hooks, tools, sync endpoints) currently busy.",
+        function=lambda: anyio.to_thread.current_default_thread_limiter().borrowed_tokens,
+    )
+    Gauge(
+        "ccat_threadpool_max_threads",
+        "Size of the default threadpool.",
+        function=lambda: anyio.to_thread.current_default_thread_limiter().total_tokens,
+    )
+
+    def cache_events():
+        cache = app.state.ccat.cache
+        if not hasattr(cache, "stats"):
+            # only caches keeping counters are reported
+            return {}
+        stats = cache.stats()
+        return {(event,): stats[event] for event in ["hits", "misses", "evictions"]}
+
+    def cache_items():
+        cache = app.state.ccat.cache
+        if not hasattr(cache, "stats"):
+            return {}
+        return cache.stats()["items"]
+
+    Counter(
+        "ccat_cache_events_total",
+        "Cache hits, misses and evictions.",
+        labelnames=["event"],
+        function=cache_events,
+    )
+    Gauge(
+        "ccat_cache_items",
+        "Items in the cache.",
+        function=cache_items,
+    )
@@ -3,13 +3,14 @@ import time
 import json
 import mimetypes
 import httpx
-from typing import List, Union
+import tiktoken
+from typing import Callable, List, Union
 from urllib.parse import urlparse
 from urllib.error import HTTPError
 
 from starlette.datastructures import UploadFile
 from langchain.docstore.document import Document
-from qdrant_client.http import models
+from qdrant_client.http.models import PointStruct
 
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_community.document_loaders.parsers.pdf import PDFMinerParser
@@ -19,7 +20,10 @@ from langchain_community.document_loaders.parsers.html.bs4 import BS4HTMLParser
 from langchain.document_loaders.blob_loaders.schema import Blob
 
 from cat.utils import singleton
+from cat.env import get_env
+from cat.factory.custom_embedder import embedder_name
 from cat.log import log
+from cat import metrics
 
 
 @singleton
@@ -81,15 +85,12 @@ class RabbitHole:
 
         """
 
-        # Get file bytes
-        file_bytes = file.file.read()
-
-        # Load fyle byte in a dict
-        memories = json.loads(file_bytes.decode("utf-8"))
+        # Load file in a dict
+        memories = json.load(file.file)
 
         # Check the embedder used for the uploaded memories is the same the Cat is using now
         upload_embedder = memories["embedder"]
-        cat_embedder = str(cat.embedder.__class__.__name__)
+        cat_embedder = embedder_name(cat.embedder)
 
         if upload_embedder != cat_embedder:
             message = f"Embedder mismatch: file embedder {upload_embedder} is different from {cat_embedder}"
@@ -100,10 +101,8 @@ class RabbitHole:
 
         # Store data to upload the memories in batch
         ids = [i["id"] for i in declarative_memories]
-        payloads = [
-            {"page_content": p["page_content"], "metadata": p["metadata"]}
-            for p in declarative_memories
-        ]
+        contents = [p["page_content"] for p in declarative_memories]
+        metadata = [p["metadata"] for p in declarative_memories]
         vectors = [v["vector"] for v in declarative_memories]
 
         log.info(f"Preparing to load {len(vectors)} vector memories")
@@ -118,10 +117,12 @@ class RabbitHole:
             )
             raise Exception(message)
 
-        # Upsert memories in batch mode # TODO REFACTOR: use VectorMemoryCollection.add_point
-        cat.memory.vectors.vector_db.upsert(
-            collection_name="declarative",
-            points=models.Batch(ids=ids, payloads=payloads, vectors=vectors),
+        # Upsert memories in batch mode
+        cat.memory.vectors.declarative.add_points(
+            contents=contents,
+            vectors=vectors,
+            metadata=metadata,
+            ids=ids,
         )
 
     def ingest_file(
@@ -130,7 +131,8 @@ class RabbitHole:
         file: Union[str, UploadFile],
         chunk_size: int | None = None,
         chunk_overlap: int | None = None,
-        metadata: dict = {}
+        metadata: dict = {},
+        progress: Callable | None = None
     ):
         """Load a file in the Cat's declarative memory.
 
@@ -148,6 +150,10 @@ class RabbitHole:
             Number of overlapping tokens between consecutive chunks.
         metadata : dict
             Metadata to be stored with each chunk.
+        progress : Callable, optional
+            Called with the ingestion state ("parsing", "splitting", "embedding", "storing"),
+            the chunks stored so far and the ids of the points stored by the last batch, e.g. by ingestion jobs.
+            Exceptions it raises stop the ingestion.
 
         Notes
         ----------
@@ -159,28 +165,36 @@ class RabbitHole:
         before_rabbithole_stores_documents
         """
 
-        # split file into a list of docs
-        docs = self.file_to_docs(
-            cat=cat,
-            file=file,
-            chunk_size=chunk_size,
-            chunk_overlap=chunk_overlap
-        )
+        metrics.RABBIT_HOLE_INGESTIONS_IN_PROGRESS.inc()
+        try:
+            # split file into a list of docs
+            docs = self.file_to_docs(
+                cat=cat,
+                file=file,
+                chunk_size=chunk_size,
+                chunk_overlap=chunk_overlap,
+                progress=progress
+            )
 
-        # store in memory
-        if isinstance(file, str):
-            filename = file
-        else:
-            filename = file.filename
+            # store in memory
+            if isinstance(file, str):
+                filename = file
+            else:
+                filename = file.filename
 
-        self.store_documents(cat=cat, docs=docs, source=filename, metadata=metadata)
+            self.store_documents(
+                cat=cat, docs=docs, source=filename, metadata=metadata, progress=progress
+            )
+        finally:
+            metrics.RABBIT_HOLE_INGESTIONS_IN_PROGRESS.dec()
 
     def file_to_docs(
         self,
         cat,
         file: Union[str, UploadFile],
         chunk_size: int | None = None,
-        chunk_overlap: int | None = None
+        chunk_overlap: int | None = None,
+        progress: Callable | None = None
     ) -> List[Document]:
         """Load and convert files to Langchain `Document`.
 
@@ -215,8 +229,12 @@ class RabbitHole:
             content_type = mimetypes.guess_type(file.filename)[0]
             source = file.filename
 
-            # Get file bytes
-            file_bytes = file.file.read()
+            # files on disk (i.e. uploads spooled by the `/rabbithole/` endpoints) are read by the parser
+            path = getattr(file.file, "name", None)
+            if isinstance(path, str) and os.path.isfile(path):
+                blob = Blob.from_path(path, mime_type=content_type, metadata={"source": source})
+            else:
+                blob = Blob.from_data(file.file.read(), mime_type=content_type, path=source)
         elif isinstance(file, str):
             # Check if string file is a string or url
             parsed_file = urlparse(file)
@@ -235,23 +253,22 @@ class RabbitHole:
                     file_bytes = request.content
                 except HTTPError as e:
                     log.error(e)
+                blob = Blob.from_data(file_bytes, mime_type=content_type, path=source)
             else:
                 # Get mime type from file extension and source
                 content_type = mimetypes.guess_type(file)[0]
                 source = os.path.basename(file)
 
-                # Get file bytes
-                with open(file, "rb") as f:
-                    file_bytes = f.read()
+                # The file is read by the parser
+                blob = Blob.from_path(file, mime_type=content_type, metadata={"source": source})
         else:
             raise ValueError(f"{type(file)} is not a valid type.")
-        return self.string_to_docs(
+        return self.blob_to_docs(
             cat=cat,
-            file_bytes=file_bytes,
-            source=source,
-            content_type=content_type,
+            blob=blob,
             chunk_size=chunk_size,
-            chunk_overlap=chunk_overlap
+            chunk_overlap=chunk_overlap,
+            progress=progress
         )
 
     def string_to_docs(
@@ -288,19 +305,58 @@ class RabbitHole:
         """
 
         # Load the bytes in the Blob schema
-        blob = Blob(data=file_bytes, mimetype=content_type, source=source).from_data(
-            data=file_bytes, mime_type=content_type, path=source
+        blob = Blob.from_data(data=file_bytes, mime_type=content_type, path=source)
+        return self.blob_to_docs(
+            cat=cat,
+            blob=blob,
+            chunk_size=chunk_size,
+            chunk_overlap=chunk_overlap
         )
+
+    def blob_to_docs(
+        self,
+        cat,
+        blob: Blob,
+        chunk_size: int | None = None,
+        chunk_overlap: int | None = None,
+        progress: Callable | None = None
+    ) -> List[Document]:
+        """Convert a Langchain `Blob` to Langchain `Document`.
+
+        Parses the blob content according to its mime type and splits it in overlapped chunks of text.
+        Blobs pointing to a file on disk are streamed by the parsers, instead of being loaded in memory at once.
+
+        Parameters
+        ----------
+        blob : Blob
+            Content to be converted, with its mime type and source.
+        chunk_size : int
+            Number of tokens in each document chunk.
+        chunk_overlap : int
+            Number of overlapping tokens between consecutive chunks.
+        progress : Callable, optional
+            Called with the ingestion state (see `ingest_file`).
+
+        Returns
+        -------
+        docs : List[Document]
+            List of Langchain `Document` of chunked text.
+        """
+
         # Parser based on the mime type
         parser = MimeTypeBasedParser(handlers=self.file_handlers)
 
         # Parse the text
+        if progress:
+            progress("parsing")
         cat.send_ws_message(
             "I'm parsing the content. Big content could require some minutes..."
         )
         super_docs = parser.parse(blob)
 
         # Split
+        if progress:
+            progress("splitting")
         cat.send_ws_message("Parsing completed. Now let's go with reading process...")
         docs = self.__split_text(
             cat=cat,
@@ -315,12 +371,15 @@ class RabbitHole:
             cat,
             docs: List[Document],
             source: str, # TODOV2: is this necessary?
-            metadata: dict = {}
+            metadata: dict = {},
+            progress: Callable | None = None
         ) -> None:
         """Add documents to the Cat's declarative memory.
 
         This method loops a list of Langchain `Document` and adds some metadata. Namely, the source filename and the
-        timestamp of insertion. Once done, the method notifies the client via Websocket connection.
+        timestamp of insertion. Documents are then embedded and stored in batches, bounded both by number of chunks
+        (`CCAT_RABBIT_HOLE_BATCH_SIZE`) and by number of tokens (`CCAT_RABBIT_HOLE_BATCH_TOKENS`).
+        Once done, the method notifies the client via Websocket connection.
 
         Parameters
         ----------
@@ -330,11 +389,15 @@ class RabbitHole:
             Source name to be added as a metadata. It can be a file name or an URL.
         metadata : dict
             Metadata to be stored with each chunk.
+        progress : Callable, optional
+            Called with the ingestion state and the chunks stored so far, before and after each batch,
+            and with the ids of the points stored by the batch (see `ingest_file`).
 
         Notes
         -------
         At this point, it is possible to customize the Cat's behavior using the `before_rabbithole_insert_memory` hook
         to edit the memories before they are inserted in the vector database.
+        The hook is still executed once per chunk, before the chunk joins a batch.
 
         See Also
         --------
@@ -348,10 +411,19 @@ class RabbitHole:
             "before_rabbithole_stores_documents", docs, cat=cat
         )
 
-        # classic embed
+        # batch limits
+        batch_size = max(1, int(get_env("CCAT_RABBIT_HOLE_BATCH_SIZE")))
+        batch_max_tokens = max(1, int(get_env("CCAT_RABBIT_HOLE_BATCH_TOKENS")))
+
+        if progress:
+            progress("embedding", chunks_done=0, chunks_total=len(docs))
+
+        # embed in batches
         time_last_notification = time.time()
         time_interval = 10  # a notification every 10 secs
         stored_points = []
+        batch = []
+        batch_tokens = 0
         for d, doc in enumerate(docs):
             if time.time() - time_last_notification > time_interval:
                 time_last_notification = time.time()
@@ -371,21 +443,32 @@ class RabbitHole:
                 "before_rabbithole_insert_memory", doc, cat=cat
             )
             inserting_info = f"{d + 1}/{len(docs)}):    {doc.page_content}"
-            if doc.page_content != "":
-                doc_embedding = cat.embedder.embed_documents([doc.page_content])
-                stored_point = cat.memory.vectors.declarative.add_point(
-                    doc.page_content,
-                    doc_embedding[0],
-                    doc.metadata,
-                )
-                stored_points.append(stored_point)
-
-                log.info(f"Inserted into memory ({inserting_info})")
-            else:
+            if doc.page_content == "":
                 log.info(f"Skipped memory insertion of empty doc ({inserting_info})")
-
-            # wait a little to avoid APIs rate limit errors
-            time.sleep(0.05)
+                continue
+
+            # flush the current batch if this doc does not fit in it
+            doc_tokens = self.__count_tokens(doc.page_content)
+            if batch and (
+                len(batch) >= batch_size or batch_tokens + doc_tokens > batch_max_tokens
+            ):
+                points = self.__store_documents_batch(cat, batch, progress)
+                stored_points += points
+                if progress:
+                    progress("embedding", chunks_done=len(stored_points), point_ids=[p.id for p in points])
+                batch = []
+                batch_tokens = 0
+
+            batch.append(doc)
+            batch_tokens += doc_tokens
+            log.info(f"Queued for memory insertion ({inserting_info})")
+
+        # last (partial) batch
+        if batch:
+            points = self.__store_documents_batch(cat, batch, progress)
+            stored_points += points
+            if progress:
+                progress("storing", chunks_done=len(stored_points), point_ids=[p.id for p in points])
 
         # hook the points after they are stored in the vector memory
         cat.mad_hatter.execute_hook(
@@ -401,6 +484,34 @@ class RabbitHole:
 
         log.info(f"Done uploading {source}")
 
+    def __count_tokens(self, text: str) -> int:
+        # same encoding used by the default text splitter
+        encoding = tiktoken.get_encoding("cl100k_base")
+        return len(encoding.encode(text))
+
+    def __store_documents_batch(self, cat, docs: List[Document], progress=None) -> List[PointStruct]:
+        """Embed a batch of documents with a single embedder call and store them with a single upsert."""
+
+        start_time = time.perf_counter()
+        doc_embeddings = cat.embedder.embed_documents([doc.page_content for doc in docs])
+        metrics.EMBEDDER_DURATION.labels(source="rabbit_hole").observe(time.perf_counter() - start_time)
+
+        if progress:
+            progress("storing")
+
+        points = cat.memory.vectors.declarative.add_points(
+            contents=[doc.page_content for doc in docs],
+            vectors=doc_embeddings,
+            metadata=[doc.metadata for doc in docs],
+        )
+        metrics.RABBIT_HOLE_CHUNKS.inc(len(points))
+
+        # wait a little to avoid APIs rate limit errors
+        time.sleep(0.05)
+
+        log.info(f"Inserted {len(points)}/{len(docs)} memories into declarative memory")
+        return points
+
     def __split_text(self, cat, text, chunk_size, chunk_overlap):
         """Split text in overlapped chunks.
 
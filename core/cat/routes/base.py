@@ -1,10 +1,11 @@
 from fastapi import APIRouter, Body
-from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import PlainTextResponse
 from typing import Dict
 import tomli
 from cat.auth.permissions import AuthPermission, AuthResource, check_permissions
 
 from cat.convo.messages import CatMessage
+from cat import metrics
 
 router = APIRouter()
 
@@ -21,6 +22,18 @@ async def status(
     return {"status": "We're all mad here, dear!", "version": project_toml["version"]}
 
 
+@router.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics(
+    cat=check_permissions(AuthResource.STATUS, AuthPermission.READ),
+) -> PlainTextResponse:
+    """Runtime metrics in the Prometheus text format, including the ones added by plugins"""
+
+    return PlainTextResponse(
+        metrics.registry.exposition(),
+        media_type="text/plain; version=0.0.4; charset=utf-8",
+    )
+
+
 @router.post("/message", response_model=CatMessage)
 async def message_with_cat(
     payload: Dict = Body({"text": "hello!"}),
@@ -28,5 +41,5 @@ async def message_with_cat(
 ) -> Dict:
     """Get a response from the Cat"""
     user_message_json = {"user_id": cat.user_id, **payload}
-    answer = await run_in_threadpool(cat.run, user_message_json, True)
+    answer = await cat.arun(user_message_json, True)
     return answer
@@ -4,6 +4,7 @@ from cat.auth.permissions import AuthPermission, AuthResource, check_permissions
 from fastapi import Request, APIRouter, Body, HTTPException
 
 from cat.factory.embedder import get_allowed_embedder_models, get_embedders_schemas
+from cat.factory.custom_embedder import embedder_class
 from cat.db import crud, models
 from cat.log import log
 from cat import utils
@@ -39,7 +40,7 @@ def get_embedders_settings(
         # Deduce selected embedder:
         ccat = request.app.state.ccat
         for embedder_config_class in reversed(SUPPORTED_EMDEDDING_MODELS):
-            if isinstance(ccat.embedder, embedder_config_class._pyclass.default):
+            if issubclass(embedder_class(ccat.embedder), embedder_config_class._pyclass.default):
                 selected = embedder_config_class.__name__
 
     saved_settings = crud.get_settings_by_category(category=EMBEDDER_CATEGORY)
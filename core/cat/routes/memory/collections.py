@@ -42,6 +42,7 @@ async def wipe_collections(
     collections = list(vector_memory.collections.keys())
 
     to_return = {}
+    vector_memory.drop_procedural_index()
     for c in collections:
         ret = vector_memory.delete_collection(c)
         to_return[c] = ret
@@ -73,6 +74,8 @@ async def wipe_single_collection(
         )
 
     to_return = {}
+    if collection_id == "procedural":
+        vector_memory.drop_procedural_index()
     ret = vector_memory.delete_collection(collection_id)
     to_return[collection_id] = ret
 
@@ -5,6 +5,7 @@ import time
 
 from cat.auth.permissions import AuthPermission, AuthResource, check_permissions
 from cat.memory.vector_memory import VectorMemory
+from cat.factory.custom_embedder import embedder_name
 from cat.looking_glass.stray_cat import StrayCat
 from cat.log import log
 
@@ -54,7 +55,7 @@ async def recall_memory_points_from_text(
             user_filter = None
 
         memories = cat.memory.vectors.collections[c].recall_memories_from_embedding(
-            query_embedding, k=k, metadata=user_filter
+            query_embedding, k=k, metadata=user_filter, with_vectors=True
         )
 
         recalled[c] = []
@@ -69,9 +70,7 @@ async def recall_memory_points_from_text(
     return {
         "query": query,
         "vectors": {
-            "embedder": str(
-                cat.embedder.__class__.__name__
-            ),  # TODO: should be the config class name
+            "embedder": embedder_name(cat.embedder),  # TODO: should be the config class name
             "collections": recalled,
         },
     }
@@ -140,7 +139,7 @@ async def recall_memory_points(
             metadata.pop("source", None)
 
         memories = cat.memory.vectors.collections[c].recall_memories_from_embedding(
-            query_embedding, k=k, metadata=metadata
+            query_embedding, k=k, metadata=metadata, with_vectors=True
         )
 
         recalled[c] = []
@@ -155,9 +154,7 @@ async def recall_memory_points(
     return {
         "query": query,
         "vectors": {
-            "embedder": str(
-                cat.embedder.__class__.__name__
-            ),  # TODO: should be the config class name
+            "embedder": embedder_name(cat.embedder),  # TODO: should be the config class name
             "collections": recalled,
         },
     }
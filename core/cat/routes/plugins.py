@@ -202,6 +202,49 @@ async def get_plugins_settings(
     }
 
 
+@router.get("/profiling")
+async def get_plugins_profiling(
+    request: Request,
+    cat=check_permissions(AuthResource.PLUGINS, AuthPermission.READ),
+) -> Dict:
+    """Returns call counts, errors and latencies (seconds) of plugins hooks, tools, forms and endpoints.
+    Calls are measured only when profiling is enabled."""
+
+    profiler = request.app.state.ccat.mad_hatter.profiler
+
+    return {
+        "enabled": profiler.enabled,
+        "include_in_why": profiler.include_in_why,
+        "profiling": profiler.stats(),
+    }
+
+
+@router.put("/profiling")
+async def toggle_plugins_profiling(
+    request: Request,
+    enabled: bool = Body(embed=True),
+    cat=check_permissions(AuthResource.PLUGINS, AuthPermission.EDIT),
+) -> Dict:
+    """Enable or disable plugins profiling"""
+
+    profiler = request.app.state.ccat.mad_hatter.profiler
+    profiler.enabled = enabled
+
+    return {"enabled": profiler.enabled}
+
+
+@router.delete("/profiling")
+async def reset_plugins_profiling(
+    request: Request,
+    cat=check_permissions(AuthResource.PLUGINS, AuthPermission.DELETE),
+) -> Dict:
+    """Forget all plugins profiling measurements"""
+
+    request.app.state.ccat.mad_hatter.profiler.reset()
+
+    return {"deleted": True}
+
+
 @router.get("/settings/{plugin_id}")
 async def get_plugin_settings(
     request: Request,
@@ -1,9 +1,7 @@
 import mimetypes
 import httpx
-import io
 import json
 from typing import Dict, List
-from copy import deepcopy
 
 from pydantic import BaseModel, Field, ConfigDict
 
@@ -15,8 +13,11 @@ from fastapi import (
     BackgroundTasks,
     HTTPException,
 )
+from fastapi.concurrency import run_in_threadpool
 
 from cat.auth.permissions import AuthPermission, AuthResource, check_permissions
+from cat.ingestion_queue import IngestionJob, FINISHED_STATES
+from cat.utils import spool_upload_file
 from cat.log import log
 
 
@@ -29,9 +30,12 @@ from cat.log import log
 router = APIRouter()
 
 
-def format_upload_file(upload_file: UploadFile) -> UploadFile:
-    file_content = upload_file.file.read()
-    return UploadFile(filename=upload_file.filename, file=io.BytesIO(file_content))
+def ingest_spooled_memory(cat, file: UploadFile):
+    """Ingest a memory file spooled by `spool_upload_file`, then remove it."""
+    try:
+        cat.rabbit_hole.ingest_memory(cat, file)
+    finally:
+        file.file.close()
 
 
 
@@ -40,7 +44,6 @@ def format_upload_file(upload_file: UploadFile) -> UploadFile:
 async def upload_file(
     request: Request,
     file: UploadFile,
-    background_tasks: BackgroundTasks,
     chunk_size: int | None = Form(
         default=None,
         description="Maximum length of each chunk after the document is split (in tokens)"
@@ -109,13 +112,11 @@ async def upload_file(
             },
         )
 
-    # upload file to long term memory, in the background
-    background_tasks.add_task(
-        # we deepcopy the file because FastAPI does not keep the file in memory after the response returns to the client
-        # https://github.com/tiangolo/fastapi/discussions/10936
-        cat.rabbit_hole.ingest_file,
-        cat,
-        deepcopy(format_upload_file(file)),
+    # upload file to long term memory, queued with the other ingestion jobs
+    job = await run_in_threadpool(
+        request.app.state.ccat.ingestion_queue.submit_file,
+        cat.user_data,
+        file,
         chunk_size=chunk_size,
         chunk_overlap=chunk_overlap,
         metadata=json.loads(metadata)
@@ -126,6 +127,7 @@ async def upload_file(
         "filename": file.filename,
         "content_type": file.content_type,
         "info": "File is being ingested asynchronously",
+        "job_id": job.id,
     }
 
 
@@ -134,7 +136,6 @@ async def upload_file(
 async def upload_files(
     request: Request,
     files: List[UploadFile],
-    background_tasks: BackgroundTasks,
     chunk_size: int | None = Form(
         default=None,
         description="Maximum length of each chunk after the document is split (in tokens)"
@@ -220,13 +221,12 @@ async def upload_files(
                 },
             )
 
-        # upload file to long term memory, in the background
-        background_tasks.add_task(
-            # we deepcopy the file because FastAPI does not keep the file in memory after the response returns to the client
-            # https://github.com/tiangolo/fastapi/discussions/10936
-            cat.rabbit_hole.ingest_file,
-            cat,
-            deepcopy(format_upload_file(file)),
+    for file in files:
+        # upload file to long term memory, queued with the other ingestion jobs
+        job = await run_in_threadpool(
+            request.app.state.ccat.ingestion_queue.submit_file,
+            cat.user_data,
+            file,
             chunk_size=chunk_size,
             chunk_overlap=chunk_overlap,
             # if file.filename in dictionary pass the metadata otherwise pass empty dictionary 
@@ -238,6 +238,7 @@ async def upload_files(
             "filename": file.filename,
             "content_type": file.content_type,
             "info": "File is being ingested asynchronously",
+            "job_id": job.id,
         }
 
     return response
@@ -264,7 +265,7 @@ class UploadURLConfig(BaseModel):
 
 @router.post("/web")
 async def upload_url(
-    background_tasks: BackgroundTasks,
+    request: Request,
     upload_config: UploadURLConfig,
     cat=check_permissions(AuthResource.UPLOAD, AuthPermission.WRITE),
 ):
@@ -282,14 +283,18 @@ async def upload_url(
             )
 
         if response.status_code == 200:
-            # upload file to long term memory, in the background
-            background_tasks.add_task(
-                cat.rabbit_hole.ingest_file,
-                cat,
+            # upload url to long term memory, queued with the other ingestion jobs
+            job = await run_in_threadpool(
+                request.app.state.ccat.ingestion_queue.submit_url,
+                cat.user_data,
                 upload_config.url,
                 **upload_config.model_dump(exclude={"url"})
             )
-            return {"url": upload_config.url, "info": "URL is being ingested asynchronously"}
+            return {
+                "url": upload_config.url,
+                "info": "URL is being ingested asynchronously",
+                "job_id": job.id,
+            }
         else:
             raise HTTPException(
                 status_code=400,
@@ -325,9 +330,9 @@ async def upload_memory(
 
     # Ingest memories in background and notify client
     background_tasks.add_task(
-        cat.rabbit_hole.ingest_memory,
+        ingest_spooled_memory,
         cat,
-        deepcopy(file)
+        await run_in_threadpool(spool_upload_file, file)
     )
 
     # reply to client
@@ -350,3 +355,58 @@ async def get_allowed_mimetypes(
     admitted_types = list(ccat.rabbit_hole.file_handlers.keys())
 
     return {"allowed": admitted_types}
+
+
+def get_user_job(request: Request, cat, job_id: str) -> IngestionJob:
+    job = request.app.state.ccat.ingestion_queue.get(job_id)
+    # jobs of other users do not exist
+    if job is None or job.user_id != cat.user_id:
+        raise HTTPException(
+            status_code=404,
+            detail={"error": f"Ingestion job {job_id} not found"},
+        )
+    return job
+
+
+@router.get("/jobs")
+async def get_ingestion_jobs(
+    request: Request,
+    cat=check_permissions(AuthResource.UPLOAD, AuthPermission.LIST),
+) -> Dict:
+    """List the ingestion jobs of the user, most recent first.
+
+    Jobs go through the `queued`, `parsing`, `splitting`, `embedding` and `storing` states,
+    and end up `done`, `failed` or `cancelled`. Finished jobs are listed for a week.
+    """
+
+    jobs = request.app.state.ccat.ingestion_queue.list(user_id=cat.user_id)
+    return {"jobs": jobs}
+
+
+@router.get("/jobs/{job_id}")
+async def get_ingestion_job(
+    request: Request,
+    job_id: str,
+    cat=check_permissions(AuthResource.UPLOAD, AuthPermission.READ),
+) -> IngestionJob:
+    """Get state and progress of an ingestion job"""
+
+    return get_user_job(request, cat, job_id)
+
+
+@router.delete("/jobs/{job_id}")
+async def cancel_ingestion_job(
+    request: Request,
+    job_id: str,
+    cat=check_permissions(AuthResource.UPLOAD, AuthPermission.DELETE),
+) -> IngestionJob:
+    """Cancel an ingestion job. Queued jobs are cancelled at once,
+    running jobs after the current batch of chunks, removing the chunks they already stored."""
+
+    job = get_user_job(request, cat, job_id)
+    if job.state in FINISHED_STATES:
+        raise HTTPException(
+            status_code=400,
+            detail={"error": f"Ingestion job {job_id} is already {job.state.value}"},
+        )
+    return request.app.state.ccat.ingestion_queue.cancel(job_id)
@@ -1,5 +1,142 @@
+import asyncio
+import threading
+from collections import deque
+
 from fastapi.websockets import WebSocket
 
+from cat.env import get_env
+from cat.log import log
+
+
+class WebsocketSender:
+    """Outbound message queue of a WebSocket connection.
+
+    Messages are enqueued from any thread without waiting for them to be sent,
+    and sent in order by an asyncio task running in the connection's event loop.
+    When the client reads slowly and too many messages are pending, threads sending messages wait
+    (backpressure), and so do coroutines sending with `asend_json`. The event loop thread cannot wait
+    in `send_json`: over the limit, its `chat_token` messages are merged in the last pending one,
+    and its other messages are dropped.
+    Consecutive `chat_token` messages can be coalesced in a single frame,
+    waiting a small time window before sending them.
+
+    Parameters
+    ----------
+    websocket : WebSocket
+        Connection to send messages to.
+    max_pending : int
+        Maximum number of messages waiting to be sent.
+    coalesce_window : float
+        Seconds to wait for more tokens before sending a `chat_token` message. 0 disables coalescing.
+    """
+
+    def __init__(self, websocket: WebSocket, max_pending: int = 256, coalesce_window: float = 0):
+        self.websocket = websocket
+        self.max_pending = max_pending
+        self.coalesce_window = coalesce_window
+
+        self.closed = False
+        self._pending = deque()
+        self._condition = threading.Condition()
+
+        # must be created from the event loop serving the connection
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._wakeup = asyncio.Event()
+        # set when a pending message has been sent
+        self._space = asyncio.Event()
+        self._task = self._loop.create_task(self._drain())
+
+    def send_json(self, data: dict):
+        """Enqueue a message, waiting only if too many messages are pending."""
+
+        with self._condition:
+            # the event loop thread must never wait for itself
+            in_loop = threading.get_ident() == self._loop_thread_id
+            if not in_loop:
+                while len(self._pending) >= self.max_pending and not self.closed:
+                    self._condition.wait()
+
+            if self.closed:
+                return
+
+            was_empty = not self._pending
+            full = len(self._pending) >= self.max_pending
+            last = self._pending[-1] if self._pending else None
+            if (
+                (self.coalesce_window or full)
+                and last is not None
+                and data.get("type") == "chat_token"
+                and last.get("type") == "chat_token"
+            ):
+                self._pending[-1] = last | {"content": last["content"] + data["content"]}
+            elif full:
+                log.warning(f"Too many websocket messages pending, dropping a {data.get('type')} message")
+                return
+            else:
+                self._pending.append(data)
+
+        if was_empty:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    async def asend_json(self, data: dict):
+        """Enqueue a message from the event loop, waiting (without blocking the loop) if too many are pending."""
+
+        if threading.get_ident() != self._loop_thread_id:
+            # another event loop, wait in a thread
+            await asyncio.to_thread(self.send_json, data)
+            return
+
+        while True:
+            with self._condition:
+                if self.closed or len(self._pending) < self.max_pending:
+                    break
+                self._space.clear()
+            await self._space.wait()
+
+        self.send_json(data)
+
+    async def _drain(self):
+        while not self.closed:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+
+            if self.coalesce_window and self._pending and self._pending[0].get("type") == "chat_token":
+                await asyncio.sleep(self.coalesce_window)
+
+            # one message at a time: senders wait until the client has read it
+            while True:
+                with self._condition:
+                    if not self._pending:
+                        break
+                    data = self._pending.popleft()
+
+                try:
+                    await self.websocket.send_json(data)
+                except Exception as e:
+                    log.warning(f"Could not send websocket message: {e}")
+                    self.close()
+                    return
+
+                with self._condition:
+                    self._condition.notify_all()
+                self._space.set()
+
+    def close(self):
+        """Stop sending messages and release waiting threads. Pending messages are dropped."""
+
+        with self._condition:
+            self.closed = True
+            self._pending.clear()
+            self._condition.notify_all()
+
+        if threading.get_ident() == self._loop_thread_id:
+            self._task.cancel()
+            self._space.set()
+        else:
+            self._loop.call_soon_threadsafe(self._task.cancel)
+            self._loop.call_soon_threadsafe(self._space.set)
+
 
 class WebsocketManager:
 
@@ -8,20 +145,37 @@ class WebsocketManager:
         # Keep connections in dictionary: user_id -> WebSocket
         self.connections = {}
 
+        # Outbound queues of the connections: user_id -> WebsocketSender
+        self.senders = {}
+        self.max_pending = int(get_env("CCAT_WS_MAX_PENDING_MESSAGES"))
+        self.coalesce_window = int(get_env("CCAT_WS_TOKEN_COALESCE_MS")) / 1000
+
     def add_connection(self, id: str, websocket: WebSocket):
         """Add a new WebSocket connection"""
-        
+
+        if id in self.senders:
+            self.senders[id].close()
+
         self.connections[id] = websocket
+        self.senders[id] = WebsocketSender(
+            websocket, max_pending=self.max_pending, coalesce_window=self.coalesce_window
+        )
 
     def get_connection(self, id: str) -> WebSocket:
         """Retrieve a WebSocket connection by user id"""
-        
+
         return self.connections.get(id, None)
 
+    def get_sender(self, id: str) -> WebsocketSender:
+        """Retrieve the outbound queue of a WebSocket connection by user id"""
+
+        return self.senders.get(id, None)
+
     def remove_connection(self, id: str):
         """Remove a WebSocket connection by user id"""
 
         if id in self.connections:
             del self.connections[id]
 
-
+        if id in self.senders:
+            self.senders.pop(id).close()
@@ -28,6 +28,7 @@ from cat.routes.openapi import get_openapi_configuration_function
 from cat.routes.websocket.websocket_manager import WebsocketManager
 
 from cat.looking_glass.cheshire_cat import CheshireCat
+from cat.metrics import register_app_metrics
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -47,11 +48,19 @@ async def lifespan(app: FastAPI):
     # keep track of websocket connections
     app.state.websocket_manager = WebsocketManager()
 
+    # runtime metrics read from the app state (connections, threadpool, cache)
+    register_app_metrics(app)
+
+    # ingest queued documents, resuming jobs interrupted by a restart
+    app.state.ccat.ingestion_queue.start()
+
     # startup message with admin, public and swagger addresses
     log.welcome()
 
     yield
 
+    app.state.ccat.ingestion_queue.shutdown()
+
 
 def custom_generate_unique_id(route: APIRoute):
     return f"{route.name}"
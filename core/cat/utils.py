@@ -1,11 +1,14 @@
 """Various utiles used from the projects."""
 
 import os
+import shutil
 import inspect
+import tempfile
 from datetime import timedelta
 from urllib.parse import urlparse
 from typing import Dict, Tuple
 from pydantic import BaseModel, ConfigDict
+from starlette.datastructures import UploadFile
 
 from rapidfuzz.distance import Levenshtein
 from langchain_core.output_parsers import JsonOutputParser
@@ -380,3 +383,32 @@ class BaseModelDict(BaseModel):
         return key in self.keys()
 
 
+# size of the pieces an upload is copied in
+SPOOL_CHUNK_SIZE = 1024 * 1024
+
+
+def spool_upload_file(
+    upload_file: UploadFile, dir: str | None = None, prefix: str = "ccat_upload_", delete: bool = True
+) -> UploadFile:
+    """Copy an upload to a file of its own, to be ingested after the response.
+
+    FastAPI closes uploaded files once the response returns to the client
+    (https://github.com/tiangolo/fastapi/discussions/10936).
+    The copy is made piece by piece, and parsers read it from disk, so memory does not grow with the file size.
+    The copy is a temporary file in `dir` (the system temporary folder if None), removed when closed unless `delete` is False.
+    """
+
+    _, extension = os.path.splitext(upload_file.filename or "")
+    spooled = tempfile.NamedTemporaryFile(prefix=prefix, suffix=extension, dir=dir, delete=delete)
+    try:
+        upload_file.file.seek(0)
+        shutil.copyfileobj(upload_file.file, spooled, SPOOL_CHUNK_SIZE)
+        spooled.seek(0)
+    except Exception:
+        spooled.close()
+        if not delete:
+            os.remove(spooled.name)
+        raise
+    return UploadFile(
+        filename=upload_file.filename, file=spooled, headers=upload_file.headers
+    )
@@ -1,3 +1,4 @@
+import asyncio
 
 from cat.mad_hatter.mad_hatter import MadHatter
 from cat.agents.main_agent import MainAgent
@@ -19,3 +20,12 @@ def test_execute_main_agent(main_agent, stray):
     assert not out.return_direct
     assert out.intermediate_steps == []
     assert "You did not configure" in out.output
+
+
+def test_aexecute_main_agent(main_agent, stray):
+    # empty agent execution, awaiting the LLM
+    out = asyncio.run(main_agent.aexecute(stray))
+    assert isinstance(out, AgentOutput)
+    assert not out.return_direct
+    assert out.intermediate_steps == []
+    assert "You did not configure" in out.output
@@ -3,6 +3,7 @@ import os
 from cat.cache.cache_manager import CacheManager
 from cat.cache.in_memory_cache import InMemoryCache
 from cat.cache.file_system_cache import FileSystemCache
+from cat.cache.redis_cache import RedisCache
 
 
 def test_cache_type():
@@ -10,6 +11,7 @@ def test_cache_type():
     chaches = [
         ("file_system", FileSystemCache),
         ("in_memory", InMemoryCache),
+        ("redis", RedisCache),
     ]
 
     for cache_type, cache_class in chaches:
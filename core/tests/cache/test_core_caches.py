@@ -1,9 +1,16 @@
 import os
+import time
+import pickle
+import shutil
 import pytest
+import fakeredis
 
 from cat.cache.cache_item import CacheItem
 from cat.cache.in_memory_cache import InMemoryCache
 from cat.cache.file_system_cache import FileSystemCache
+from cat.cache.redis_cache import RedisCache
+from cat.memory.working_memory import WorkingMemory
+from cat.convo.messages import UserMessage
 
 
 # utility to create cache instances
@@ -12,6 +19,8 @@ def create_cache(cache_type):
         return InMemoryCache()
     elif cache_type == "file_system":
         return FileSystemCache("/tmp_cache")
+    elif cache_type == "redis":
+        return RedisCache(client=fakeredis.FakeRedis())
     else:
         assert False
 
@@ -35,7 +44,7 @@ def test_cache_creation(cache_type):
             shutil.rmtree("/tmp_cache")
 
 
-@pytest.mark.parametrize("cache_type", ["in_memory", "file_system"])
+@pytest.mark.parametrize("cache_type", ["in_memory", "file_system", "redis"])
 def test_cache_get_insert(cache_type):
 
     cache = create_cache(cache_type)
@@ -62,7 +71,7 @@ def test_cache_get_insert(cache_type):
     assert cache.get_value("b") == {}
 
 
-@pytest.mark.parametrize("cache_type", ["in_memory", "file_system"])
+@pytest.mark.parametrize("cache_type", ["in_memory", "file_system", "redis"])
 def test_cache_delete(cache_type):
 
     cache = create_cache(cache_type)
@@ -83,10 +92,336 @@ def test_cache_max_items():
         cache.insert(CacheItem(str(i), i))
         assert len(cache.items) <= cache.max_items
 
-    assert len(cache.items) == cache.max_items // 10 * 9 + 2
+    # least recently used items are evicted one at a time
+    assert len(cache.items) == cache.max_items
     cached_values = [c.value for c in cache.items.values()]
-    assert cached_values == list(range(10, cache.max_items + 2))
+    assert cached_values == list(range(2, cache.max_items + 2))
+    assert cache.evictions == 2
+
+
+# only in_memory cache
+def test_cache_lru_eviction():
+
+    cache = InMemoryCache(max_items=3)
+
+    for k in ["a", "b", "c"]:
+        cache.insert(CacheItem(k, k))
+
+    # reading "a" makes "b" the least recently used
+    assert cache.get_value("a") == "a"
+    cache.insert(CacheItem("d", "d"))
+
+    assert cache.get_item("b") is None
+    assert list(cache.items.keys()) == ["c", "a", "d"]
+
+
+# only in_memory cache
+def test_cache_max_bytes():
+
+    cache = InMemoryCache(max_bytes=1000)
+
+    for i in range(10):
+        cache.insert(CacheItem(str(i), "x" * 300))
+        assert cache.stats()["bytes"] <= 1000
+
+    assert len(cache.items) == 3
+    assert list(cache.items.keys()) == ["7", "8", "9"]
+
+
+# only in_memory cache
+def test_cache_max_bytes_only():
+
+    # no limit on the number of items, only on their size
+    cache = InMemoryCache(max_items=None, max_bytes=10_000)
+
+    for i in range(200):
+        cache.insert(CacheItem(str(i), i))
+
+    assert len(cache.items) == 200
+    assert cache.evictions == 0
+
+
+# only in_memory cache
+def test_cache_ttl_expiration():
+
+    cache = InMemoryCache()
+
+    cache.insert(CacheItem("a", "a", ttl=1))
+    cache.insert(CacheItem("b", "b"))
+    assert cache.get_value("a") == "a"
+
+    time.sleep(1.1)
+
+    # expired items are removed on insert, without being read
+    cache.insert(CacheItem("c", "c"))
+    assert "a" not in cache.items
+    assert list(cache.items.keys()) == ["b", "c"]
+
+
+# only in_memory cache
+def test_cache_stats():
+
+    cache = InMemoryCache(max_items=1)
+
+    cache.insert(CacheItem("a", "a"))
+    cache.get_item("a")
+    cache.get_item("b")
+    cache.insert(CacheItem("b", "b"))
+
+    assert cache.stats() == {
+        "items": 1,
+        "bytes": None,
+        "hits": 1,
+        "misses": 1,
+        "evictions": 1,
+    }
+
+
+# only file_system cache
+def test_file_system_cache_sharded_atomic_writes():
+
+    try:
+        shutil.rmtree("/tmp_cache", ignore_errors=True)
+        cache = FileSystemCache("/tmp_cache")
+
+        for i in range(20):
+            cache.insert(CacheItem(f"user_{i}_working_memory", i))
+
+        # files are spread in subdirectories, no temporary files are left behind
+        all_files = []
+        for shard in os.listdir("/tmp_cache"):
+            assert os.path.isdir(os.path.join("/tmp_cache", shard))
+            all_files += os.listdir(os.path.join("/tmp_cache", shard))
+        assert len(all_files) == 20
+        assert all(f.endswith(".cache") for f in all_files)
+
+        for i in range(20):
+            assert cache.get_value(f"user_{i}_working_memory") == i
+    finally:
+        if os.path.exists("/tmp_cache"):
+            shutil.rmtree("/tmp_cache")
+
+
+# only file_system cache
+def test_file_system_cache_read_through(monkeypatch):
+
+    try:
+        shutil.rmtree("/tmp_cache", ignore_errors=True)
+        writer = FileSystemCache("/tmp_cache")
+        reader = FileSystemCache("/tmp_cache")
+        writer.insert(CacheItem("a", [0]))
+
+        loads = []
+        original_load = pickle.load
+        def mock_load(f):
+            loads.append(f)
+            return original_load(f)
+        monkeypatch.setattr(pickle, "load", mock_load)
+
+        # first read loads the file, second one reuses its bytes
+        assert reader.get_value("a") == [0]
+        n_loads = len(loads)
+        assert n_loads > 0
+        assert reader.get_value("a") == [0]
+        assert len(loads) == n_loads
+
+        # another process (here, another instance) changes the file
+        writer.insert(CacheItem("a", [1]))
+        assert reader.get_value("a") == [1]
+        assert len(loads) > n_loads
+    finally:
+        if os.path.exists("/tmp_cache"):
+            shutil.rmtree("/tmp_cache")
+
+
+# only file_system cache
+def test_file_system_cache_returns_copies():
+
+    try:
+        shutil.rmtree("/tmp_cache", ignore_errors=True)
+        cache = FileSystemCache("/tmp_cache")
+        value = {"history": ["meow"]}
+        cache.insert(CacheItem("a", value))
+
+        # changes to the inserted or returned values are not cached
+        value["history"].append("purr")
+        item = cache.get_item("a")
+        assert item.value == {"history": ["meow"]}
+        item.value["history"].append("hiss")
+        assert cache.get_value("a") == {"history": ["meow"]}
+        assert cache.get_item("a") is not cache.get_item("a")
+    finally:
+        if os.path.exists("/tmp_cache"):
+            shutil.rmtree("/tmp_cache")
+
+
+# only file_system cache
+def test_file_system_cache_legacy_files():
+
+    try:
+        shutil.rmtree("/tmp_cache", ignore_errors=True)
+        os.makedirs("/tmp_cache")
+        # files written before sharding
+        for item in [CacheItem("a", "a"), CacheItem("b", "b", ttl=1), CacheItem("c", "c")]:
+            with open(f"/tmp_cache/{item.key}.cache", "wb") as f:
+                pickle.dump(item, f)
+        with open("/tmp_cache/foreign.cache", "wb") as f:
+            pickle.dump("not a cache item", f)
+        time.sleep(1.1)
+        cache = FileSystemCache("/tmp_cache")
+
+        # read items are moved to their shard
+        assert cache.get_value("a") == "a"
+        assert not os.path.exists("/tmp_cache/a.cache")
+        assert os.path.exists(cache._get_file_path("a"))
+
+        # expired ones are removed, the others moved
+        assert cache.delete_expired() == 1
+        assert not os.path.exists("/tmp_cache/b.cache")
+        assert not os.path.exists("/tmp_cache/c.cache")
+        assert cache.get_value("c") == "c"
+        assert os.path.exists("/tmp_cache/foreign.cache")
+    finally:
+        if os.path.exists("/tmp_cache"):
+            shutil.rmtree("/tmp_cache")
+
+
+# only file_system cache
+def test_file_system_cache_max_bytes():
+
+    try:
+        shutil.rmtree("/tmp_cache", ignore_errors=True)
+        cache = FileSystemCache("/tmp_cache", max_bytes=10_000)
+
+        def cache_size():
+            return sum(
+                os.path.getsize(os.path.join(root, f)) for root, _, files in os.walk("/tmp_cache") for f in files
+            )
+
+        for i in range(5):
+            cache.insert(CacheItem(str(i), "x" * 1000))
+        # reading "0" makes "1" the least recently used
+        old = time.time() - 60
+        for i in range(5):
+            os.utime(cache._get_file_path(str(i)), (old + i, old + i))
+        assert cache.get_value("0") == "x" * 1000
+
+        # the least recently used items are deleted when the files exceed the budget
+        for i in range(5, 10):
+            cache.insert(CacheItem(str(i), "x" * 1000))
+            assert cache_size() <= 10_000
+        assert cache.get_item("1") is None
+        assert cache.get_value("0") == "x" * 1000
+        assert cache.get_value("9") == "x" * 1000
+    finally:
+        if os.path.exists("/tmp_cache"):
+            shutil.rmtree("/tmp_cache")
+
+
+@pytest.mark.parametrize("cache_type", ["in_memory", "file_system"])
+def test_cache_delete_expired(cache_type):
+
+    try:
+        shutil.rmtree("/tmp_cache", ignore_errors=True)
+        cache = create_cache(cache_type)
+
+        cache.insert(CacheItem("a", "a", ttl=1))
+        cache.insert(CacheItem("b", "b"))
+        time.sleep(1.1)
+
+        cache.delete_expired()
+        assert cache.get_item("a") is None
+        assert cache.get_value("b") == "b"
+
+        if cache_type == "file_system":
+            all_files = []
+            for shard in os.listdir("/tmp_cache"):
+                all_files += os.listdir(os.path.join("/tmp_cache", shard))
+            assert all_files == ["b.cache"]
+        else:
+            assert list(cache.items.keys()) == ["b"]
+    finally:
+        if os.path.exists("/tmp_cache"):
+            shutil.rmtree("/tmp_cache")
+
+
+# only file_system cache
+def test_file_system_cache_delete_expired_foreign_files():
+
+    try:
+        shutil.rmtree("/tmp_cache", ignore_errors=True)
+        cache = FileSystemCache("/tmp_cache")
+        cache.insert(CacheItem("a", "a", ttl=1))
+        time.sleep(1.1)
+
+        # the cache dir is shared with other programs
+        foreign_files = [
+            "/tmp_cache/other_app/expired.cache",  # not a shard
+            "/tmp_cache/00/not_in_this_shard.cache",  # name not hashed to this shard
+        ]
+        for path in foreign_files:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "wb") as f:
+                pickle.dump(0, f)  # expired long ago
+        # a file of this shard, not written by the cache
+        shard = os.path.basename(os.path.dirname(cache._get_file_path("z")))
+        foreign_files.append(os.path.join("/tmp_cache", shard, "z.cache"))
+        os.makedirs(os.path.dirname(foreign_files[-1]), exist_ok=True)
+        with open(foreign_files[-1], "wb") as f:
+            pickle.dump("not a timestamp", f)
+
+        assert cache.delete_expired() == 1
+        assert cache.get_item("a") is None
+        assert all(os.path.exists(path) for path in foreign_files)
+    finally:
+        if os.path.exists("/tmp_cache"):
+            shutil.rmtree("/tmp_cache")
+
+
+# only redis cache
+def test_redis_cache_ttl():
+
+    cache = create_cache("redis")
+
+    cache.insert(CacheItem("a", "a", ttl=10))
+    cache.insert(CacheItem("b", "b", ttl=-1))
+
+    # ttl is handled by the server
+    assert 9000 < cache.client.pttl("ccat:a") <= 10000
+    assert cache.client.pttl("ccat:b") == -1
+    assert cache.get_item("a").ttl == 10
+
+
+# only redis cache
+def test_redis_cache_pipelined():
+
+    cache = create_cache("redis")
+
+    cache.insert_many([CacheItem(str(i), i) for i in range(5)])
+    items = cache.get_items(["0", "4", "missing"])
+
+    assert [i.value for i in items[:2]] == [0, 4]
+    assert items[2] is None
+    assert cache.get_items([]) == []
+
+
+# only redis cache
+def test_redis_cache_working_memory():
 
+    cache = create_cache("redis")
 
+    working_memory = WorkingMemory()
+    for i in range(20):
+        working_memory.update_history(
+            UserMessage(user_id="user", text=f"Hi there, I am message {i}")
+        )
+    working_memory.custom_key = "custom"
+    cache.insert(CacheItem("user_working_memory", working_memory, -1))
 
+    # long working memories are compressed
+    assert cache.client.get("ccat:user_working_memory")[:1] == RedisCache.COMPRESSED
 
+    loaded = cache.get_value("user_working_memory")
+    assert len(loaded.history) == 20
+    assert loaded.history[-1].text == "Hi there, I am message 19"
+    assert loaded.custom_key == "custom"
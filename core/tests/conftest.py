@@ -66,6 +66,7 @@ def clean_up_mocks():
         "tests/mocks/mock_plugin/settings.json",
         "tests/mocks/mock_plugin_folder/mock_plugin",
         "tests/mocks/empty_folder",
+        "tests/mocks/ingestion_jobs",
         "/tmp_test",
     ]
     for tbr in to_be_removed:
@@ -90,6 +91,8 @@ def client(monkeypatch) -> Generator[TestClient, Any, None]:
     os.environ["CCAT_DEBUG"] = "false" # do not autoreload
     # in case tests setup a file system cache, use a different file system cache dir
     os.environ["CCAT_CACHE_DIR"] = "/tmp_test"
+    # ingestion jobs database and uploads
+    os.environ["CCAT_INGESTION_JOBS_DIR"] = "tests/mocks/ingestion_jobs"
 
     # monkeypatch classes
     mock_classes(monkeypatch)
@@ -0,0 +1,232 @@
+import gc
+import json
+import asyncio
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+import httpx
+import pytest
+from concurrent.futures.process import BrokenProcessPool
+
+from cat.factory.custom_embedder import (
+    DumbEmbedder,
+    CachedEmbedder,
+    BatchingEmbedder,
+    EmbeddingsHTTPClient,
+    CustomOpenAIEmbeddings,
+    CustomOllamaEmbeddings,
+    ProcessPoolEmbedder,
+    embedder_class,
+    embedder_name,
+)
+
+
+class FlakyServer:
+    """Embedding API answering with the given statuses first, then with embeddings."""
+
+    def __init__(self, statuses=()):
+        self.statuses = list(statuses)
+        self.requests = []
+
+    def __call__(self, request: httpx.Request):
+        self.requests.append(json.loads(request.content))
+        if self.statuses:
+            return httpx.Response(self.statuses.pop(0))
+
+        texts = self.requests[-1]["input"]
+        texts = texts if isinstance(texts, list) else [texts]
+        embeddings = [[float(len(t)), 1.0] for t in texts]
+        if request.url.path.endswith("api/embed"):
+            return httpx.Response(200, json={"embeddings": embeddings})
+        return httpx.Response(200, json={"data": [{"embedding": e} for e in embeddings]})
+
+
+def http_client(server):
+    # MockTransport works for both the sync and the async client
+    return EmbeddingsHTTPClient(backoff=0, transport=httpx.MockTransport(server))
+
+
+@pytest.mark.parametrize("status", [429, 503])
+def test_embedder_retries(status):
+    server = FlakyServer([status, status])
+    embedder = CustomOllamaEmbeddings("http://ollama:11434", "model", http_client=http_client(server))
+
+    assert embedder.embed_documents(["meow", "hi"]) == [[4.0, 1.0], [2.0, 1.0]]
+    assert len(server.requests) == 3
+    assert server.requests[-1] == {"model": "model", "input": ["meow", "hi"]}
+
+
+def test_embedder_gives_up():
+    # client errors are not retried
+    server = FlakyServer([400])
+    embedder = CustomOpenAIEmbeddings("http://llama", http_client=http_client(server))
+    with pytest.raises(httpx.HTTPStatusError):
+        embedder.embed_query("meow")
+    assert len(server.requests) == 1
+
+    # server errors are retried max_retries times
+    server = FlakyServer([500] * 10)
+    embedder = CustomOpenAIEmbeddings("http://llama", http_client=http_client(server))
+    with pytest.raises(httpx.HTTPStatusError):
+        embedder.embed_query("meow")
+    assert len(server.requests) == 4
+
+
+def test_embedder_async():
+    server = FlakyServer([502])
+    embedder = CustomOpenAIEmbeddings("http://llama", http_client=http_client(server))
+
+    async def embed():
+        return await asyncio.gather(
+            embedder.aembed_query("meow"),
+            embedder.aembed_documents(["a", "bb"]),
+        )
+
+    query, documents = asyncio.run(embed())
+    assert query == [4.0, 1.0]
+    assert documents == [[1.0, 1.0], [2.0, 1.0]]
+    assert len(server.requests) == 3
+
+
+def test_embedder_retry_after():
+    client = http_client(FlakyServer())
+
+    def delay(retry_after):
+        return client._retry_delay(0, httpx.Response(429, headers={"Retry-After": retry_after}))
+
+    assert delay("3") == 3
+    assert delay("3600") == client.MAX_RETRY_AFTER
+    # HTTP dates, also in the past
+    retry_at = datetime.now(timezone.utc) + timedelta(seconds=30)
+    assert 25 < delay(format_datetime(retry_at, usegmt=True)) <= 30
+    assert delay("Wed, 21 Oct 2015 07:28:00 GMT") == 0
+    # invalid values fall back to the backoff
+    assert delay("soon") == client.backoff
+
+
+def test_embedder_http_client_close():
+    client = http_client(FlakyServer())
+
+    async def embed_and_close():
+        await client.apost("http://llama/v1/embeddings", {"input": "meow"})
+        async_client = client.async_client
+        client.close()
+        await asyncio.sleep(0.01)
+        return async_client
+
+    async_client = asyncio.run(embed_and_close())
+    assert client.client.is_closed
+    assert async_client.is_closed
+
+    # connections are closed with the embedder
+    embedder = CustomOpenAIEmbeddings("http://llama")
+    sync_client = embedder.http_client.client
+    del embedder
+    gc.collect()
+    assert sync_client.is_closed
+
+
+def test_embedder_shared_connections():
+    embedder = CustomOllamaEmbeddings("http://ollama:11434", "model")
+    assert embedder.http_client.client.timeout.read == 120
+    # requests wait for a free connection instead of failing
+    assert embedder.http_client.client.timeout.pool is None
+
+
+def test_process_pool_embedder():
+    embedder = ProcessPoolEmbedder(DumbEmbedder, {}, processes=2, batch_size=3)
+    texts = [f"meow {i}" * i for i in range(10)]
+    expected = DumbEmbedder().embed_documents(texts)
+
+    # class and configuration of the embedder in the workers
+    assert embedder_class(embedder) is DumbEmbedder
+    assert embedder_name(CachedEmbedder(embedder)) == "DumbEmbedder"
+    assert embedder.processes == 2
+
+    assert embedder.embed_documents(texts) == expected
+    assert embedder.embed_query(texts[3]) == expected[3]
+
+    async def embed():
+        return await asyncio.gather(
+            embedder.aembed_query(texts[5]),
+            embedder.aembed_documents(texts),
+        )
+
+    query, documents = asyncio.run(embed())
+    assert query == expected[5]
+    assert documents == expected
+
+
+def test_process_pool_embedder_broken():
+    # the model cannot be loaded
+    with pytest.raises(BrokenProcessPool):
+        ProcessPoolEmbedder(DumbEmbedder, {"model_name": "meow"}, processes=1)
+
+
+class AsyncOnlyEmbedder(DumbEmbedder):
+    """Embedder failing if its sync methods are called."""
+
+    def embed_documents(self, texts):
+        raise AssertionError("sync embed_documents called")
+
+    def embed_query(self, text):
+        raise AssertionError("sync embed_query called")
+
+    async def aembed_documents(self, texts):
+        return DumbEmbedder.embed_documents(self, texts)
+
+    async def aembed_query(self, text):
+        return DumbEmbedder.embed_documents(self, [text])[0]
+
+
+def test_embedder_wrappers_async():
+    expected = DumbEmbedder().embed_documents(["meow", "purr", "hiss"])
+
+    # batching sends queries of this embedder, and requests as big as a batch, to the wrapped embedder
+    embedder = CachedEmbedder(BatchingEmbedder(AsyncOnlyEmbedder(), max_batch_size=2))
+
+    async def embed():
+        return await asyncio.gather(
+            embedder.aembed_query("meow"),
+            embedder.aembed_documents(["meow", "purr", "hiss"]),
+        )
+
+    query, documents = asyncio.run(embed())
+    assert query == expected[0]
+    assert documents == expected
+
+    # from cache
+    assert asyncio.run(embedder.aembed_query("meow")) == expected[0]
+    assert asyncio.run(embedder.aembed_documents(["hiss", "meow"])) == [expected[2], expected[0]]
+
+
+def test_embedder_batching_async():
+    embedder = BatchingEmbedder(DumbEmbedder(), window=0.05)
+
+    async def embed():
+        return await asyncio.gather(
+            embedder.aembed_query("meow"),
+            embedder.aembed_documents(["purr"]),
+        )
+
+    query, documents = asyncio.run(embed())
+    assert query == DumbEmbedder().embed_query("meow")
+    assert documents == DumbEmbedder().embed_documents(["purr"])
+
+
+def test_embedder_cache_identity(tmp_path):
+    def identity(embedder):
+        return CachedEmbedder(embedder, cache_dir=str(tmp_path)).namespace
+
+    # same class and settings share cached vectors, also through other wrappers
+    assert identity(CustomOpenAIEmbeddings(url="http://a")) == identity(CustomOpenAIEmbeddings(url="http://a"))
+    assert identity(CustomOpenAIEmbeddings(url="http://a")) == identity(
+        BatchingEmbedder(CustomOpenAIEmbeddings(url="http://a"))
+    )
+
+    # another url, model or class is another embedder
+    assert identity(CustomOpenAIEmbeddings(url="http://a")) != identity(CustomOpenAIEmbeddings(url="http://b"))
+    assert identity(CustomOllamaEmbeddings(base_url="http://a", model="a")) != identity(
+        CustomOllamaEmbeddings(base_url="http://a", model="b")
+    )
+    assert identity(DumbEmbedder()) != identity(CustomOpenAIEmbeddings(url="http://a"))
@@ -1,4 +1,7 @@
+import gc
 import pytest
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
 from langchain_community.llms import BaseLLM
 from langchain_core.embeddings import Embeddings
@@ -9,7 +12,7 @@ from cat.mad_hatter.mad_hatter import MadHatter
 from cat.rabbit_hole import RabbitHole
 from cat.memory.long_term_memory import LongTermMemory
 from cat.agents.main_agent import MainAgent
-from cat.factory.custom_embedder import DumbEmbedder
+from cat.factory.custom_embedder import DumbEmbedder, CachedEmbedder, BatchingEmbedder, embedder_class, embedder_name
 from cat.factory.custom_llm import LLMDefault
 
 
@@ -49,7 +52,9 @@ def test_default_llm_loaded(cheshire_cat):
 
 
 def test_default_embedder_loaded(cheshire_cat):
-    assert isinstance(cheshire_cat.embedder, DumbEmbedder)
+    # the default embedder, behind the embedding cache
+    assert embedder_class(cheshire_cat.embedder) is DumbEmbedder
+    assert isinstance(cheshire_cat.embedder, CachedEmbedder)
 
     sentence = "I'm smarter than a random embedder BTW"
     sample_embed = DumbEmbedder().embed_query(sentence)
@@ -57,6 +62,126 @@ def test_default_embedder_loaded(cheshire_cat):
     assert sample_embed == out
 
 
+class CountingEmbedder(DumbEmbedder):
+    def __init__(self):
+        super().__init__()
+        self.model = "counting"
+        self.embedded_texts = []
+        self.batches = []
+
+    def embed_documents(self, texts):
+        self.embedded_texts += texts
+        self.batches.append(texts)
+        return super().embed_documents(texts)
+
+
+def test_embedder_cache(tmp_path):
+    counting_embedder = CountingEmbedder()
+    embedder = CachedEmbedder(counting_embedder, cache_dir=str(tmp_path))
+
+    # attributes and class of the wrapped embedder are available
+    assert embedder.model == "counting"
+    assert embedder_name(embedder) == "CountingEmbedder"
+    assert embedder_name(BatchingEmbedder(embedder)) == "CountingEmbedder"
+
+    texts = ["Alice", "Hatter", "Alice"]
+    expected = DumbEmbedder().embed_documents(texts)
+    assert embedder.embed_documents(texts) == expected
+    assert counting_embedder.embedded_texts == ["Alice", "Hatter"]
+
+    # cached texts are not embedded again
+    queen = DumbEmbedder().embed_query("Queen")
+    assert embedder.embed_documents(["Hatter", "Queen"]) == [expected[1], queen]
+    # queries are cached separately from documents
+    assert embedder.embed_query("Queen") == queen
+    assert counting_embedder.embedded_texts == ["Alice", "Hatter", "Queen", "Queen"]
+    embedder.embed_query("Queen")
+    assert len(counting_embedder.embedded_texts) == 4
+
+    # embeddings persisted on disk are reused by a new cache
+    counting_embedder.embedded_texts = []
+    embedder = CachedEmbedder(counting_embedder, cache_dir=str(tmp_path))
+    assert embedder.embed_documents(texts) == expected
+    assert counting_embedder.embedded_texts == []
+
+
+def test_embedder_batching():
+    counting_embedder = CountingEmbedder()
+    embedder = BatchingEmbedder(counting_embedder, window=0.2, max_batch_size=10)
+    assert embedder.model == "counting"
+
+    texts = [["Alice"], ["Hatter", "Queen"], ["Alice"], ["Dormouse"]]
+    barrier = threading.Barrier(len(texts))
+
+    def embed(t):
+        barrier.wait()
+        return embedder.embed_documents(t)
+
+    # concurrent requests are embedded together, repeated texts once
+    with ThreadPoolExecutor(max_workers=len(texts)) as executor:
+        results = list(executor.map(embed, texts))
+    assert results == [DumbEmbedder().embed_documents(t) for t in texts]
+    assert len(counting_embedder.batches) == 1
+    assert sorted(counting_embedder.batches[0]) == ["Alice", "Dormouse", "Hatter", "Queen"]
+
+    # requests larger than a batch are not delayed
+    embedder.embed_documents([f"Alice {i}" for i in range(10)])
+    assert len(counting_embedder.batches[-1]) == 10
+
+    # queries are batched only for embedders embedding them as documents
+    assert not embedder.batch_queries
+    assert embedder.embed_query("Alice") == DumbEmbedder().embed_query("Alice")
+    assert BatchingEmbedder(DumbEmbedder()).batch_queries
+
+
+def test_embedder_batching_error():
+    class FailingEmbedder(DumbEmbedder):
+        def embed_documents(self, texts):
+            raise ValueError("no embeddings today")
+
+    embedder = BatchingEmbedder(FailingEmbedder(), window=0.001)
+    with pytest.raises(ValueError, match="no embeddings today"):
+        embedder.embed_documents(["Alice"])
+    with pytest.raises(ValueError, match="no embeddings today"):
+        embedder.embed_query("Alice")
+
+
+def test_embedder_batching_max_size():
+    counting_embedder = CountingEmbedder()
+    embedder = BatchingEmbedder(counting_embedder, window=0.2, max_batch_size=4)
+
+    texts = [["Alice", "Hatter", "Queen"], ["Dormouse", "Rabbit", "Cat"]]
+    barrier = threading.Barrier(len(texts))
+
+    def embed(t):
+        barrier.wait()
+        return embedder.embed_documents(t)
+
+    # a request not fitting in the batch goes in the next one
+    with ThreadPoolExecutor(max_workers=len(texts)) as executor:
+        results = list(executor.map(embed, texts))
+    assert results == [DumbEmbedder().embed_documents(t) for t in texts]
+    assert len(counting_embedder.batches) == 2
+    assert all(len(batch) <= 4 for batch in counting_embedder.batches)
+
+
+def test_embedder_batching_dispatcher_error():
+    embedder = BatchingEmbedder(DumbEmbedder(), window=0.001)
+    embedder._executor.shutdown()
+
+    # requests fail instead of waiting forever, also after the dispatcher stopped
+    for _ in range(2):
+        with pytest.raises(RuntimeError):
+            embedder._enqueue(["Alice"]).result(timeout=5)
+
+    # the executor is shut down with the embedder
+    embedder = BatchingEmbedder(DumbEmbedder())
+    executor = embedder._executor
+    del embedder
+    gc.collect()
+    assert executor._shutdown
+
+
 def test_procedures_embedded(cheshire_cat):
     # get embedded tools
     procedures, _ = cheshire_cat.memory.vectors.procedural.get_all_points()
@@ -82,3 +207,36 @@ def test_procedures_embedded(cheshire_cat):
         expected_embed = cheshire_cat.embedder.embed_query(content)
         assert len(p.vector) == len(expected_embed)  # same embed
         # assert p.vector == expected_embed TODO: Qdrant does unwanted normalization
+
+
+def test_procedures_sync_incremental(cheshire_cat, monkeypatch):
+    procedural = cheshire_cat.memory.vectors.procedural
+    counting_embedder = CountingEmbedder()
+    monkeypatch.setattr(cheshire_cat, "embedder", counting_embedder)
+
+    # scrolls to diff triggers (the procedural index loads points with vectors)
+    scrolls = []
+    scroll_points = procedural.scroll_points
+
+    def counting_scroll_points(**kwargs):
+        if not kwargs.get("with_vectors"):
+            scrolls.append(kwargs)
+        return scroll_points(**kwargs)
+
+    monkeypatch.setattr(procedural, "scroll_points", counting_scroll_points)
+
+    # triggers did not change since startup, procedural memory is not even scrolled
+    cheshire_cat.embed_procedures()
+    assert scrolls == []
+    assert counting_embedder.embedded_texts == []
+
+    # a trigger went missing, only that one is embedded again
+    points, _ = procedural.get_all_points()
+    procedural.delete_points([points[0].id])
+    cheshire_cat.embed_procedures()
+    assert len(scrolls) == 1
+    assert counting_embedder.embedded_texts == [points[0].payload["page_content"]]
+    assert procedural.count_points() == 3
+
+    cheshire_cat.embed_procedures()
+    assert len(scrolls) == 1
@@ -1,3 +1,6 @@
+import json
+import pickle
+import asyncio
 import pytest
 
 from cat.auth.permissions import AuthUserInfo
@@ -5,6 +8,7 @@ from cat.looking_glass.stray_cat import StrayCat
 from cat.memory.working_memory import WorkingMemory
 from cat.convo.messages import MessageWhy, CatMessage
 from cat.mad_hatter.decorators.hook import CatHook
+from cat.factory.custom_embedder import BatchingEmbedder
 
 @pytest.fixture(scope="function")
 def stray_cat(client):
@@ -42,6 +46,72 @@ def test_stray_call_with_text(stray_cat):
     assert isinstance(reply.why, MessageWhy)
 
 
+def test_stray_acall_with_text(stray_cat):
+    msg = {"text": "Where do I go?", "user_id": "Alice"}
+
+    reply = asyncio.run(stray_cat.__acall__(msg))
+
+    assert isinstance(reply, CatMessage)
+    assert "You did not configure" in reply.text
+    assert reply.user_id == "Alice"
+    assert reply.type == "chat"
+    assert isinstance(reply.why, MessageWhy)
+    assert len(stray_cat.working_memory.history) == 2
+
+
+@pytest.mark.parametrize("async_turn", [False, True])
+def test_stray_call_traced(stray_cat, tmp_path, async_turn):
+    export_file = tmp_path / "traces.jsonl"
+    tracer = stray_cat.tracer
+    tracer.enabled = True
+    tracer.include_in_why = True
+    tracer.export_file = str(export_file)
+
+    msg = {"text": "Where do I go?", "user_id": "Alice"}
+    if async_turn:
+        reply = asyncio.run(stray_cat.__acall__(msg))
+    else:
+        reply = stray_cat.__call__(msg)
+
+    spans = {s["name"]: s for s in reply.why.trace}
+    for name in [
+        "turn",
+        "before_cat_reads_message",
+        "recall",
+        "recall.embed_query",
+        "recall.episodic",
+        "recall.declarative",
+        "recall.procedural",
+        "main_agent",
+        "procedures_agent",
+        "memory_agent",
+        "episodic_storage",
+        "before_cat_sends_message",
+    ]:
+        assert spans[name]["trace_id"] == spans["turn"]["trace_id"]
+        assert spans[name]["start_time"] <= spans[name]["end_time"]
+
+    # stages are nested
+    assert spans["turn"]["parent_id"] is None
+    assert spans["recall"]["parent_id"] == spans["turn"]["span_id"]
+    assert spans["recall.episodic"]["parent_id"] == spans["recall"]["span_id"]
+    assert spans["memory_agent"]["parent_id"] == spans["main_agent"]["span_id"]
+
+    # exported in background as OTLP json
+    tracer._executor.submit(lambda: None).result()
+    otlp = json.loads(export_file.read_text().splitlines()[-1])
+    otlp_spans = otlp["resourceSpans"][0]["scopeSpans"][0]["spans"]
+    assert len(otlp_spans) == len(reply.why.trace)
+    assert {s["traceId"] for s in otlp_spans} == {spans["turn"]["trace_id"]}
+
+
+def test_stray_call_not_traced(stray_cat):
+    msg = {"text": "Where do I go?", "user_id": "Alice"}
+    reply = stray_cat.__call__(msg)
+
+    assert "trace" not in reply.why.model_dump()
+
+
 def test_stray_call_with_text_and_image(stray_cat):
     msg = {
         "text": "Where do I go?",
@@ -86,6 +156,120 @@ def test_recall_to_working_memory(stray_cat):
     assert stray_cat.working_memory.episodic_memories[0][0].page_content == msg_text
 
 
+def test_recall_hooks_are_per_collection(stray_cat):
+
+    msg_text = "Where do I go?"
+    stray_cat.__call__({"text": msg_text, "user_id": "Alice"})
+    stray_cat.recall_relevant_memories_to_working_memory(msg_text)
+    assert len(stray_cat.working_memory.episodic_memories) == 1
+
+    # disable only episodic recall
+    def episodic_recall_hook(episodic_recall_config: dict, cat):
+        episodic_recall_config["metadata"] = {"source": "nobody"}
+        return episodic_recall_config
+
+    episodic_recall_hook = CatHook(
+        name="before_cat_recalls_episodic_memories", func=episodic_recall_hook, priority=0
+    )
+    episodic_recall_hook.plugin_id = "episodic_recall_hook"
+    stray_cat.mad_hatter.hooks["before_cat_recalls_episodic_memories"] = [episodic_recall_hook]
+
+    stray_cat.recall_relevant_memories_to_working_memory(msg_text)
+
+    # collections are queried concurrently, each one with its own config
+    assert stray_cat.working_memory.episodic_memories == []
+
+
+def test_recall_vectors_are_opt_in(stray_cat):
+
+    msg_text = "Where do I go?"
+    stray_cat.__call__({"text": msg_text, "user_id": "Alice"})
+
+    # by default vectors are not retrieved
+    stray_cat.recall_relevant_memories_to_working_memory(msg_text)
+    assert len(stray_cat.working_memory.episodic_memories) == 1
+    assert stray_cat.working_memory.episodic_memories[0][2] is None
+
+    # a plugin can ask for them
+    def episodic_recall_hook(episodic_recall_config: dict, cat):
+        episodic_recall_config["with_vectors"] = True
+        return episodic_recall_config
+
+    episodic_recall_hook = CatHook(
+        name="before_cat_recalls_episodic_memories", func=episodic_recall_hook, priority=0
+    )
+    episodic_recall_hook.plugin_id = "episodic_recall_hook"
+    stray_cat.mad_hatter.hooks["before_cat_recalls_episodic_memories"] = [episodic_recall_hook]
+
+    stray_cat.recall_relevant_memories_to_working_memory(msg_text)
+    vector = stray_cat.working_memory.episodic_memories[0][2]
+    assert len(vector) == stray_cat.memory.vectors.episodic.embedder_size
+
+
+def test_episodic_storage_reuses_recall_embedding(stray_cat, monkeypatch):
+
+    embedded_texts = []
+    embed_documents = stray_cat.embedder.embed_documents
+
+    def spy_embed_documents(texts):
+        embedded_texts.extend(texts)
+        return embed_documents(texts)
+
+    monkeypatch.setattr(stray_cat.embedder, "embed_documents", spy_embed_documents)
+
+    msg_text = "Where do I go?"
+    stray_cat.__call__({"text": msg_text, "user_id": "Alice"})
+
+    # user message was embedded only for recall
+    assert embedded_texts == []
+    assert stray_cat.working_memory.recall_query == msg_text
+    points, _ = stray_cat.memory.vectors.episodic.get_all_points()
+    assert len(points) == 1
+    assert len(points[0].vector) == len(stray_cat.working_memory.recall_query_embedding)
+
+    # if recall query is changed by a hook, the message is embedded again
+    def recall_query_hook(recall_query: str, cat):
+        return "Which way should I take?"
+
+    recall_query_hook = CatHook(name="cat_recall_query", func=recall_query_hook, priority=0)
+    recall_query_hook.plugin_id = "recall_query_hook"
+    stray_cat.mad_hatter.hooks["cat_recall_query"] = [recall_query_hook]
+
+    stray_cat.__call__({"text": msg_text, "user_id": "Alice"})
+    assert embedded_texts == [msg_text]
+
+
+def test_episodic_storage_asymmetric_embedder(stray_cat, monkeypatch):
+
+    embedded_texts = []
+    embed_documents = stray_cat.embedder.embed_documents
+
+    def spy_embed_documents(texts):
+        embedded_texts.extend(texts)
+        return embed_documents(texts)
+
+    monkeypatch.setattr(stray_cat.embedder, "embed_documents", spy_embed_documents)
+    # embedder giving different vectors to queries and documents
+    monkeypatch.setattr(BatchingEmbedder, "QUERY_AS_DOCUMENT_EMBEDDERS", ())
+
+    msg_text = "Where do I go?"
+    stray_cat.__call__({"text": msg_text, "user_id": "Alice"})
+
+    # the recall embedding is a query embedding, the message is embedded as a document
+    assert embedded_texts == [msg_text]
+
+
+def test_recall_embedding_not_cached(stray_cat):
+
+    stray_cat.__call__({"text": "Where do I go?", "user_id": "Alice"})
+    assert stray_cat.working_memory.recall_query_embedding is not None
+
+    working_memory = pickle.loads(pickle.dumps(stray_cat.working_memory))
+    assert working_memory.recall_query_embedding is None
+    assert working_memory.recall_query == "Where do I go?"
+    assert working_memory.history == stray_cat.working_memory.history
+
+
 # TODO: should we gather all tests regarding hooks in a folder?
 def test_stray_fast_reply_hook(stray_cat):
     user_msg = "hello"
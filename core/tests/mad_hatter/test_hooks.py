@@ -1,7 +1,11 @@
 import pytest
+import functools
+from copy import deepcopy
 
+import cat.mad_hatter.mad_hatter as mad_hatter_module
 from cat.mad_hatter.mad_hatter import MadHatter
 from cat.mad_hatter.decorators import CatHook
+from cat.mad_hatter.hook_chain import is_identity_hook
 from cat.convo.messages import CatMessage
 
 from tests.utils import create_mock_plugin_zip
@@ -34,3 +38,155 @@ def test_hook_priority_execution(mad_hatter):
 
     out = mad_hatter.execute_hook("before_cat_sends_message", fake_message, cat=None)
     assert out.text == "Priorities: priority 3 priority 2"
+
+
+def test_hook_arguments_copy(mad_hatter):
+    fake_message = CatMessage(text="Priorities:", user_id="Alice")
+    mock_hooks = mad_hatter.hooks["before_cat_sends_message"][:2]
+    copy_counts = [h.copy_count for h in mock_hooks]
+
+    # mock plugin hooks receive copies, the original message is untouched
+    out = mad_hatter.execute_hook("before_cat_sends_message", fake_message, cat=None)
+    assert out is not fake_message
+    assert fake_message.text == "Priorities:"
+
+    for h, copy_count in zip(mock_hooks, copy_counts):
+        assert h.plugin_id == "mock_plugin"
+        assert h.copy_count == copy_count + 1
+        assert h.copy_time > 0
+
+    copy_stats = mad_hatter.hooks_copy_stats()
+    assert {s["plugin_id"] for s in copy_stats} == {"mock_plugin"}
+
+
+def test_hook_arguments_no_copy(mad_hatter):
+    fake_message = CatMessage(text="Hello", user_id="Alice")
+
+    # only core plugin hooks, nothing is copied
+    assert {h.plugin_id for h in mad_hatter.hooks["before_cat_reads_message"]} == {"core_plugin"}
+    out = mad_hatter.execute_hook("before_cat_reads_message", fake_message, cat=None)
+    assert out is fake_message
+
+    # read only and in place hooks receive the original argument
+    received = []
+
+    def read_only_hook(message, cat):
+        received.append(message)
+
+    def in_place_hook(message, cat):
+        received.append(message)
+        message.text += " world"
+
+    read_only_hook = CatHook(
+        name="before_cat_reads_message", func=read_only_hook, priority=2, read_only=True
+    )
+    in_place_hook = CatHook(
+        name="before_cat_reads_message", func=in_place_hook, priority=1, in_place=True
+    )
+    read_only_hook.plugin_id = in_place_hook.plugin_id = "mock_plugin"
+    mad_hatter.hooks["before_cat_reads_message"] = [read_only_hook, in_place_hook]
+
+    out = mad_hatter.execute_hook("before_cat_reads_message", fake_message, cat=None)
+    assert received == [fake_message, fake_message]
+    assert out is fake_message
+    assert fake_message.text == "Hello world"
+    assert read_only_hook.copy_count == in_place_hook.copy_count == 0
+
+
+def test_hook_chain_skips_identity_hooks(mad_hatter):
+    fake_message = CatMessage(text="Hello", user_id="Alice")
+
+    # core plugin hooks only return their first argument, they are never called
+    for hook in mad_hatter.hooks["before_cat_reads_message"]:
+        assert is_identity_hook(hook)
+    assert mad_hatter.hook_chains["before_cat_reads_message"].steps == []
+    assert mad_hatter.execute_hook("before_cat_reads_message", fake_message, cat=None) is fake_message
+
+    # mock plugin hooks do something
+    mock_hooks = mad_hatter.hooks["before_cat_sends_message"][:2]
+    chain = mad_hatter.hook_chains["before_cat_sends_message"]
+    assert [step[0] for step in chain.steps] == mock_hooks
+    assert chain.copy_first
+
+
+def test_hook_chain_rebuilt(mad_hatter):
+    fake_message = CatMessage(text="Hello", user_id="Alice")
+
+    def exclaim(message, cat):
+        message.text += "!"
+        return message
+
+    hook = CatHook(name="before_cat_reads_message", func=exclaim, priority=1)
+    hook.plugin_id = "mock_plugin"
+
+    # hooks list replaced after plugins sync
+    mad_hatter.hooks["before_cat_reads_message"] = [hook]
+    out = mad_hatter.execute_hook("before_cat_reads_message", fake_message, cat=None)
+    assert out.text == "Hello!"
+    assert fake_message.text == "Hello"
+
+    # hooks list changed in place
+    mad_hatter.hooks["before_cat_reads_message"].append(hook)
+    out = mad_hatter.execute_hook("before_cat_reads_message", fake_message, cat=None)
+    assert out.text == "Hello!!"
+
+    # hook replaced in place, same number of hooks
+    def shout(message, cat):
+        message.text = message.text.upper()
+        return message
+
+    mad_hatter.hooks["before_cat_reads_message"][1] = CatHook(
+        name="before_cat_reads_message", func=shout, priority=1
+    )
+    out = mad_hatter.execute_hook("before_cat_reads_message", fake_message, cat=None)
+    assert out.text == "HELLO!"
+
+    with pytest.raises(Exception):
+        mad_hatter.execute_hook("not_a_hook", fake_message, cat=None)
+
+
+def test_hook_chain_keeps_decorated_hooks(mad_hatter):
+    fake_message = CatMessage(text="Hello", user_id="Alice")
+
+    def exclaiming(func):
+        @functools.wraps(func)
+        def wrapper(message, cat):
+            message.text += "!"
+            return func(message, cat)
+        return wrapper
+
+    @exclaiming
+    def identity(message, cat):
+        return message
+
+    # the inner function does nothing, the decorator does
+    hook = CatHook(name="before_cat_reads_message", func=identity, priority=1)
+    hook.plugin_id = "mock_plugin"
+    assert not is_identity_hook(hook)
+
+    mad_hatter.hooks["before_cat_reads_message"] = [hook]
+    out = mad_hatter.execute_hook("before_cat_reads_message", fake_message, cat=None)
+    assert out.text == "Hello!"
+
+
+def test_hook_chain_single_hook_copied_once(mad_hatter, monkeypatch):
+    fake_message = CatMessage(text="Hello", user_id="Alice")
+
+    def exclaim(message, cat):
+        message.text += "!"
+        return message
+
+    hook = CatHook(name="before_cat_reads_message", func=exclaim, priority=1)
+    hook.plugin_id = "mock_plugin"
+    mad_hatter.hooks["before_cat_reads_message"] = [hook]
+
+    copies = []
+    def mock_deepcopy(obj):
+        copies.append(obj)
+        return deepcopy(obj)
+    monkeypatch.setattr(mad_hatter_module, "deepcopy", mock_deepcopy)
+
+    out = mad_hatter.execute_hook("before_cat_reads_message", fake_message, cat=None)
+    assert out.text == "Hello!"
+    assert fake_message.text == "Hello"
+    assert len(copies) == 1
@@ -0,0 +1,49 @@
+import pytest
+
+from cat.mad_hatter.profiler import LatencyHistogram, PluginProfiler
+
+
+def test_latency_histogram():
+    histogram = LatencyHistogram()
+    assert histogram.summary()["p50"] == 0.0
+
+    for _ in range(90):
+        histogram.record(0.001)
+    for _ in range(10):
+        histogram.record(0.1, error=True)
+
+    summary = histogram.summary()
+    assert summary["count"] == 100
+    assert summary["errors"] == 10
+    assert summary["total"] == pytest.approx(1.09)
+    assert summary["max"] == 0.1
+    # percentiles are bucket upper bounds, at most ~19% larger than the real value
+    assert 0.001 <= summary["p50"] < 0.0012
+    assert summary["p95"] == summary["p99"] == 0.1
+
+
+def test_profiler_measure():
+    profiler = PluginProfiler()
+
+    # disabled, nothing is measured
+    with profiler.measure("tool", "mock_plugin", "mock_tool"):
+        pass
+    assert profiler.stats() == []
+
+    profiler.enabled = True
+    with profiler.measure("tool", "mock_plugin", "mock_tool"):
+        pass
+    with pytest.raises(ValueError):
+        with profiler.measure("tool", "mock_plugin", "mock_tool"):
+            raise ValueError()
+
+    stats = profiler.stats()
+    assert len(stats) == 1
+    assert stats[0]["kind"] == "tool"
+    assert stats[0]["plugin_id"] == "mock_plugin"
+    assert stats[0]["name"] == "mock_tool"
+    assert stats[0]["count"] == 2
+    assert stats[0]["errors"] == 1
+
+    profiler.reset()
+    assert profiler.stats() == []
@@ -0,0 +1,83 @@
+import pytest
+
+from cat.looking_glass.cheshire_cat import CheshireCat
+
+
+@pytest.fixture(scope="function")
+def vector_memory(client):
+    yield CheshireCat().memory.vectors
+
+
+def test_procedural_index_built_on_startup(vector_memory):
+    index = vector_memory.procedural_index
+    assert index.is_up_to_date()
+    assert len(index) == vector_memory.procedural.count_points() == 3
+
+
+@pytest.mark.parametrize("threshold", [None, 0.0, 0.5, 0.99])
+@pytest.mark.parametrize("k", [1, 2, 10])
+def test_procedural_index_same_as_qdrant(vector_memory, k, threshold):
+    embedding = CheshireCat().embedder.embed_query("what time is it")
+    config = {"embedding": embedding, "k": k, "threshold": threshold, "with_vectors": True}
+
+    expected = vector_memory.procedural.recall_memories_from_embedding(**config)
+    memories = vector_memory.procedural_index.recall_memories_from_embedding(**config)
+
+    assert [m[3] for m in memories] == [m[3] for m in expected]
+    for memory, expected_memory in zip(memories, expected):
+        assert memory[0] == expected_memory[0]
+        assert memory[1] == pytest.approx(expected_memory[1], abs=1e-5)
+        assert memory[2] == pytest.approx(expected_memory[2], abs=1e-5)
+
+
+def test_procedural_index_out_of_date(vector_memory):
+    embedding = CheshireCat().embedder.embed_query("what time is it")
+    config = {"embedding": embedding, "k": 3, "threshold": 0.0}
+    assert vector_memory.recalls_in_memory("procedural", config)
+
+    # only procedural memory is in RAM, without metadata filters
+    assert not vector_memory.recalls_in_memory("declarative", config)
+    assert not vector_memory.recalls_in_memory("procedural", config | {"metadata": {"source": "get_the_time"}})
+
+    # changes to the collection make the index out of date, recall goes to Qdrant
+    points, _ = vector_memory.procedural.get_all_points()
+    vector_memory.procedural.delete_points([points[0].id])
+    assert not vector_memory.recalls_in_memory("procedural", config)
+    memories = vector_memory.recall_memories_from_embeddings({"procedural": config})["procedural"]
+    assert len(memories) == 2
+
+    vector_memory.refresh_procedural_index()
+    assert vector_memory.recalls_in_memory("procedural", config)
+    assert len(vector_memory.procedural_index) == 2
+
+
+def test_procedural_index_changed_by_other_worker(vector_memory, monkeypatch):
+    embedding = CheshireCat().embedder.embed_query("what time is it")
+    config = {"embedding": embedding, "k": 10, "threshold": 0.0}
+    assert vector_memory.recalls_in_memory("procedural", config)
+
+    # another worker sharing Qdrant deletes a trigger, this process does not see it in the version
+    points, _ = vector_memory.procedural.get_all_points()
+    vector_memory.vector_db.delete("procedural", points_selector=[points[0].id])
+    assert vector_memory.procedural_index.is_up_to_date()
+
+    # the shared signature is checked at intervals, then the index is built again
+    monkeypatch.setattr(vector_memory, "INDEX_CHECK_INTERVAL", 0)
+    assert vector_memory.recalls_in_memory("procedural", config)
+    assert len(vector_memory.procedural_index) == 2
+    memories = vector_memory.recall_memories_from_embeddings({"procedural": config})["procedural"]
+    assert points[0].id not in [m[3] for m in memories]
+
+
+def test_procedural_index_dropped_on_wipe(client):
+    vector_memory = CheshireCat().memory.vectors
+    assert vector_memory.procedural_index.is_up_to_date()
+
+    response = client.delete("/memory/collections/procedural")
+    assert response.status_code == 200
+
+    # the old memory does not search a copy of deleted procedures, the new one is synced again
+    assert not vector_memory.procedural_index.is_up_to_date()
+    new_vector_memory = CheshireCat().memory.vectors
+    assert new_vector_memory.procedural_index.is_up_to_date()
+    assert len(new_vector_memory.procedural_index) == 3
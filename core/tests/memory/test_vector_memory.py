@@ -0,0 +1,82 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from qdrant_client import QdrantClient
+from qdrant_client.http.models import Distance, PointStruct, VectorParams
+
+from cat.looking_glass.cheshire_cat import CheshireCat
+from cat.memory.vector_memory import VectorMemory, SerializedQdrantClient
+from cat.memory.vector_memory_collection import VectorMemoryCollection
+
+
+def test_serialized_qdrant_client():
+
+    client = SerializedQdrantClient(QdrantClient(":memory:"))
+    client.create_collection("test", vectors_config=VectorParams(size=2, distance=Distance.COSINE))
+
+    def upsert_and_query(i):
+        client.upsert("test", points=[PointStruct(id=i, vector=[1.0, float(i)], payload={})])
+        return client.query_points("test", query=[1.0, 0.0], limit=3).points
+
+    # local mode is not thread safe, calls from many threads must not break it
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(upsert_and_query, range(100)))
+
+    assert all(len(points) > 0 for points in results)
+    assert client.count("test").count == 100
+
+
+def test_serialized_client_is_local(client):
+
+    vector_memory = CheshireCat().memory.vectors
+    serialized = SerializedQdrantClient(vector_memory.vector_db)
+    collection = VectorMemoryCollection(
+        client=serialized,
+        collection_name="test",
+        embedder_name="DumbEmbedder",
+        embedder_size=2,
+    )
+
+    assert not collection.db_is_remote()
+    assert collection.count_points() == 0
+
+
+def test_recall_without_threads_in_local_mode(client, monkeypatch):
+
+    vector_memory = CheshireCat().memory.vectors
+    embedding = CheshireCat().embedder.embed_query("what time is it")
+    configs = {
+        name: {"embedding": embedding, "k": 3, "threshold": 0.0}
+        for name in ["episodic", "declarative", "procedural"]
+    }
+    expected = vector_memory.recall_memories_from_embeddings(configs)
+
+    # calls to local Qdrant are serialized, collections are queried one by one
+    monkeypatch.setattr(vector_memory, "vector_db", SerializedQdrantClient(vector_memory.vector_db))
+    assert not vector_memory.recalls_in_parallel()
+
+    def no_threads(*args, **kwargs):
+        raise AssertionError("recall threads used in local mode")
+
+    monkeypatch.setattr(vector_memory, "submit_recall", no_threads)
+
+    assert vector_memory.recall_memories_from_embeddings(configs) == expected
+    assert asyncio.run(vector_memory.arecall_memories_from_embeddings(configs)) == expected
+
+
+def test_recall_threads(client, monkeypatch):
+
+    # shared by all turns and memory reloads
+    recall_executor = CheshireCat().memory.vectors.recall_executor
+    assert recall_executor._max_workers == 40
+    CheshireCat().load_memory()
+    assert CheshireCat().memory.vectors.recall_executor is recall_executor
+
+    # the configured number of threads is used, also when lower than the default
+    monkeypatch.setattr(VectorMemory, "recall_executor", None)
+    monkeypatch.setenv("CCAT_RECALL_THREADS", "4")
+    CheshireCat().load_memory()
+    try:
+        assert CheshireCat().memory.vectors.recall_executor._max_workers == 4
+    finally:
+        CheshireCat().memory.vectors.recall_executor.shutdown()
@@ -0,0 +1,64 @@
+import pytest
+
+from cat.looking_glass.cheshire_cat import CheshireCat
+
+
+@pytest.fixture(scope="function")
+def declarative_memory(client):
+    yield CheshireCat().memory.vectors.declarative
+
+
+def test_add_points(declarative_memory):
+
+    texts = [f"Red Queen {i}" for i in range(5)]
+    vectors = CheshireCat().embedder.embed_documents(texts)
+    metadata = [{"source": "test", "index": i} for i in range(5)]
+
+    # small batches to force more upserts
+    points = declarative_memory.add_points(
+        contents=texts, vectors=vectors, metadata=metadata, batch_size=2
+    )
+
+    assert len(points) == 5
+    for i, p in enumerate(points):
+        assert p.payload["page_content"] == texts[i]
+        assert p.payload["metadata"] == metadata[i]
+
+    stored_points, _ = declarative_memory.get_all_points()
+    assert len(stored_points) == 5
+    assert {p.id for p in stored_points} == {p.id for p in points}
+
+
+def test_add_points_with_ids(declarative_memory):
+
+    ids = [
+        "a1b2c3d4-0000-0000-0000-000000000001",
+        "a1b2c3d4-0000-0000-0000-000000000002",
+    ]
+    vectors = CheshireCat().embedder.embed_documents(["Alice", "Hatter"])
+
+    points = declarative_memory.add_points(
+        contents=["Alice", "Hatter"], vectors=vectors, ids=ids
+    )
+
+    assert [p.id for p in points] == ids
+    assert len(declarative_memory.get_points(ids)) == 2
+
+
+def test_add_points_length_mismatch(declarative_memory):
+
+    with pytest.raises(ValueError):
+        declarative_memory.add_points(contents=["a", "b"], vectors=[[0.0]])
+
+
+def test_scroll_points(declarative_memory):
+
+    texts = [f"Red Queen {i}" for i in range(5)]
+    vectors = CheshireCat().embedder.embed_documents(texts)
+    declarative_memory.add_points(contents=texts, vectors=vectors)
+
+    # all pages are fetched, without vectors
+    points = list(declarative_memory.scroll_points(page_size=2))
+    assert sorted(p.payload["page_content"] for p in points) == texts
+    assert all(p.vector is None for p in points)
+    assert declarative_memory.count_points() == 5
@@ -1,5 +1,5 @@
 import pytest
-from tests.utils import send_websocket_message, get_declarative_memory_contents
+from tests.utils import send_websocket_message, get_declarative_memory_contents, wait_for_ingestion
 from tests.conftest import FAKE_TIMESTAMP
 
 def test_point_deleted(client):
@@ -56,6 +56,7 @@ def test_points_deleted_by_metadata(client):
         files = {"file": (file_name, f, content_type)}
 
         response = client.post("/rabbithole/", files=files)
+        wait_for_ingestion(client)
     # check response
     assert response.status_code == 200
     # check memory contents
@@ -67,6 +68,7 @@ def test_points_deleted_by_metadata(client):
         files = {"file": ("sample2.pdf", f, content_type)}
 
         response = client.post("/rabbithole/", files=files)
+        wait_for_ingestion(client)
     # check response
     assert response.status_code == 200
     # check memory contents
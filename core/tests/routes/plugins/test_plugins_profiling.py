@@ -0,0 +1,64 @@
+from cat.looking_glass.cheshire_cat import CheshireCat
+
+
+def test_profiling_disabled_by_default(client, just_installed_plugin):
+
+    client.post("/message", json={"text": "meow"})
+
+    response = client.get("/plugins/profiling")
+    assert response.status_code == 200
+    json = response.json()
+    assert json["enabled"] is False
+    assert json["include_in_why"] is False
+    assert json["profiling"] == []
+
+
+def test_profiling_hooks_and_endpoints(client, just_installed_plugin):
+
+    response = client.put("/plugins/profiling", json={"enabled": True})
+    assert response.status_code == 200
+    assert response.json() == {"enabled": True}
+
+    client.post("/message", json={"text": "meow"})
+    client.get("/custom/endpoint")
+    client.get("/custom/endpoint")
+
+    response = client.get("/plugins/profiling")
+    profiling = response.json()["profiling"]
+
+    # mock plugin hooks
+    hooks = [p for p in profiling if p["kind"] == "hook" and p["name"] == "before_cat_sends_message"]
+    assert len(hooks) == 1
+    assert hooks[0]["plugin_id"] == "mock_plugin"
+    assert hooks[0]["count"] == 2  # two mock plugin hooks with the same name
+    assert hooks[0]["errors"] == 0
+
+    # core plugin hooks doing nothing are not run
+    assert "core_plugin" not in {p["plugin_id"] for p in profiling}
+
+    endpoints = [p for p in profiling if p["kind"] == "endpoint"]
+    assert len(endpoints) == 1
+    assert endpoints[0]["name"] == "/custom/endpoint"
+    assert endpoints[0]["count"] == 2
+    assert 0 < endpoints[0]["p50"] <= endpoints[0]["p99"] <= endpoints[0]["max"]
+
+    # reset
+    response = client.delete("/plugins/profiling")
+    assert response.status_code == 200
+    assert client.get("/plugins/profiling").json()["profiling"] == []
+
+
+def test_profiling_in_why(client, just_installed_plugin):
+
+    profiler = CheshireCat().mad_hatter.profiler
+    profiler.enabled = True
+    profiler.include_in_why = True
+
+    response = client.post("/message", json={"text": "meow"})
+    plugin_timings = response.json()["why"]["plugin_timings"]
+
+    # answer is built before `before_cat_sends_message` runs
+    assert isinstance(plugin_timings, list)
+    for timing in plugin_timings:
+        assert timing["kind"] in ["hook", "tool", "form"]
+        assert timing["duration"] >= 0
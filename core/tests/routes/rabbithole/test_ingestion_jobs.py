@@ -0,0 +1,104 @@
+import threading
+
+from cat.startup import cheshire_cat_api
+from cat.factory.custom_embedder import EmbedderWrapper
+from tests.utils import get_declarative_memory_contents, wait_for_ingestion
+
+
+def upload_sample(client, file_name="sample.pdf", content_type="application/pdf"):
+    with open(f"tests/mocks/{file_name}", "rb") as f:
+        files = {"file": (file_name, f, content_type)}
+        response = client.post("/rabbithole/", files=files)
+    assert response.status_code == 200
+    return response.json()["job_id"]
+
+
+def test_ingestion_job_done(client):
+    job_id = upload_sample(client)
+    wait_for_ingestion(client)
+
+    response = client.get(f"/rabbithole/jobs/{job_id}")
+    assert response.status_code == 200
+    job = response.json()
+    assert job["id"] == job_id
+    assert job["user_id"] == "user"
+    assert job["source"] == "sample.pdf"
+    assert job["state"] == "done"
+    assert job["error"] is None
+    assert job["chunks_done"] == job["chunks_total"] == 4
+    assert job["throughput"] > 0
+    assert job["created_at"] <= job["started_at"] <= job["finished_at"]
+
+    response = client.get("/rabbithole/jobs")
+    assert response.status_code == 200
+    assert [j["id"] for j in response.json()["jobs"]] == [job_id]
+
+    # chunks keep only the metadata of the upload
+    declarative_memories = get_declarative_memory_contents(client)
+    assert len(declarative_memories) == 4
+    for dm in declarative_memories:
+        assert "ingestion_job" not in dm["metadata"]
+
+
+def test_ingestion_job_not_found(client):
+    response = client.get("/rabbithole/jobs/meow")
+    assert response.status_code == 404
+
+    response = client.delete("/rabbithole/jobs/meow")
+    assert response.status_code == 404
+
+
+def test_ingestion_job_cancel_finished(client):
+    job_id = upload_sample(client)
+    wait_for_ingestion(client)
+
+    response = client.delete(f"/rabbithole/jobs/{job_id}")
+    assert response.status_code == 400
+    assert client.get(f"/rabbithole/jobs/{job_id}").json()["state"] == "done"
+
+
+class BlockingEmbedder(EmbedderWrapper):
+    """Embedder waiting for a signal before embedding documents, after the first call."""
+
+    def __init__(self, embedder):
+        super().__init__(embedder)
+        self.calls = 0
+        self.embedding = threading.Event()
+        self.go_on = threading.Event()
+
+    def embed_documents(self, texts):
+        self.calls += 1
+        if self.calls > 1:
+            self.embedding.set()
+            assert self.go_on.wait(10)
+        return self.embedder.embed_documents(texts)
+
+    def embed_query(self, text):
+        return self.embedder.embed_query(text)
+
+
+def test_ingestion_job_cancel_running(client, monkeypatch):
+    # a batch per chunk
+    monkeypatch.setenv("CCAT_RABBIT_HOLE_BATCH_SIZE", "1")
+    ccat = cheshire_cat_api.state.ccat
+    embedder = BlockingEmbedder(ccat.embedder)
+    monkeypatch.setattr(ccat, "embedder", embedder)
+
+    # let the first chunk be stored, then cancel
+    job_id = upload_sample(client)
+    assert embedder.embedding.wait(10)
+    job = client.get(f"/rabbithole/jobs/{job_id}").json()
+    assert job["state"] == "embedding"
+    assert job["chunks_done"] == 1
+    assert len(get_declarative_memory_contents(client)) == 1
+
+    response = client.delete(f"/rabbithole/jobs/{job_id}")
+    assert response.status_code == 200
+    embedder.go_on.set()
+
+    jobs = wait_for_ingestion(client)
+    assert jobs[0]["state"] == "cancelled"
+    assert jobs[0]["finished_at"] is not None
+
+    # stored chunks are removed
+    assert get_declarative_memory_contents(client) == []
@@ -1,6 +1,10 @@
 
+import os
 import json
-from tests.utils import get_declarative_memory_contents
+
+from langchain.document_loaders.blob_loaders.schema import Blob
+from cat.looking_glass.cheshire_cat import CheshireCat
+from tests.utils import get_declarative_memory_contents, wait_for_ingestion
 
 
 def test_rabbithole_upload_txt(client):
@@ -11,6 +15,7 @@ def test_rabbithole_upload_txt(client):
         files = {"file": (file_name, f, content_type)}
 
         response = client.post("/rabbithole/", files=files)
+        wait_for_ingestion(client)
 
     # check response
     assert response.status_code == 200
@@ -35,6 +40,7 @@ def test_rabbithole_upload_pdf(client):
         files = {"file": (file_name, f, content_type)}
 
         response = client.post("/rabbithole/", files=files)
+        wait_for_ingestion(client)
 
     # check response
     assert response.status_code == 200
@@ -57,6 +63,7 @@ def test_rabbithole_upload_batch_one_file(client):
         files = [ ("files", ((file_name, f, content_type))) ]
 
         response = client.post("/rabbithole/batch", files=files)
+        wait_for_ingestion(client)
 
     # check response
     assert response.status_code == 200
@@ -81,6 +88,7 @@ def test_rabbithole_upload_batch_multiple_files(client):
         files.append(  ("files", ((file_name, open(file_path, "rb"), content_type))) )
 
     response = client.post("/rabbithole/batch", files=files)
+    wait_for_ingestion(client)
 
     # check response
     assert response.status_code == 200
@@ -111,6 +119,7 @@ def test_rabbihole_chunking(client):
         }
 
         response = client.post("/rabbithole/", files=files, data=payload)
+        wait_for_ingestion(client)
 
     # check response
     assert response.status_code == 200
@@ -138,6 +147,7 @@ def test_rabbithole_upload_doc_with_metadata(client):
         payload = {"metadata": json.dumps(metadata)}
 
         response = client.post("/rabbithole/", files=files, data=payload)
+        wait_for_ingestion(client)
 
     # check response
     assert response.status_code == 200
@@ -182,6 +192,7 @@ def test_rabbithole_upload_docs_batch_with_metadata(client):
     }
     
     response = client.post("/rabbithole/batch", files=files, data=payload)
+    wait_for_ingestion(client)
 
     # check response
     assert response.status_code == 200
@@ -195,4 +206,64 @@ def test_rabbithole_upload_docs_batch_with_metadata(client):
         print(dm["metadata"])
         # compare with the metadata of the file
         for k, v in metadata[dm["metadata"]["source"]].items():
-            assert dm["metadata"][k] == v
\ No newline at end of file
+            assert dm["metadata"][k] == v
+
+def test_rabbithole_upload_embeds_in_batches(client, monkeypatch):
+
+    # count embedder calls
+    embedder = CheshireCat().embedder
+    embedded_batches = []
+    original_embed_documents = embedder.embed_documents
+    def mock_embed_documents(texts):
+        embedded_batches.append(len(texts))
+        return original_embed_documents(texts)
+    monkeypatch.setattr(embedder, "embed_documents", mock_embed_documents)
+
+    monkeypatch.setenv("CCAT_RABBIT_HOLE_BATCH_SIZE", "3")
+
+    content_type = "application/pdf"
+    file_name = "sample.pdf"
+    file_path = f"tests/mocks/{file_name}"
+    with open(file_path, "rb") as f:
+        files = {"file": (file_name, f, content_type)}
+        response = client.post("/rabbithole/", files=files)
+        wait_for_ingestion(client)
+
+    assert response.status_code == 200
+
+    # 4 chunks, stored in batches of max 3
+    assert embedded_batches == [3, 1]
+    declarative_memories = get_declarative_memory_contents(client)
+    assert len(declarative_memories) == 4
+
+
+def test_rabbithole_upload_spooled_to_disk(client, monkeypatch):
+    # the parser reads the upload from the ingestion jobs folder
+    parsed_paths = []
+    from_path = Blob.from_path
+
+    def spy_from_path(path, **kwargs):
+        parsed_paths.append(str(path))
+        return from_path(path, **kwargs)
+
+    monkeypatch.setattr(Blob, "from_path", spy_from_path)
+
+    content_type = "application/pdf"
+    file_name = "sample.pdf"
+    with open(f"tests/mocks/{file_name}", "rb") as f:
+        files = {"file": (file_name, f, content_type)}
+        response = client.post("/rabbithole/", files=files)
+        wait_for_ingestion(client)
+    assert response.status_code == 200
+
+    uploads_folder = "tests/mocks/ingestion_jobs/uploads"
+    assert len(parsed_paths) == 1
+    assert parsed_paths[0].startswith(os.path.abspath(uploads_folder))
+    assert parsed_paths[0].endswith(".pdf")
+
+    # the uploaded file is removed after ingestion
+    assert os.listdir(uploads_folder) == []
+
+    declarative_memories = get_declarative_memory_contents(client)
+    assert len(declarative_memories) == 4
+    assert {dm["metadata"]["source"] for dm in declarative_memories} == {file_name}
@@ -13,3 +13,21 @@ def test_http_message(client):
     assert "You did not configure" in response.json()["text"]
 
 
+
+
+def test_metrics(client):
+
+    client.post("/message", json={"text": "hello!"})
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+
+    metrics = response.text
+    assert "# TYPE ccat_turn_duration_seconds histogram" in metrics
+    assert 'ccat_turn_duration_seconds_bucket{le="+Inf"}' in metrics
+    assert 'ccat_embedder_duration_seconds_count{source="recall"}' in metrics
+    assert "ccat_websocket_connections 0" in metrics
+    assert "ccat_threadpool_max_threads" in metrics
+    assert 'ccat_cache_events_total{event="hits"}' in metrics
+    assert "process_resident_memory_bytes" in metrics
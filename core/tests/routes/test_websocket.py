@@ -1,4 +1,7 @@
 import time
+import asyncio
+
+from cat.routes.websocket.websocket_manager import WebsocketSender
 from tests.utils import send_websocket_message, send_n_websocket_messages
 
 
@@ -38,12 +41,12 @@ def check_correct_websocket_reply(reply):
             assert mi["output_tokens"] > 0
             assert isinstance(mi["ended_at"], float)
             assert mi["ended_at"] > mi["started_at"]
-            assert mi["source"] == "MemoryAgent.execute"
+            assert mi["source"] == "MemoryAgent.aexecute"
         else:
             assert mi["model_type"] == "embedder"
             assert isinstance(mi["reply"], list)
             assert isinstance(mi["reply"][0], float)
-            assert mi["source"] == "StrayCat.recall_relevant_memories_to_working_memory"
+            assert mi["source"] == "StrayCat.arecall_relevant_memories_to_working_memory"
 
 
 def test_websocket_no_connections(client):
@@ -116,3 +119,152 @@ def test_websocket_multiple_connections(client):
 
 
 
+
+
+class FakeWebsocket:
+    def __init__(self, delay=0):
+        self.delay = delay
+        self.sent = []
+
+    async def send_json(self, data):
+        await asyncio.sleep(self.delay)
+        self.sent.append(data)
+
+
+def test_websocket_sender_coalesces_tokens():
+
+    websocket = FakeWebsocket()
+
+    async def stream():
+        sender = WebsocketSender(websocket, coalesce_window=0.05)
+
+        def send_from_thread():
+            for token in ["It", "'s", " late"]:
+                sender.send_json({"type": "chat_token", "content": token})
+            sender.send_json({"type": "chat", "content": "It's late"})
+
+        # messages are sent from worker threads, like in the cat
+        await asyncio.to_thread(send_from_thread)
+        await asyncio.sleep(0.2)
+        sender.close()
+
+    asyncio.run(stream())
+
+    assert websocket.sent == [
+        {"type": "chat_token", "content": "It's late"},
+        {"type": "chat", "content": "It's late"},
+    ]
+
+
+def test_websocket_sender_backpressure():
+
+    websocket = FakeWebsocket(delay=0.01)
+    max_pending = []
+
+    async def stream():
+        sender = WebsocketSender(websocket, max_pending=2)
+
+        def send_from_thread():
+            for i in range(10):
+                sender.send_json({"type": "notification", "content": i})
+                max_pending.append(len(sender._pending))
+
+        await asyncio.to_thread(send_from_thread)
+        await asyncio.sleep(0.2)
+        sender.close()
+
+    asyncio.run(stream())
+
+    # slow client makes the sender wait, no message is lost
+    assert max(max_pending) <= 2
+    assert [m["content"] for m in websocket.sent] == list(range(10))
+
+
+def test_websocket_sender_backpressure_in_loop():
+
+    websocket = FakeWebsocket(delay=0.01)
+    max_pending = []
+
+    async def stream():
+        sender = WebsocketSender(websocket, max_pending=2)
+
+        # tokens streamed by async callbacks run in the event loop
+        for i in range(10):
+            await sender.asend_json({"type": "chat_token", "content": str(i)})
+            max_pending.append(len(sender._pending))
+
+        await asyncio.sleep(0.2)
+        sender.close()
+
+    asyncio.run(stream())
+
+    assert max(max_pending) <= 2
+    assert "".join(m["content"] for m in websocket.sent) == "0123456789"
+
+
+def test_websocket_sender_coalesces_over_limit_in_loop():
+
+    websocket = FakeWebsocket(delay=0.01)
+    max_pending = []
+
+    async def stream():
+        sender = WebsocketSender(websocket, max_pending=2)
+
+        # the event loop cannot wait in send_json, extra tokens are merged
+        for i in range(10):
+            sender.send_json({"type": "chat_token", "content": str(i)})
+            max_pending.append(len(sender._pending))
+
+        await asyncio.sleep(0.2)
+        sender.close()
+
+    asyncio.run(stream())
+
+    assert max(max_pending) <= 2
+    assert "".join(m["content"] for m in websocket.sent) == "0123456789"
+
+
+def test_websocket_sender_bounds_unsent_messages():
+
+    websocket = FakeWebsocket(delay=0.01)
+    unsent = []
+
+    async def stream():
+        sender = WebsocketSender(websocket, max_pending=2)
+
+        def send_from_thread():
+            for i in range(10):
+                sender.send_json({"type": "notification", "content": i})
+                unsent.append(i + 1 - len(websocket.sent))
+
+        await asyncio.to_thread(send_from_thread)
+        await asyncio.sleep(0.2)
+        sender.close()
+
+    asyncio.run(stream())
+
+    # pending messages, and the one being sent
+    assert max(unsent) <= 3
+    assert [m["content"] for m in websocket.sent] == list(range(10))
+
+
+def test_websocket_sender_drops_over_limit_in_loop():
+
+    websocket = FakeWebsocket(delay=0.01)
+    max_pending = []
+
+    async def stream():
+        sender = WebsocketSender(websocket, max_pending=2)
+
+        # the event loop cannot wait in send_json, extra messages are dropped
+        for i in range(10):
+            sender.send_json({"type": "notification", "content": i})
+            max_pending.append(len(sender._pending))
+
+        await asyncio.sleep(0.2)
+        sender.close()
+
+    asyncio.run(stream())
+
+    assert max(max_pending) <= 2
+    assert [m["content"] for m in websocket.sent] == [0, 1]
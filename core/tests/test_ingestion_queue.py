@@ -0,0 +1,181 @@
+import io
+import os
+import time
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+
+from starlette.datastructures import UploadFile
+
+from cat.auth.permissions import AuthUserInfo
+from cat.ingestion_queue import IngestionQueue, JobState, IngestionCancelled, IngestionInterrupted
+from cat.looking_glass.cheshire_cat import CheshireCat
+from tests.utils import get_declarative_memory_contents
+
+
+def user(name):
+    return AuthUserInfo(id=name, name=name)
+
+
+def upload(file_name="sample.txt"):
+    with open(f"tests/mocks/{file_name}", "rb") as f:
+        return UploadFile(filename=file_name, file=io.BytesIO(f.read()))
+
+
+def wait_for_job(queue, job_id, timeout=10):
+    deadline = time.time() + timeout
+    while queue.get(job_id).state not in ["done", "failed", "cancelled"]:
+        assert time.time() < deadline
+        time.sleep(0.05)
+    return queue.get(job_id)
+
+
+def test_ingestion_queue_limits(tmp_path):
+    queue = IngestionQueue(str(tmp_path), workers=2, max_jobs_per_user=1)
+    a1 = queue.submit_url(user("a"), "https://a.com/1")
+    a2 = queue.submit_url(user("a"), "https://a.com/2")
+    b1 = queue.submit_url(user("b"), "https://b.com/1")
+
+    # jobs run oldest first, one at a time for each user
+    assert queue._next_job()["id"] == a1.id
+    assert queue._next_job()["id"] == b1.id
+    assert queue._next_job() is None
+
+    assert queue.get(a1.id).state == "parsing"
+    assert queue.get(a2.id).state == "queued"
+    assert [j.id for j in queue.list(user_id="a")] == [a2.id, a1.id]
+    assert len(queue.list()) == 3
+
+
+def test_ingestion_queue_cancel_queued(tmp_path):
+    queue = IngestionQueue(str(tmp_path))
+    job = queue.submit_file(user("a"), upload())
+    assert len(os.listdir(queue.uploads_folder)) == 1
+
+    job = queue.cancel(job.id)
+    assert job.state == "cancelled"
+    assert os.listdir(queue.uploads_folder) == []
+
+
+def test_ingestion_queue_transaction_does_not_block_workers(tmp_path):
+    queue = IngestionQueue(str(tmp_path))
+
+    # workers are woken up while a transaction waits for the database
+    with queue._transaction():
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            assert executor.submit(queue._notify).result(timeout=5) is None
+    assert queue._changes == 1
+
+
+def test_ingestion_queue_resume(client, tmp_path):
+    # a job interrupted while embedding, with a chunk already stored
+    queue = IngestionQueue(str(tmp_path))
+    job = queue.submit_file(user("user"), upload())
+    queue._execute("UPDATE jobs SET state = 'embedding', chunks_done = 1 WHERE id = ?", (job.id,))
+    declarative = CheshireCat().memory.vectors.declarative
+    point = declarative.add_point("meow", [0.0] * declarative.embedder_size)
+    queue._execute("INSERT INTO points (job_id, point_id) VALUES (?, ?)", (job.id, point.id))
+
+    # the Cat restarts
+    queue = IngestionQueue(str(tmp_path))
+    queue.start()
+    try:
+        job = wait_for_job(queue, job.id)
+    finally:
+        queue.shutdown()
+
+    assert job.state == "done"
+    assert job.chunks_done == job.chunks_total == 3
+    declarative_memories = get_declarative_memory_contents(client)
+    assert len(declarative_memories) == 3
+    assert "meow" not in [dm["page_content"] for dm in declarative_memories]
+    assert os.listdir(queue.uploads_folder) == []
+    # points of done jobs are not tracked
+    assert queue._read("SELECT * FROM points") == []
+
+
+def test_ingestion_queue_claims_each_job_once(tmp_path):
+    # two processes sharing the jobs folder
+    queues = [IngestionQueue(str(tmp_path)), IngestionQueue(str(tmp_path))]
+    jobs = [queues[0].submit_url(user(f"user_{i}"), f"https://a.com/{i}") for i in range(20)]
+
+    def claim(queue):
+        claimed = []
+        while (row := queue._next_job()) is not None:
+            claimed.append(row["id"])
+        return claimed
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        claimed = list(executor.map(claim, queues * 2))
+
+    claimed_ids = [job_id for ids in claimed for job_id in ids]
+    assert sorted(claimed_ids) == sorted(job.id for job in jobs)
+    for queue, ids in zip(queues * 2, claimed):
+        assert all(queue.get(job_id).state == "parsing" for job_id in ids)
+
+
+def test_ingestion_queue_recovers_stale_jobs(tmp_path):
+    queue = IngestionQueue(str(tmp_path))
+    other_queue = IngestionQueue(str(tmp_path))
+    alive = other_queue.submit_url(user("a"), "https://a.com/1")
+    stale = other_queue.submit_url(user("b"), "https://b.com/1")
+    assert other_queue._next_job()["id"] == alive.id
+    assert other_queue._next_job()["id"] == stale.id
+
+    # the process running the second job stopped
+    queue._execute(
+        "UPDATE jobs SET heartbeat_at = ? WHERE id = ?", (time.time() - 2 * queue.STALE_AFTER, stale.id)
+    )
+    queue._recover_stale_jobs()
+
+    assert queue.get(alive.id).state == "parsing"
+    assert queue.get(stale.id).state == "queued"
+    assert queue._next_job()["id"] == stale.id
+
+    # the first process is not the owner anymore
+    with pytest.raises(IngestionInterrupted):
+        other_queue._progress(stale.id)("embedding", 0, 1)
+    queue._progress(stale.id)("embedding", 0, 1)
+
+
+def test_ingestion_queue_cancel_running_in_other_process(tmp_path):
+    queue = IngestionQueue(str(tmp_path))
+    other_queue = IngestionQueue(str(tmp_path))
+    job = other_queue.submit_url(user("a"), "https://a.com/1")
+    assert other_queue._next_job()["id"] == job.id
+    progress = other_queue._progress(job.id)
+    progress("embedding", 0, 2)
+
+    # cancellation reaches the process running the job, at its next batch of chunks
+    assert queue.cancel(job.id).state == "embedding"
+    with pytest.raises(IngestionCancelled):
+        progress("embedding", 1, 2)
+
+    # only the owner finishes a running job
+    assert not queue._finish(job.id, JobState.CANCELLED)
+    assert other_queue._finish(job.id, JobState.CANCELLED)
+    assert queue.get(job.id).state == "cancelled"
+
+
+def test_ingestion_queue_tracks_points(client, tmp_path):
+    queue = IngestionQueue(str(tmp_path))
+    other_queue = IngestionQueue(str(tmp_path))
+    job = other_queue.submit_url(user("a"), "https://a.com/1")
+    assert other_queue._next_job()["id"] == job.id
+    declarative = CheshireCat().memory.vectors.declarative
+    points = [declarative.add_point(f"meow {i}", [0.0] * declarative.embedder_size) for i in range(2)]
+
+    # points stored by the owner are tracked
+    other_queue._progress(job.id)("embedding", 1, 2, point_ids=[points[0].id])
+    assert [row["point_id"] for row in queue._read("SELECT * FROM points")] == [points[0].id]
+
+    # points stored after the job was queued again are removed at once
+    queue._execute("UPDATE jobs SET owner = ? WHERE id = ?", (queue.owner, job.id))
+    with pytest.raises(IngestionInterrupted):
+        other_queue._progress(job.id)("embedding", 2, 2, point_ids=[points[1].id])
+    assert [dm["page_content"] for dm in get_declarative_memory_contents(client)] == ["meow 0"]
+
+    # tracked points are removed when the job does not complete
+    assert queue._finish(job.id, JobState.FAILED)
+    queue._delete_points(job.id)
+    assert get_declarative_memory_contents(client) == []
+    assert queue._read("SELECT * FROM points") == []
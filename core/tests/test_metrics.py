@@ -0,0 +1,48 @@
+import pytest
+
+from cat.metrics import MetricsRegistry, Counter, Gauge, Histogram
+
+
+def test_metrics_exposition():
+    registry = MetricsRegistry()
+
+    counter = Counter("test_calls_total", "Calls.", labelnames=["plugin"], registry=registry)
+    counter.labels(plugin="mock_plugin").inc()
+    counter.labels("mock_plugin").inc(2)
+    with pytest.raises(ValueError):
+        counter.inc()  # labels are required
+
+    gauge = Gauge("test_open", "Open things.", registry=registry)
+    gauge.inc(3)
+    gauge.dec()
+
+    Gauge("test_callback", "Read when collected.", function=lambda: 42, registry=registry)
+
+    histogram = Histogram("test_seconds", "Durations.", buckets=[0.1, 1], registry=registry)
+    histogram.observe(0.05)
+    histogram.observe(0.5)
+    histogram.observe(5)
+
+    text = registry.exposition()
+    lines = text.splitlines()
+    assert "# HELP test_calls_total Calls." in lines
+    assert "# TYPE test_calls_total counter" in lines
+    assert 'test_calls_total{plugin="mock_plugin"} 3' in lines
+    assert "test_open 2" in lines
+    assert "test_callback 42" in lines
+    assert 'test_seconds_bucket{le="0.1"} 1' in lines
+    assert 'test_seconds_bucket{le="1"} 2' in lines
+    assert 'test_seconds_bucket{le="+Inf"} 3' in lines
+    assert "test_seconds_sum 5.55" in lines
+    assert "test_seconds_count 3" in lines
+
+
+def test_metrics_registry_replace():
+    registry = MetricsRegistry()
+
+    # a plugin reloaded registers its metrics again
+    Counter("plugin_total", "Plugin counter.", registry=registry).inc()
+    new_counter = Counter("plugin_total", "Plugin counter.", registry=registry)
+
+    assert registry.get("plugin_total") is new_counter
+    assert registry.exposition().count("# TYPE plugin_total counter") == 1
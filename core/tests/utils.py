@@ -1,3 +1,4 @@
+import time
 import shutil
 from urllib.parse import urlencode
 
@@ -75,6 +76,19 @@ def get_declarative_memory_contents(client):
     return declarative_memories
 
 
+# utility to wait for uploaded documents to be ingested, returns the jobs
+def wait_for_ingestion(client, timeout=30):
+    deadline = time.time() + timeout
+    while True:
+        response = client.get("/rabbithole/jobs")
+        assert response.status_code == 200
+        jobs = response.json()["jobs"]
+        if all(j["state"] in ["done", "failed", "cancelled"] for j in jobs):
+            return jobs
+        assert time.time() < deadline, "Ingestion jobs did not finish in time"
+        time.sleep(0.05)
+
+
 # utility to get collections and point count from `GET /memory/collections` in a simpler format
 def get_collections_names_and_point_count(client):
     response = client.get("/memory/collections")